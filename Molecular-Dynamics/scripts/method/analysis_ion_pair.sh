@@ -38,13 +38,13 @@ echo "Critical: Performing analysis of NVE simulations."
 
     cp "${input_path}/analysis/analysis_ion_pair.py" analysis_ion_pair.py
 
-    $PYTHON_BIN analysis_ion_pair.py $CPU_THREADS $IPRANGE
+    $PYTHON_BIN analysis_ion_pair.py $CPU_THREADS $IPRANGE "${ANALYSIS_CHECKPOINT:-0}"
 
     rm analysis_ion_pair.py
 
     cp "${input_path}/analysis/analysis_crosslinking.py" analysis_crosslinking.py
 
-    $PYTHON_BIN analysis_crosslinking.py $NMONOMERS
+    $PYTHON_BIN analysis_crosslinking.py "${NMONOMER}" $CPU_THREADS "${ANALYSIS_CHECKPOINT:-0}"
 
     rm analysis_crosslinking.py
 
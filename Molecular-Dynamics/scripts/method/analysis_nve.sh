@@ -38,7 +38,7 @@ echo "Critical: Performing analysis of NVE simulations."
 
     cp "${input_path}/analysis/analysis_e2e.py" analysis_e2e.py
 
-    $PYTHON_BIN analysis_e2e.py $NCHAIN $NMONOMER $SPARSITY
+    $PYTHON_BIN analysis_e2e.py "${ROUSE_MODES:-5}" "${E2E_TAU_MAX:-1000}"
 
     rm analysis_e2e.py
 
@@ -46,16 +46,11 @@ echo "Critical: Performing analysis of NVE simulations."
 
     echo "INFO: Starting cluster analysis."
 
-    cp "${input_path}/analysis/analysis_nve.in" analysis_nve.in
-    # SPECIFY VMD LOCATION
-    sed -i "s+VMD_BIN+$VMD_BIN+g" analysis_nve.in
+    cp "${input_path}/analysis/analysis_cluster.py" analysis_cluster.py
 
-    if [ -z ${CPU_LIST+x} ]
-    then
-        $MPI_BIN -np $CPU_THREADS --use-hwthread-cpus $CPU_LIST $LAMMPS_BIN $CPU_THREADS -in analysis_nve.in
-    else
-        $MPI_BIN -np $CPU_THREADS --use-hwthread-cpus --bind-to core --cpu-set $CPU_LIST $LAMMPS_BIN -in analysis_nve.in
-    fi
+    $PYTHON_BIN analysis_cluster.py "${NMONOMER}"
+
+    rm analysis_cluster.py
 
     echo "INFO: Cluster analysis complete."
 } > "analysis_${log_file}" 2>&1
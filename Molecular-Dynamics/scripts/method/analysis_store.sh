@@ -0,0 +1,49 @@
+#!/usr/bin/env bash
+# -*- coding: utf-8 -*-
+#
+# Author     : Pierre Walker (GitHub: @pw0908)
+# Date       : 2024-02-23
+# Description: Script to convert the NVE trajectory into a per-type store
+# Usage      : ./analysis_store.sh
+# Notes      : Script assumes that global variables have been set in a
+#             submission/input/*.sh script. Script should only be called from
+#             the main run.sh script.
+
+# built-in shell options
+set -o errexit  # exit when a command fails. Add || true to commands allowed to fail
+set -o nounset  # exit when script tries to use undeclared variables
+set -o pipefail # exit when a command in a pipe fails
+
+# Default Preferences ###################################################################
+echo "INFO: Setting default preferences"
+
+# find path to this script
+script_path="$(cd "$(dirname "${BASH_SOURCE[0]}")" &>/dev/null && pwd)"
+project_path="${script_path}/../.."
+input_path="${script_path}/../parameters"
+
+# Output files
+cwd_production_nve="$(pwd)"
+cwd="$(pwd)/3-production_nve"
+log_file="production_nve.log"
+
+# Make and enter the initial directory
+# move to working directory
+mkdir -p "${cwd}"
+cd "${cwd}" || exit
+
+# the analyses read the store instead of the DCD; it is (re)built when it is
+# missing, incomplete or older than the trajectory
+if [ ! -f production_nve_store/index.npz ] || [ production_nve.dcd -nt production_nve_store/index.npz ]; then
+    echo "Critical: Converting production_nve.dcd to a per-type trajectory store."
+    {
+        cp "${input_path}/analysis/analysis_store.py" analysis_store.py
+
+        $PYTHON_BIN analysis_store.py production_nve.data production_nve.dcd production_nve_store $CPU_THREADS
+
+        rm analysis_store.py
+    } > "analysis_store_${log_file}" 2>&1
+    echo "Critical: Conversion of the NVE trajectory complete."
+fi
+
+cd "${cwd_production_nve}" || exit 1
@@ -56,21 +56,50 @@ if [ ! -f input.data ]
 then
     
     # Initialise the box
-    cp "${input_path}/initialization/initialize.py" initialize.py
-    
-    sed -i "s/rho/$DENSITY/g" initialize.py
-
-    sed -i "s/Npoly/$NCHAIN/g" initialize.py
-    sed -i "s/Nbb/$SPARSITY/g" initialize.py
-    sed -i "s/Nmono/$NMONOMER/g" initialize.py
-
-    sed -i "s/Nion/$NMETAL/g" initialize.py
-    sed -i "s/Z_c/$METAL_CHARGE/g" initialize.py
-    sed -i "s/r_i/$METAL_DIAMETER/g" initialize.py
-
-    $PYTHON_BIN initialize.py
+    args=(
+        --nchain "${NCHAIN}" --sparsity "${SPARSITY}" --nmonomer "${NMONOMER}"
+        --nmetal "${NMETAL}" --metal-charge "${METAL_CHARGE}"
+        --metal-diameter "${METAL_DIAMETER}" --density "${DENSITY}"
+    )
+    if [ "${STREAM_BUILD:-false}" == "true" ]
+    then
+        # Constant memory build for very large systems, written block by block
+        args+=(--stream)
+    else
+        args+=(--sidecar)
+    fi
+    if [ "${OVERLAP_CHECK:-false}" == "true" ]
+    then
+        args+=(--overlap)
+    fi
+    if [ "${PRE_RELAX:-false}" == "true" ]
+    then
+        args+=(--relax)
+    fi
+    if [ -n "${CONFORMATION_CACHE:-}" ]
+    then
+        # Chains of the same architecture (POLYMER_TAG) are reused across runs
+        args+=(--cache "${CONFORMATION_CACHE}")
+    fi
+    if [ -n "${SEED:-}" ]
+    then
+        args+=(--seed "${SEED}")
+    fi
 
-    rm initialize.py
+    if [ "${REPLICAS:-1}" -gt 1 ]
+    then
+        # Independent replicas input_000.data, ... built in parallel, the
+        # rest of the pipeline runs on the first one
+        args+=(--replicas "${REPLICAS}")
+        if [ "${CPU_THREADS}" -gt 0 ]
+        then
+            args+=(--processes "${CPU_THREADS}")
+        fi
+        $PYTHON_BIN "${input_path}/initialization/initialize.py" "${args[@]}"
+        ln -sf input_000.data input.data
+    else
+        $PYTHON_BIN "${input_path}/initialization/initialize.py" "${args[@]}"
+    fi
 fi
 } > "${log_file}" 2>&1
 echo "Critical: System initialized."
@@ -92,16 +121,16 @@ then
     then
         if [ -z ${CPU_LIST+x} ]
         then
-            $MPI_BIN -np $CPU_THREADS --use-hwthread-cpus $LAMMPS_BIN -in energy_minimize.in
+            $MPI_BIN -np $CPU_THREADS --use-hwthread-cpus $LAMMPS_BIN -var relax_steps "${RELAX_STEPS:-10000}" -in energy_minimize.in
         else
-            $MPI_BIN -np $CPU_THREADS --use-hwthread-cpus --bind-to core --cpu-set $CPU_LIST $LAMMPS_BIN -in energy_minimize.in
+            $MPI_BIN -np $CPU_THREADS --use-hwthread-cpus --bind-to core --cpu-set $CPU_LIST $LAMMPS_BIN -var relax_steps "${RELAX_STEPS:-10000}" -in energy_minimize.in
         fi
     else
         if [ -z ${CPU_LIST+x} ]
         then
-            $MPI_BIN -np $CPU_THREADS --use-hwthread-cpus $LAMMPS_BIN  -sf gpu -pk gpu $GPUS -in energy_minimize.in
+            $MPI_BIN -np $CPU_THREADS --use-hwthread-cpus $LAMMPS_BIN -var relax_steps "${RELAX_STEPS:-10000}" -sf gpu -pk gpu $GPUS -in energy_minimize.in
         else
-            $MPI_BIN -np $CPU_THREADS --use-hwthread-cpus --bind-to core --cpu-set $CPU_LIST $LAMMPS_BIN -sf gpu -pk gpu $GPUS -in energy_minimize.in
+            $MPI_BIN -np $CPU_THREADS --use-hwthread-cpus --bind-to core --cpu-set $CPU_LIST $LAMMPS_BIN -var relax_steps "${RELAX_STEPS:-10000}" -sf gpu -pk gpu $GPUS -in energy_minimize.in
         fi
     fi  
     mv initial.data "${cwd}/initial.data"
@@ -0,0 +1,312 @@
+# Standard library
+import logging
+import sys
+
+# Third-party packages
+import numpy as np
+import pandas as pd
+
+# MDAnalysis package
+from MDAnalysis.analysis.base import AnalysisBase
+from MDAnalysis.analysis.results import ResultsGroup
+from MDAnalysis.analysis import distances
+from MDAnalysis.core.groups import AtomGroup
+
+# Local
+from mpec.clusters import NetworkTracker, cluster_labels, percolation
+from mpec.dcd import frame_step
+from mpec.single_pass import SinglePass
+from mpec.store import load_universe
+
+
+class ClusterAnalysis(AnalysisBase):  # subclass AnalysisBase
+    """
+    Clusters of the polymer network: atoms are connected by their bonds and
+    by ion-pendant contacts. Reports the size of every cluster, the gel
+    fraction (largest cluster over all network atoms) and whether the
+    largest cluster wraps around the periodic box.
+
+    :param AnalysisBase: MDAnalysis analysis class
+    :type AnalysisBase: AnalysisBase
+    """
+    # every frame is analyzed on its own, so blocks of frames can be read by
+    # separate processes (run(backend="multiprocessing"))
+    _analysis_algorithm_is_parallelizable = True
+
+    @classmethod
+    def get_supported_backends(cls) -> tuple:
+        return ("serial", "multiprocessing", "dask")
+
+    def __init__(self, nodes: AtomGroup, ag1: AtomGroup, ag2: AtomGroup,
+                 r_cut: float = 2.0, verbose: bool = True, **kwargs):
+        """
+        :param nodes: Atoms of the network (e.g. polymer beads and ions),
+        only bonds between these atoms are used
+        :type nodes: AtomGroup
+        :param ag1: Atoms that bind to ag2 (e.g. ions), part of nodes
+        :type ag1: AtomGroup
+        :param ag2: Atoms that bind to ag1 (e.g. pendants), part of nodes
+        :type ag2: AtomGroup
+        :param r_cut: Contact distance between ag1 and ag2, defaults to 2.0
+        (same as CrossLinking)
+        :type r_cut: float, optional
+        :param verbose: Output verbose information for debugging and logging,
+        defaults to True
+        :type verbose: bool, optional
+        """
+        # must first run AnalysisBase.__init__ and pass the trajectory
+        super(ClusterAnalysis, self).__init__(
+            nodes.universe.trajectory, verbose=verbose, **kwargs)
+
+        # Verify that the atomgroups are of type AtomGroup
+        if not all(isinstance(ag, AtomGroup) for ag in (nodes, ag1, ag2)):
+            raise TypeError("atomgroups must be of type AtomGroup")
+
+        self.logger = logging.getLogger(
+            "MDAnalysis.analysis.ClusterAnalysis")
+
+        self.nodes: AtomGroup = nodes
+        self.ag1: AtomGroup = ag1
+        self.ag2: AtomGroup = ag2
+        self.r_cut: float = r_cut
+        self.df = None
+        # ion-pendant contacts (ag1, ag2 indices) of the last frame analyzed
+        self.contacts: np.ndarray = None
+        self.contacts_frame: int = None
+
+        # node index of every atom of the universe (-1: not in the network)
+        local = np.full(len(nodes.universe.atoms), -1, dtype=np.int64)
+        local[nodes.indices] = np.arange(len(nodes))
+        self._ag1 = local[ag1.indices]
+        self._ag2 = local[ag2.indices]
+        if np.any(self._ag1 < 0) or np.any(self._ag2 < 0):
+            raise ValueError("ag1 and ag2 must be part of nodes")
+
+        bonds = local[nodes.universe.bonds.indices] \
+            if hasattr(nodes.universe, "bonds") else np.empty((0, 2), int)
+        self._bonds = bonds[np.all(bonds >= 0, axis=1)]
+
+    def _prepare(self) -> None:
+        if self._verbose:
+            self.logger.info("Preparing analysis of ClusterAnalysis")
+
+        self.results.step = np.zeros(self.n_frames, dtype=np.int64)
+        self.results.largest = np.zeros(self.n_frames, dtype=np.int64)
+        self.results.spans = np.zeros((self.n_frames, 3), dtype=bool)
+        # sizes of all clusters of every frame, largest first
+        self.results.sizes = []
+
+    def _get_aggregator(self) -> ResultsGroup:
+        # per-frame rows of every block, stacked in frame order
+        return ResultsGroup(lookup={
+            "step": ResultsGroup.ndarray_hstack,
+            "largest": ResultsGroup.ndarray_hstack,
+            "spans": ResultsGroup.ndarray_vstack,
+            "sizes": ResultsGroup.flatten_sequence})
+
+    def _single_frame(self) -> None:
+        if self._verbose:
+            self.logger.info(f"Analyzing frame index {self._frame_index}")
+        box = self.nodes.universe.dimensions
+
+        # ion-pendant contacts (grid search) plus the bonds
+        pairs, dist = distances.capped_distance(
+            self.ag1.positions, self.ag2.positions, self.r_cut, box=box)
+        pairs = pairs[dist < self.r_cut]
+        self.contacts, self.contacts_frame = pairs, self._ts.frame
+        i = np.concatenate((self._bonds[:, 0], self._ag1[pairs[:, 0]]))
+        j = np.concatenate((self._bonds[:, 1], self._ag2[pairs[:, 1]]))
+
+        labels, sizes = cluster_labels(len(self.nodes), i, j)
+        largest = np.argmax(sizes)
+
+        self.results.step[self._frame_index] = \
+            frame_step(self._trajectory, self._ts.frame)
+        self.results.largest[self._frame_index] = sizes[largest]
+        self.results.spans[self._frame_index] = percolation(
+            self.nodes.positions, box, i, j, labels)[largest]
+        self.results.sizes.append(np.sort(sizes)[::-1])
+
+    def _conclude(self) -> None:
+        if self._verbose:
+            self.logger.info("Finishing analysis of ClusterAnalysis")
+
+        # Output results
+        self.df = pd.DataFrame()
+        self.df["Frame_Index"] = np.arange(self.n_frames)
+        self.df["Step"] = self.results.step
+        self.df["Time[ps]"] = self.times
+        self.df["Largest"] = self.results.largest
+        self.df["Gel_Fraction"] = self.results.largest / len(self.nodes)
+        self.df["N_Clusters"] = [len(s) for s in self.results.sizes]
+        for axis, name in enumerate("xyz"):
+            self.df[f"Spans_{name}"] = self.results.spans[:, axis]
+
+        # number of clusters of every size, averaged over the frames
+        self.size_distribution = np.bincount(
+            np.concatenate(self.results.sizes),
+            minlength=len(self.nodes) + 1) / self.n_frames
+
+    def save_sizes(self, filename: str) -> None:
+        """
+        Save the sizes of all clusters of every frame (CSR: sizes of frame f
+        are sizes[offsets[f]:offsets[f + 1]]) and the average size
+        distribution to a compressed `.npz` file.
+
+        :param filename: Output file name
+        :type filename: str
+        """
+        offsets = np.zeros(self.n_frames + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum([len(s) for s in self.results.sizes])
+        np.savez_compressed(
+            filename, frame=self.frames, step=self.results.step,
+            offsets=offsets, sizes=np.concatenate(self.results.sizes),
+            size_distribution=self.size_distribution)
+
+
+class NetworkTopology(AnalysisBase):  # subclass AnalysisBase
+    """
+    Time evolution of the ion-chain network. Nodes are the chains and the
+    ions, and an edge joins an ion to every chain it binds with at least one
+    pendant. The components are followed from frame to frame by a
+    `NetworkTracker`, which only applies the formed and broken edges, so
+    the frames must be read in order.
+
+    A chain is counted as elastically active if it belongs to the largest
+    cluster and is held by at least two crosslinking ions (ions bound to
+    two or more chains).
+
+    The ion-pendant contacts can be taken from a `ClusterAnalysis` of the
+    same ions and pendants that analyses every frame just before (e.g. in a
+    `SinglePass`), instead of being searched again.
+
+    :param AnalysisBase: MDAnalysis analysis class
+    :type AnalysisBase: AnalysisBase
+    """
+
+    def __init__(self, ag1: AtomGroup, ag2: AtomGroup, charge: int,
+                 r_cut: float = 2.0, contacts: ClusterAnalysis = None,
+                 verbose: bool = True, **kwargs):
+        """
+        :param ag1: Ions
+        :type ag1: AtomGroup
+        :param ag2: Pendants, stored chain by chain
+        :type ag2: AtomGroup
+        :param charge: Number of pendants per chain
+        :type charge: int
+        :param r_cut: Contact distance between ions and pendants, defaults
+        to 2.0 (same as CrossLinking)
+        :type r_cut: float, optional
+        :param contacts: Cluster analysis of the same ions, pendants and
+        r_cut whose contacts are reused, defaults to None (search the
+        contacts)
+        :type contacts: ClusterAnalysis, optional
+        :param verbose: Output verbose information for debugging and logging,
+        defaults to True
+        :type verbose: bool, optional
+        """
+        # must first run AnalysisBase.__init__ and pass the trajectory
+        super(NetworkTopology, self).__init__(
+            ag1.universe.trajectory, verbose=verbose, **kwargs)
+
+        # Verify that the atomgroups are of type AtomGroup
+        if (not isinstance(ag1, AtomGroup)) or (not isinstance(ag2, AtomGroup)):
+            raise TypeError("atomgroups must be of type AtomGroup")
+
+        self.logger = logging.getLogger(
+            "MDAnalysis.analysis.NetworkTopology")
+
+        self.ag1: AtomGroup = ag1
+        self.ag2: AtomGroup = ag2
+        self.charge: int = charge
+        self.r_cut: float = r_cut
+        self.n_chain: int = -(-len(ag2) // charge)
+        self.df = None
+
+        if contacts is not None and (contacts.ag1 != ag1
+                                     or contacts.ag2 != ag2
+                                     or contacts.r_cut != r_cut):
+            raise ValueError("contacts must be a ClusterAnalysis of the same "
+                             "ions, pendants and r_cut")
+        self.contacts: ClusterAnalysis = contacts
+
+    def _prepare(self) -> None:
+        if self._verbose:
+            self.logger.info("Preparing analysis of NetworkTopology")
+
+        self.tracker = NetworkTracker(self.n_chain + len(self.ag1))
+        # (col 0: chains in the largest cluster, 1: elastically active
+        # chains, 2: formed edges, 3: broken edges, 4: merges, 5: splits)
+        self.results.timeseries = np.zeros((self.n_frames, 6), dtype=np.int64)
+
+    def _single_frame(self) -> None:
+        if self._verbose:
+            self.logger.info(f"Analyzing frame index {self._frame_index}")
+
+        if self.contacts is None:
+            pairs, dist = distances.capped_distance(
+                self.ag1.positions, self.ag2.positions, self.r_cut,
+                box=self.ag1.universe.dimensions)
+            pairs = pairs[dist < self.r_cut]
+        elif self.contacts.contacts_frame == self._ts.frame:
+            pairs = self.contacts.contacts
+        else:
+            raise RuntimeError("the ClusterAnalysis must analyse every frame "
+                               "before the NetworkTopology")
+        ion_chain = np.unique(
+            pairs[:, 0] * self.n_chain + pairs[:, 1] // self.charge)
+        ion, chain = np.divmod(ion_chain, self.n_chain)
+
+        events = self.tracker.update(chain, self.n_chain + ion)
+        if self._frame_index == 0:
+            events = (0, 0, 0, 0)
+
+        # chains per cluster; of equally large clusters the one holding the
+        # first chain is the largest, whatever the tracker labels are
+        _, first, cluster, chains = np.unique(
+            self.tracker.labels[:self.n_chain], return_index=True,
+            return_inverse=True, return_counts=True)
+        largest = np.lexsort((first, -chains))[0]
+
+        # crosslinking ions per chain
+        crosslink = np.bincount(ion, minlength=len(self.ag1))[ion] >= 2
+        holds = np.bincount(chain[crosslink], minlength=self.n_chain)
+        active = np.count_nonzero((cluster == largest) & (holds >= 2))
+
+        self.results.timeseries[self._frame_index] = \
+            (chains[largest], active) + tuple(events)
+
+    def _conclude(self) -> None:
+        if self._verbose:
+            self.logger.info("Finishing analysis of NetworkTopology")
+
+        # Output results
+        columns = ["Largest_Chains", "Active_Chains", "Formed", "Broken",
+                   "Merges", "Splits"]
+        self.df = pd.DataFrame(self.results.timeseries, columns=columns)
+        self.df.insert(0, "Frame_Index", np.arange(self.n_frames))
+        self.df.insert(1, "Time[ps]", self.times)
+
+
+if __name__ == "__main__":
+    # chains and ions, from the per-type store when there is one
+    u = load_universe('production_nve.data', 'production_nve.dcd',
+                      'production_nve_store',
+                      ["type_1", "type_2", "type_3", "type_4"])
+
+    nodes = u.select_atoms("type 1 2 3 4")
+    ag1 = u.select_atoms("type 4")
+    ag2 = u.select_atoms("type 3")
+
+    # one read of the trajectory and one contact search per frame for both
+    # analyses; the network is followed frame by frame, in order
+    CA = ClusterAnalysis(nodes, ag1, ag2)
+    NT = NetworkTopology(ag1, ag2, int(sys.argv[1]), contacts=CA)
+    SinglePass([CA, NT]).run()
+
+    CA.df.to_csv("cluster.csv")
+    NT.df.to_csv("network.csv")
+    CA.save_sizes("cluster_size.npz")
+
+    # step and largest cluster, as previously written by the LAMMPS rerun
+    np.savetxt("cluster_size.txt", CA.df[["Step", "Largest"]].values, fmt="%d")
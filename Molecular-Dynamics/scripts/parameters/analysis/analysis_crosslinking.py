@@ -8,15 +8,31 @@ import pandas as pd
 import sys
 
 # MDAnalysis package
-import MDAnalysis as mda
 from MDAnalysis.analysis.base import AnalysisBase
+from MDAnalysis.analysis.results import ResultsGroup
 from MDAnalysis.analysis import distances
 from MDAnalysis.core.groups import AtomGroup
 from MDAnalysis.lib.log import ProgressBar
 
+# Local
+from mpec.checkpoint import run_checkpointed
+from mpec.pbc import unwrap_chains
+from mpec.store import load_universe
+
 class CrossLinking(AnalysisBase):  # subclass AnalysisBase
+    # every frame is analyzed on its own, so blocks of frames can be read by
+    # separate processes (run(backend="multiprocessing"))
+    _analysis_algorithm_is_parallelizable = True
+
+    @classmethod
+    def get_supported_backends(cls) -> tuple:
+        return ("serial", "multiprocessing", "dask")
+
+    # named motifs of the output, as descending bound pendants per chain
+    MOTIFS = ("100", "110", "200", "111", "210", "300")
 
     def __init__(self, ag1: AtomGroup, ag2: AtomGroup, charge: int,
+                 max_chains: int = 3, max_count: int = 3,
                  verbose: bool = True, **kwargs):
         # must first run AnalysisBase.__init__ and pass the trajectory
         super(CrossLinking, self).__init__(
@@ -29,25 +45,38 @@ class CrossLinking(AnalysisBase):  # subclass AnalysisBase
         self.logger = logging.getLogger(
             "MDAnalysis.analysis.CrossLinking")
 
+        if max_chains < 3 or max_count < 3:
+            raise ValueError("max_chains and max_count must be at least 3 "
+                             "to count the named motifs")
+
         self.ag1: AtomGroup = ag1
         self.ag2: AtomGroup = ag2
         self.charge = charge
 
+        # motifs of up to max_chains chains binding up to max_count pendants
+        # each are counted separately, everything else goes to "other"
+        self.max_chains: int = max_chains
+        self.max_count: int = max_count
+        self.motif_labels: list = motif_labels(max_chains, max_count)
 
     def _prepare(self) -> None:
         if self._verbose:
             self.logger.info("Preparing analysis of CrossLinking")
 
         self.df = None
+        # atom indices of every chain, in chain order, for the Rg calculation
+        self._chains = np.array([f.indices for f in self.ag2.fragments])
         self.results.Rg = np.zeros((self.n_frames, len(self.ag2.fragments)), dtype=float)
-        self.results.Ncross = np.zeros((self.n_frames, len(self.ag2.fragments)), dtype=float)
-        self.results.n_100 = np.zeros((self.n_frames, len(self.ag1.fragments)), dtype=float)
-        self.results.n_110 = np.zeros((self.n_frames, len(self.ag1.fragments)), dtype=float)
-        self.results.n_200 = np.zeros((self.n_frames, len(self.ag1.fragments)), dtype=float)
-        self.results.n_111 = np.zeros((self.n_frames, len(self.ag1.fragments)), dtype=float)
-        self.results.n_210 = np.zeros((self.n_frames, len(self.ag1.fragments)), dtype=float)
-        self.results.n_300 = np.zeros((self.n_frames, len(self.ag1.fragments)), dtype=float)
+        # crosslink degree of every chain and motif histogram, as integers
+        self.results.Ncross = np.zeros((self.n_frames, len(self.ag2.fragments)), dtype=np.int32)
+        self.results.motifs = np.zeros(
+            (self.n_frames, len(self.motif_labels)), dtype=np.int32)
 
+    def _get_aggregator(self) -> ResultsGroup:
+        # per-frame rows of every block, stacked in frame order
+        return ResultsGroup(lookup={
+            key: ResultsGroup.ndarray_vstack
+            for key in ("Rg", "Ncross", "motifs")})
 
     def _single_frame(self) -> None:
         ag1 = self.ag1
@@ -56,72 +85,154 @@ class CrossLinking(AnalysisBase):  # subclass AnalysisBase
         if self._verbose:
             self.logger.info(f"Analyzing frame index {self._frame_index}")
 
-        dist_arr = distances.distance_array(ag1.positions, # reference
-                                        ag2.positions, # configuration
-                                        box=u.dimensions)
-        coord  = dist_arr<2
-        ncross = np.zeros(len(ag2.fragments))
-        N_100 = 0
-        N_200 = 0
-        N_110 = 0
-        N_300 = 0
-        N_210 = 0
-        N_111 = 0
-        for i in range(len(ag1)):
-            Coord = np.add.reduceat(coord[i], np.arange(0, len(coord[i]), self.charge))
-            cross = Coord>0
-            b = np.array([cross])
-            B = np.dot(b.transpose(),b)
-            cross = cross*(sum(cross)-1)
-            ncross += cross
-            Coord = Coord[Coord != 0]
-            Coord = list(Coord)
-            if Coord == [1]:
-                N_100+=1
-            elif Coord == [2]:
-                N_200+=1
-            elif Coord == [1,1]:
-                N_110+=1
-            elif Coord == [3]:
-                N_300+=1
-            elif Coord == [2,1] or Coord == [1,2]:
-                N_210+=1
-            elif Coord == [1,1,1]:
-                N_111+=1
-        self.results.n_100[self._frame_index,:] = N_100
-        self.results.n_200[self._frame_index,:] = N_200
-        self.results.n_300[self._frame_index,:] = N_300
-        self.results.n_110[self._frame_index,:] = N_110
-        self.results.n_210[self._frame_index,:] = N_210
-        self.results.n_111[self._frame_index,:] = N_111
-        self.results.Ncross[self._frame_index,:] = ncross
+        # only pairs within the cutoff are searched (grid search)
+        pairs, dist = distances.capped_distance(ag1.positions, # reference
+                                                ag2.positions, # configuration
+                                                2, box=u.dimensions)
+        pairs = pairs[dist < 2]
+
+        # bound pendants of every (ion, chain), pendants are stored chain by
+        # chain, self.charge per chain
+        n_chain = -(-len(ag2) // self.charge)
+        ion_chain, count = np.unique(
+            pairs[:, 0] * n_chain + pairs[:, 1] // self.charge,
+            return_counts=True)
+        ion, chain = np.divmod(ion_chain, n_chain)
+
+        # every chain bound to an ion is crosslinked to the other chains
+        # bound to the same ion
+        n_bound = np.bincount(ion, minlength=len(ag1))
+        self.results.Ncross[self._frame_index, :] = np.bincount(
+            chain, weights=n_bound[ion] - 1, minlength=n_chain)
+
+        self.results.motifs[self._frame_index, :] = np.bincount(
+            motif_keys(ion, count, len(ag1), self.max_chains, self.max_count),
+            minlength=len(self.motif_labels))
+
+        chains = unwrap_chains(u.atoms.positions[self._chains], u.dimensions)
+        rel = chains - chains.mean(axis=1, keepdims=True)
+        self.results.Rg[self._frame_index,:] = np.sqrt(
+            np.einsum("cij,cij->c", rel, rel) / chains.shape[1])
 
     def _conclude(self) -> None:
         if self._verbose:
             self.logger.info("Finishing analysis of CrossLinking")
 
-    
         # Output results
-        columns = ["Frame_Index" "Ncross",
-                   "n_100", "n_110", "n_200","n_111", "n_210", "n_300"]
         self.df = pd.DataFrame()
         self.df["Frame_Index"] = np.arange(self.n_frames)
-        self.df["Ncross"] = [np.mean(self.results.Ncross[i,:]) for i in range(self.n_frames)]
-        self.df["n_100"] = [np.mean(self.results.n_100[i,:]) for i in range(self.n_frames)]
-        self.df["n_110"] = [np.mean(self.results.n_110[i,:]) for i in range(self.n_frames)]
-        self.df["n_200"] = [np.mean(self.results.n_200[i,:]) for i in range(self.n_frames)]
-        self.df["n_111"] = [np.mean(self.results.n_111[i,:]) for i in range(self.n_frames)]
-        self.df["n_210"] = [np.mean(self.results.n_210[i,:]) for i in range(self.n_frames)]
-        self.df["n_300"] = [np.mean(self.results.n_300[i,:]) for i in range(self.n_frames)]
-
-u = mda.Universe(f'production_nve.data', 
-                 f'production_nve.dcd')
-
-ag1 = u.select_atoms("type 4")
-ag2 = u.select_atoms("type 3")
-
-CL = CrossLinking(ag1, ag2, int(sys.argv[1]))
-
-CL.run()
-
-CL.df.to_csv("crosslinking.csv")
\ No newline at end of file
+        self.df["Ncross"] = self.results.Ncross.mean(axis=1)
+        self.df["Rg"] = self.results.Rg.mean(axis=1)
+        base = self.max_count + 1
+        for motif in self.MOTIFS:
+            key = sum(int(d) * base ** (self.max_chains - 1 - i)
+                      for i, d in enumerate(motif))
+            self.df[f"n_{motif}"] = self.results.motifs[:, key].astype(float)
+
+        # every motif seen, not only the named ones
+        self.df_motifs = pd.DataFrame(
+            self.results.motifs,
+            columns=[f"n_{label}" for label in self.motif_labels])
+
+        # number of chains with every crosslink degree, per frame
+        n_degree = int(self.results.Ncross.max(initial=0)) + 1
+        degree = self.results.Ncross \
+            + n_degree * np.arange(self.n_frames)[:, None]
+        self.df_degree = pd.DataFrame(
+            np.bincount(degree.ravel(), minlength=self.n_frames * n_degree)
+            .reshape(self.n_frames, n_degree),
+            columns=[f"Ncross_{k}" for k in range(n_degree)])
+
+    def save_records(self, filename: str) -> None:
+        """
+        Save the per-frame records column by column to a compressed `.npz`
+        file: frame, time, motif_labels and motifs (frame, motif), Ncross and
+        Rg (frame, chain).
+
+        :param filename: Output file name
+        :type filename: str
+        """
+        np.savez_compressed(
+            filename, frame=self.frames, time=self.times,
+            motif_labels=np.array(self.motif_labels),
+            motifs=self.results.motifs, Ncross=self.results.Ncross,
+            Rg=self.results.Rg)
+
+
+def motif_labels(max_chains: int, max_count: int) -> list:
+    """
+    Names of the motif histogram bins of `motif_keys`: the bound pendants
+    per chain in descending order (e.g. "210"), then "other".
+    """
+    base = max_count + 1
+    sep = "" if base <= 10 else "-"
+    labels = []
+    for key in range(base ** max_chains):
+        digits = np.unravel_index(key, (base,) * max_chains)
+        labels.append(sep.join(str(int(d)) for d in digits))
+    return labels + ["other"]
+
+
+def motif_keys(ion: np.ndarray, count: np.ndarray, n_ion: int,
+               max_chains: int, max_count: int) -> np.ndarray:
+    """
+    Encode the coordination motif of every ion as an integer: the numbers of
+    bound pendants per chain, sorted in descending order, are the digits of
+    a base (max_count + 1) number of max_chains digits. Ions bound to more
+    chains or to more pendants of one chain get the key base^max_chains.
+
+    :param ion: Ion of every bound (ion, chain), sorted by ion
+    :type ion: np.ndarray
+    :param count: Number of bound pendants of every (ion, chain)
+    :type count: np.ndarray
+    :param n_ion: Number of ions
+    :type n_ion: int
+    :return: 1D array (n_ion) of motif keys, 0 for unbound ions
+    :rtype: np.ndarray
+    """
+    base = max_count + 1
+
+    # rank of every chain within its ion, by descending count
+    order = np.lexsort((-count, ion))
+    ion, count = ion[order], count[order]
+    first = np.searchsorted(ion, ion)
+    rank = np.arange(len(ion)) - first
+
+    top = rank < max_chains
+    keys = np.bincount(
+        ion[top], weights=count[top] * base ** (max_chains - 1 - rank[top]),
+        minlength=n_ion).astype(np.int64)
+
+    overflow = np.zeros(n_ion, dtype=bool)
+    overflow[ion[~top]] = True
+    overflow[ion[count > max_count]] = True
+    keys[overflow] = base ** max_chains
+    return keys
+
+
+if __name__ == "__main__":
+    # chains and ions, from the per-type store when there is one
+    u = load_universe('production_nve.data', 'production_nve.dcd',
+                      'production_nve_store',
+                      ["type_1", "type_2", "type_3", "type_4"])
+
+    ag1 = u.select_atoms("type 4")
+    ag2 = u.select_atoms("type 3")
+
+    CL = CrossLinking(ag1, ag2, int(sys.argv[1]))
+
+    # split the frames over $CPU_THREADS processes, merged in frame order, and
+    # checkpoint every argv[3] frames (0: no checkpoint) to resume after a kill
+    n_workers = int(sys.argv[2]) if len(sys.argv) > 2 else 1
+    checkpoint_block = int(sys.argv[3]) if len(sys.argv) > 3 else 0
+    if checkpoint_block > 0:
+        run_checkpointed(CL, "crosslinking_checkpoint", block=checkpoint_block,
+                         n_workers=n_workers)
+    else:
+        CL.run(backend="multiprocessing" if n_workers > 1 else "serial",
+               n_workers=n_workers)
+
+    CL.df.to_csv("crosslinking.csv")
+    CL.df_degree.to_csv("crosslinking_degree.csv")
+    CL.df_motifs.to_csv("crosslinking_motifs.csv")
+    CL.save_records("crosslinking.npz")
@@ -1,21 +1,164 @@
-import numpy as np
-import MDAnalysis as mda
+# Standard library
+import logging
 import sys
-from mdhelper.analysis import polymer
 
-NCHAINS = int(sys.argv[1])
-NMONOMERS = int(sys.argv[2])
-SPARSITY = int(sys.argv[3])
+# Third-party packages
+import numpy as np
+import pandas as pd
+
+# MDAnalysis package
+from MDAnalysis.analysis.base import AnalysisBase
+from MDAnalysis.core.groups import AtomGroup
+
+# Local
+from mpec.rouse import StreamingCorrelator, chain_modes, rouse_basis
+from mpec.store import load_universe
+
+
+class ChainRelaxation(AnalysisBase):  # subclass AnalysisBase
+    """
+    Relaxation of the chains: autocorrelation functions of the end-to-end
+    vector and of the first Rouse modes, averaged over all chains.
+
+    Every frame is reduced to the end-to-end vector and the modes of every
+    chain, which are correlated in chunks of frames (`StreamingCorrelator`),
+    so memory does not grow with the length of the run.
+
+    :param AnalysisBase: MDAnalysis analysis class
+    :type AnalysisBase: AnalysisBase
+    """
+
+    def __init__(self, ag: AtomGroup, n_modes: int = 5, tau_max: int = 1000,
+                 chunk: int = 1000, verbose: bool = True, **kwargs):
+        """
+        :param ag: Atoms of the chains (backbone and pendants), every
+        fragment is one chain stored in chain order
+        :type ag: AtomGroup
+        :param n_modes: Number of Rouse modes, defaults to 5
+        :type n_modes: int, optional
+        :param tau_max: Number of lags in frames, which bounds the memory and
+        the cost per frame, or None for all frames of the run, defaults to
+        1000
+        :type tau_max: int, optional
+        :param chunk: Number of frames correlated at once, defaults to 1000
+        :type chunk: int, optional
+        :param verbose: Output verbose information for debugging and logging,
+        defaults to True
+        :type verbose: bool, optional
+        """
+        # must first run AnalysisBase.__init__ and pass the trajectory
+        super(ChainRelaxation, self).__init__(
+            ag.universe.trajectory, verbose=verbose, **kwargs)
+
+        # Verify that the atomgroup is of type AtomGroup
+        if not isinstance(ag, AtomGroup):
+            raise TypeError("atomgroup must be of type AtomGroup")
+
+        self.logger = logging.getLogger(
+            "MDAnalysis.analysis.ChainRelaxation")
+
+        self.ag: AtomGroup = ag
+        self.n_modes: int = n_modes
+        self.tau_max: int = tau_max
+        self.chunk: int = chunk
+        self.df = None
+
+        # atom indices of every chain, in chain order
+        chains = [f.intersection(ag) for f in ag.fragments]
+        if len(set(len(c) for c in chains)) != 1:
+            raise ValueError("all chains must have the same number of beads")
+        self._chains = np.array([c.indices for c in chains])
+
+        # the modes follow the backbone, pendants are left out
+        self._backbone = np.flatnonzero(chains[0].types != "3")
+        self._basis = rouse_basis(len(self._backbone), n_modes)
+
+    def _prepare(self) -> None:
+        if self._verbose:
+            self.logger.info("Preparing analysis of ChainRelaxation")
+
+        tau_max = self.n_frames if self.tau_max is None \
+            else min(self.tau_max, self.n_frames)
+        self.correlator = StreamingCorrelator(max(tau_max, 1))
+        self._buffer = np.zeros((min(self.chunk, max(self.n_frames, 1)),
+                                 len(self._chains), 1 + self.n_modes, 3))
+        self._filled = 0
+        self.results.R2 = np.zeros(self.n_frames)
+
+    def _flush(self) -> None:
+        self.correlator.update(self._buffer[:self._filled])
+        self._filled = 0
+
+    def _single_frame(self) -> None:
+        if self._verbose:
+            self.logger.info(f"Analyzing frame index {self._frame_index}")
+
+        u = self.ag.universe
+        modes = chain_modes(u.atoms.positions[self._chains], u.dimensions,
+                            self._backbone, self._basis)
+        self.results.R2[self._frame_index] = np.mean(
+            np.einsum("ci,ci->c", modes[:, 0], modes[:, 0]))
+
+        self._buffer[self._filled] = modes
+        self._filled += 1
+        if self._filled == len(self._buffer):
+            self._flush()
+
+    def _conclude(self) -> None:
+        if self._verbose:
+            self.logger.info("Finishing analysis of ChainRelaxation")
+
+        self._flush()
+        corr = self.correlator.correlation().mean(axis=1)
+
+        # <R^2> and <X_p^2>, then correlations normalised by them
+        self.results.amplitude = corr[0]
+        self.results.acf = corr[:, 0] / corr[0, 0]
+        self.results.rouse_acf = corr[:, 1:] / corr[0, 1:]
+        dt = self.times[1] - self.times[0] if self.n_frames > 1 else 0.0
+        self.results.lag_times = np.arange(len(corr)) * dt
+
+        # Output results
+        self.df = pd.DataFrame()
+        self.df["Lag_Index"] = np.arange(len(corr))
+        self.df["Time[ps]"] = self.results.lag_times
+        self.df["ACF_E2E"] = self.results.acf
+        for p in range(self.n_modes):
+            self.df[f"ACF_Rouse_{p + 1}"] = self.results.rouse_acf[:, p]
+
+    def save(self, filename: str) -> None:
+        """
+        Save the correlation functions, the mode amplitudes <R^2>, <X_p^2>
+        and the mean squared end-to-end distance of every frame to a
+        compressed `.npz` file.
+
+        :param filename: Output file name
+        :type filename: str
+        """
+        # acf keeps the (1, 1, lags) layout of the mdhelper output read by
+        # the plots in analysis/end-to-end
+        np.savez_compressed(
+            filename, time=self.results.lag_times,
+            acf=self.results.acf[None, None],
+            rouse_acf=self.results.rouse_acf,
+            amplitude=self.results.amplitude, frame=self.frames,
+            frame_time=self.times, R2=self.results.R2)
+
 
-NBEADS = (SPARSITY+1)*NMONOMERS
+if __name__ == "__main__":
+    # chains only, from the per-type store when there is one
+    u = load_universe('production_nve.data', 'production_nve.dcd',
+                      'production_nve_store', ["type_1", "type_2", "type_3"])
 
-u = mda.Universe('production_nve.data', 
-                 'production_nve.dcd')
+    ag = u.select_atoms("type 3 or type 1 or type 2")
 
-ag =  u.select_atoms("type 3 or type 1 or type 2")
+    # number of Rouse modes and longest lag in frames (0: whole run)
+    n_modes = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    tau_max = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
 
-relax = polymer.EndToEndVector(ag, n_chains=NCHAINS, n_monomers=NBEADS, dt=1, unwrap=True, fft=True, verbose=True)
+    relax = ChainRelaxation(ag, n_modes=n_modes, tau_max=tau_max or None)
 
-relax.run()
+    relax.run()
 
-relax.save('analysis_e2e')
\ No newline at end of file
+    relax.df.to_csv('analysis_e2e.csv')
+    relax.save('analysis_e2e')
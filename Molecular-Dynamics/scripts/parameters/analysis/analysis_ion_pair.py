@@ -10,12 +10,16 @@ import numpy as np
 import pandas as pd
 
 # MDAnalysis package
-import MDAnalysis as mda
 from MDAnalysis.analysis.base import AnalysisBase
+from MDAnalysis.analysis.results import ResultsGroup
 from MDAnalysis.analysis import distances
 from MDAnalysis.core.groups import AtomGroup
 from MDAnalysis.lib.log import ProgressBar
 
+# Local
+from mpec.checkpoint import run_checkpointed
+from mpec.store import load_universe
+
 class AutocorrelationAtomPair(AnalysisBase):  # subclass AnalysisBase
     """
     This class implements the calculation of the atom pair relaxation
@@ -24,52 +28,113 @@ class AutocorrelationAtomPair(AnalysisBase):  # subclass AnalysisBase
     :param AnalysisBase: MDAnalysis analysis class
     :type AnalysisBase: AnalysisBase
     """
-
-    def __init__(self, ag1: AtomGroup, ag2: AtomGroup,
-                 r_cut_ang: float,
-                 tau_max: int, window_step: int = 0,
+    # frames are independent until _conclude, so blocks of frames can be
+    # read by separate processes (run(backend="multiprocessing"))
+    _analysis_algorithm_is_parallelizable = True
+
+    @classmethod
+    def get_supported_backends(cls) -> tuple:
+        return ("serial", "multiprocessing", "dask")
+
+    def __init__(self, ag1, ag2, r_cut_ang, tau_max: int,
+                 window_step: int = 0, engine: str = "intervals",
+                 pair_block: int = 4096, streaming: bool = False,
+                 labels: list = None, n_threads: int = None,
                  verbose: bool = True, **kwargs):
         """
         Initialize AutocorrelationAtomPair analysis class. Method calls parent
         class initializer.
 
-        :param ag1: AtomGroup 1 for pair relaxation
-        :type ag1: AtomGroup
-        :param ag2: AtomGroup 2 for pair relaxation
-        :type ag2: AtomGroup
-        :param r_cut_ang: Cutoff distance for pair relaxation. Reference
-        unit: Angstrom.
+        Several selections and cutoffs can be analyzed in the same pass over
+        the trajectory: ag1 and ag2 may be lists of AtomGroups (paired in
+        order) and r_cut_ang a list of cutoffs. Distances are computed once
+        per frame and selection pair, at the largest cutoff, and one survival
+        probability is calculated for every (selection pair, cutoff).
+
+        :param ag1: AtomGroup 1 for pair relaxation, or list of AtomGroups
+        :type ag1: AtomGroup | list
+        :param ag2: AtomGroup 2 for pair relaxation, or list of AtomGroups
+        :type ag2: AtomGroup | list
+        :param r_cut_ang: Cutoff distance for pair relaxation, or list of
+        cutoffs. Reference unit: Angstrom.
+        :type r_cut_ang: float | list
         :param tau_max: Maximum lag time in number of frames to calculate
         correlation function.
         :type tau_max: int
         :param window_step: Maximum number of frames atoms can be
         continuously separated to account for recrossing events, defaults to 0
         :type window_step: int, optional
+        :param engine: Survival probability algorithm, "intervals" (built
+        from the bound intervals of every pair, linear time) or "impey"
+        (direct frame-by-frame count of [Impey1983]_), defaults to
+        "intervals"
+        :type engine: str, optional
+        :param pair_block: Number of atom pairs expanded to dense time series
+        at once by the "impey" engine, defaults to 4096
+        :type pair_block: int, optional
+        :param streaming: Update the survival probability frame by frame
+        with a `SurvivalCorrelator` instead of storing the contacts of the
+        whole trajectory (engine is then ignored). Frames must be read in
+        order by a single process, defaults to False
+        :type streaming: bool, optional
+        :param labels: Name of every selection pair used in the column names
+        of self.df, defaults to their index
+        :type labels: list, optional
+        :param n_threads: Number of numba threads of the correlation. They
+        are only started once the frames have been read, as worker processes
+        forked after numba started its threads hang, defaults to None (numba
+        default)
+        :type n_threads: int, optional
         :param verbose: Output verbose information for debugging and logging,
         defaults to True
         :type verbose: bool, optional
         """
-        # must first run AnalysisBase.__init__ and pass the trajectory
-        super(AutocorrelationAtomPair, self).__init__(
-            ag1.universe.trajectory, verbose=verbose, **kwargs)
+        groups1 = list(ag1) if isinstance(ag1, (list, tuple)) else [ag1]
+        groups2 = list(ag2) if isinstance(ag2, (list, tuple)) else [ag2]
 
         # Verify that the atomgroups are of type AtomGroup
-        if (not isinstance(ag1, AtomGroup)) or (not isinstance(ag2, AtomGroup)):
+        if not all(isinstance(ag, AtomGroup) for ag in groups1 + groups2):
             raise TypeError("atomgroups must be of type AtomGroup")
+        if len(groups1) != len(groups2):
+            raise ValueError(f"ag1 and ag2 must have the same length: "
+                             f"{len(groups1)} != {len(groups2)}")
+        if engine not in ("intervals", "impey"):
+            raise ValueError(f"Unknown correlation engine: {engine}")
+
+        # must first run AnalysisBase.__init__ and pass the trajectory
+        super(AutocorrelationAtomPair, self).__init__(
+            groups1[0].universe.trajectory, verbose=verbose, **kwargs)
 
         self.logger = logging.getLogger(
             "MDAnalysis.analysis.AutocorrelationAtomPair")
 
-        self.ag1: AtomGroup = ag1
-        self.ag2: AtomGroup = ag2
+        self.ag1 = ag1
+        self.ag2 = ag2
+        self.groups: list = list(zip(groups1, groups2))
+        self.labels: list = [str(i) for i in range(len(self.groups))] \
+            if labels is None else list(labels)
 
         self.df = None
-        self.results = None
         self.coeffs = None
 
-        self.r_cut_ang: float = r_cut_ang
+        self.r_cut_ang = r_cut_ang
+        self.cutoffs: list = list(r_cut_ang) \
+            if isinstance(r_cut_ang, (list, tuple)) else [r_cut_ang]
         self.window_step: int = window_step
         self.tau_max: int = tau_max
+        self.engine: str = engine
+        self.pair_block: int = pair_block
+        self.streaming: bool = streaming
+        self.n_threads: int = n_threads
+        if streaming:
+            self._analysis_algorithm_is_parallelizable = False
+
+        # every (selection pair, cutoff) gets its own range of pair indices,
+        # so the contacts of all of them fit in one sorted list per frame
+        sizes = [len(g1) * len(g2) for g1, g2 in self.groups
+                 for _ in self.cutoffs]
+        self.offsets: np.ndarray = np.zeros(len(sizes) + 1, dtype=np.int64)
+        self.offsets[1:] = np.cumsum(sizes)
 
     def _prepare(self) -> None:
         """
@@ -81,15 +146,22 @@ class AutocorrelationAtomPair(AnalysisBase):  # subclass AnalysisBase
 
         # output array of parameters (col 0: frame_index,
         # 1: Time[ps], 2: Time[ns],
-        # 3: ACF_Survival_Probability
-        self.results: np.ndarray = np.zeros((self.n_frames, 4), dtype=float)
-
-        # initialize arrays for computations
-        self.atom_pairs: np.ndarray = np.zeros(
-            (self.n_frames, len(self.ag1.atoms), len(self.ag2.atoms)),
-            dtype=int)
-        self.atom_pairs_filled: np.ndarray = np.zeros_like(
-            self.atom_pairs, dtype=int)
+        # 3...: ACF_Survival_Probability of every (selection pair, cutoff)
+        self.results.timeseries = np.zeros(
+            (self.n_frames, 2 + len(self.offsets)), dtype=float)
+
+        # contacts of every frame, as sorted pair indices
+        # (offset + atom_1 * n_atom_2 + atom_2) so that memory scales with
+        # the number of contacts instead of n_frames * n_atom_1 * n_atom_2
+        self.results.contacts = []
+        self.contact_index: np.ndarray = None
+        self.contact_pairs: np.ndarray = None
+        self.correlators = [
+            SurvivalCorrelator(self.tau_max, self.window_step)
+            for _ in range(len(self.offsets) - 1)] if self.streaming else None
+        if self.streaming:
+            # frames are read by this process only, no workers are forked
+            self._set_threads()
 
     def _single_frame(self) -> None:
         """
@@ -99,9 +171,9 @@ class AutocorrelationAtomPair(AnalysisBase):  # subclass AnalysisBase
             self.logger.info(f"Analyzing frame index {self._frame_index}")
 
         # get time of current frame
-        self.results[self._frame_index, 0] = self._trajectory.time
-        self.results[self._frame_index, 1] = self._ts.frame
-        self.results[self._frame_index, 2] = self._trajectory.time / 1000.0
+        self.results.timeseries[self._frame_index, 0] = self._ts.time
+        self.results.timeseries[self._frame_index, 1] = self._ts.frame
+        self.results.timeseries[self._frame_index, 2] = self._ts.time / 1000.0
 
         # calculate distances between groups in selections
         self._pairwise_distances()
@@ -114,45 +186,109 @@ class AutocorrelationAtomPair(AnalysisBase):  # subclass AnalysisBase
         if self._verbose:
             self.logger.info("Finishing analysis of AutocorrelationAtomPair")
 
-        # Remove recrossing events from trajectory
-        self.atom_pairs_filled = _persistence(
-            self.atom_pairs.copy(), self.window_step)
+        # the worker processes reading the frames are done
+        self._set_threads()
+
+        # assemble the CSR contact list
+        if not self.streaming:
+            self.contact_index = np.zeros(self.n_frames + 1, dtype=np.int64)
+            self.contact_index[1:] = np.cumsum(
+                [len(c) for c in self.results.contacts])
+            self.contact_pairs = np.concatenate(
+                self.results.contacts).astype(np.int64)
+            self.results.contacts = []
 
         # calculate correlation function
         self._correlation()
 
         # Output results
         columns = ["Frame_Index",
-                   "Time[ps]", "Time[ns]",
-                   "ACF_Survival_Probability"]
-        self.df = pd.DataFrame(self.results, columns=columns)
+                   "Time[ps]", "Time[ns]"]
+        if len(self.offsets) == 2:
+            columns.append("ACF_Survival_Probability")
+        else:
+            columns += [f"ACF_Survival_Probability[{label},{cut:g}]"
+                        for label in self.labels for cut in self.cutoffs]
+        self.df = pd.DataFrame(self.results.timeseries, columns=columns)
 
         self.df["Time[ns]"] = self.df["Time[ns]"]-self.df["Time[ns]"][0]
 
+    def _set_threads(self) -> None:
+        """
+        Set the number of numba threads, at most the number numba was
+        started with.
+        """
+        if self.n_threads:
+            nb.set_num_threads(
+                max(1, min(self.n_threads, nb.config.NUMBA_NUM_THREADS)))
+
+    def _get_aggregator(self) -> ResultsGroup:
+        """
+        Merge the per-frame results of blocks of frames analyzed in parallel,
+        in frame order.
+        """
+        return ResultsGroup(lookup={
+            "timeseries": ResultsGroup.ndarray_vstack,
+            "contacts": ResultsGroup.flatten_sequence})
+
+    def _checkpoint_state(self) -> dict:
+        """
+        State carried from one block of frames to the next by
+        `mpec.checkpoint.run_checkpointed`: the streaming correlators.
+        """
+        if not self.streaming:
+            return {}
+        return {f"{k}.{key}": value
+                for k, correlator in enumerate(self.correlators)
+                for key, value in correlator.state().items()}
+
+    def _restore_checkpoint_state(self, state: dict) -> None:
+        if self.streaming:
+            self.correlators = [SurvivalCorrelator.from_state(
+                {key[len(f"{k}."):]: value for key, value in state.items()
+                 if key.startswith(f"{k}.")})
+                for k in range(len(self.offsets) - 1)]
+
     def _pairwise_distances(self) -> None:
         """
         Calculate the pairwise distances between atoms in each group of the
         selection.
 
-        Function modifies self.atom_pairs and uses built-in MDAnalysis
-        function: distances.distance_array() for efficiency.
+        Function appends the indices of the pairs in contact to
+        self.results.contacts (or passes them to self.correlators) and uses
+        built-in MDAnalysis function: distances.capped_distance() so that
+        only pairs within the largest cutoff are ever evaluated (grid
+        search, linear in the number of atoms).
         """
-        # get pairwise distances between atoms in selection_1 and selection_2
-        dist_arr: np.ndarray = distances.distance_array(
-            self.ag1.positions, self.ag2.positions,
-            box=self.ag1.universe.dimensions)
-
-        # convert 0.0 to np.inf (do not count self-interactions)
-        dist_arr: np.ndarray = np.where(dist_arr <= 1e-6, np.inf, dist_arr)
-
-        # convert float distances to int (booleans) based on distance cutoff
-        self.atom_pairs[self._frame_index] = dist_arr < self.r_cut_ang
+        contacts = []
+        for group, (ag1, ag2) in enumerate(self.groups):
+            # get pairs of atoms in selection_1 and selection_2 within the
+            # largest cutoff
+            pairs, dist = distances.capped_distance(
+                ag1.positions, ag2.positions, max(self.cutoffs),
+                box=ag1.universe.dimensions)
+            index = pairs[:, 0] * len(ag2) + pairs[:, 1]
+
+            for k, cut in enumerate(self.cutoffs):
+                # do not count self-interactions, cutoff is exclusive
+                keep = (dist > 1e-6) & (dist < cut)
+
+                # keep the sorted (flattened) indices of the pairs within
+                # the cutoff
+                contacts.append(np.sort(index[keep]).astype(np.int64))
+                if self.streaming:
+                    self.correlators[group * len(self.cutoffs) + k].update(
+                        contacts[-1])
+
+        if not self.streaming:
+            self.results.contacts.append(np.concatenate(
+                [c + offset for c, offset in zip(contacts, self.offsets)]))
 
     def _correlation(self) -> None:
         """
-        Iterate over all frame lag-times up to self.n_frames // 2 and
-        calculate the un-normalized survival probability of all possible
-        atom pairs.
+        Calculate the un-normalized survival probability of all atom pairs
+        for all frame lag-times up to self.tau_max and normalize it, for
+        every (selection pair, cutoff).
         Function does not iterate over larger lag-times, as this would yield
         fewer lag-times to average over and generate good statistics.
         """
@@ -160,12 +296,87 @@ class AutocorrelationAtomPair(AnalysisBase):  # subclass AnalysisBase
             self.logger.info(
                 "Calculating correlation of AutocorrelationAtomPair")
 
-        for lag in ProgressBar(range(self.tau_max), verbose=self._verbose):
-            self.results[lag, 3] += _survival_imm(
-                lag, self.atom_pairs, self.atom_pairs_filled)
-
-        # normalize probability
-        self.results[:, 3] /= self.results[0, 3]
+        if self.streaming and self.window_step >= self.n_frames:
+            raise ValueError(f"Window step must be smaller than array length: "
+                             f"{self.window_step} > {self.n_frames}")
+
+        if not self.streaming:
+            frames = np.repeat(np.arange(self.n_frames),
+                               np.diff(self.contact_index))
+            combination = np.searchsorted(
+                self.offsets, self.contact_pairs, side="right") - 1
+
+        n_lag = min(self.tau_max, self.n_frames)
+        for k in range(len(self.offsets) - 1):
+            if self.streaming:
+                survive = self.correlators[k].survive
+            else:
+                # contacts of this (selection pair, cutoff) only
+                mine = combination == k
+                contact_index = np.zeros(self.n_frames + 1, dtype=np.int64)
+                contact_index[1:] = np.cumsum(np.bincount(
+                    frames[mine], minlength=self.n_frames))
+                contact_pairs = self.contact_pairs[mine]
+
+                if self.engine == "intervals":
+                    survive = _survival_intervals(
+                        contact_index, contact_pairs, self.tau_max,
+                        self.window_step)
+                else:
+                    survive = self._correlation_impey(
+                        contact_index, contact_pairs)
+
+            # normalize probability
+            self.results.timeseries[:n_lag, 3 + k] += survive[:n_lag]
+            self.results.timeseries[:, 3 + k] /= \
+                self.results.timeseries[0, 3 + k]
+
+    def _correlation_impey(self, contact_index: np.ndarray,
+                           contact_pairs: np.ndarray) -> np.ndarray:
+        """
+        Iterate over all frame lag-times up to self.tau_max and
+        calculate the un-normalized survival probability of all atom pairs
+        that are in contact at least once. Pairs that never meet cannot
+        contribute, so only those are expanded to dense time series, in
+        blocks of self.pair_block pairs.
+
+        :param contact_index: 1D array (n_frame + 1) of CSR offsets into
+        contact_pairs
+        :type contact_index: np.ndarray
+        :param contact_pairs: 1D array of the pair indices in contact, frame
+        by frame
+        :type contact_pairs: np.ndarray
+        :return: 1D array (tau_max) of surviving atom pair origins per lag
+        time
+        :rtype: np.ndarray
+        """
+        survive = np.zeros(self.tau_max)
+
+        # frame of every contact, grouped by pair
+        frames = np.repeat(np.arange(self.n_frames), np.diff(contact_index))
+        pairs, column = np.unique(contact_pairs, return_inverse=True)
+        order = np.argsort(column, kind="stable")
+        edges = np.searchsorted(
+            column[order],
+            np.arange(0, len(pairs) + self.pair_block, self.pair_block))
+
+        for k, lo in enumerate(ProgressBar(
+                range(0, len(pairs), self.pair_block),
+                verbose=self._verbose)):
+            block = order[edges[k]:edges[k + 1]]
+
+            # 2 where the pair is in contact, 1 where a recrossing event is
+            # filled in, so one array holds both time series
+            pair_states = np.zeros(
+                (self.n_frames, min(self.pair_block, len(pairs) - lo)),
+                dtype=np.int8)
+            pair_states[frames[block], column[block] - lo] = 2
+            _persistence(pair_states, self.window_step)
+
+            for lag in range(self.tau_max):
+                survive[lag] += _survival_imm(lag, pair_states)
+
+        return survive
 
     def save(self, filename: str, tag: str = None,
              dir_out: str = "./output/mdanalysis") -> None:
@@ -190,10 +401,124 @@ class AutocorrelationAtomPair(AnalysisBase):  # subclass AnalysisBase
         Path(dir_out).mkdir(parents=True, exist_ok=True)
         self.df.to_pickle(f"{dir_out}/df_ACFAtomPair_{filename}.pkl")
 
-nb.set_num_threads(int(sys.argv[1]))
+class SurvivalCorrelator:
+    """
+    Online survival probability of atom pairs, updated one frame at a time.
+    Gives the same sums as `_survival_intervals` over the whole trajectory.
+
+    The contacts of the last tau_max frames are kept in a ring buffer. For
+    every pair that can still continue a persistent stretch (last contact at
+    most window_step + 1 frames ago), the frame of its last contact and the
+    first frame of its stretch are kept as well. A contact at frame t
+    survives from every earlier contact of the same pair in its stretch,
+    so the survival sums can be completed as soon as a frame arrives. Memory
+    is O(tau_max * contacts per frame), independent of trajectory length.
+    """
+
+    def __init__(self, tau_max: int, window_step: int = 0):
+        """
+        :param tau_max: Number of lag times
+        :type tau_max: int
+        :param window_step: Maximum number of frames an atom pair can be
+        continuously unpaired and be considered a recrossing event, defaults
+        to 0
+        :type window_step: int, optional
+        """
+        self.tau_max: int = tau_max
+        self.window_step: int = window_step
+        self.n_frames: int = 0
+
+        # un-normalized survival probability per lag time
+        self.survive: np.ndarray = np.zeros(tau_max)
+
+        # contacts of the last tau_max frames, frame t at t % tau_max
+        self._ring: list = [np.empty(0, dtype=np.int64)] * tau_max
+
+        # sorted pairs that may continue a stretch, with their last contact
+        # and the first frame of their stretch
+        self._pairs: np.ndarray = np.empty(0, dtype=np.int64)
+        self._last: np.ndarray = np.empty(0, dtype=np.int64)
+        self._start: np.ndarray = np.empty(0, dtype=np.int64)
+
+    def update(self, contacts: np.ndarray) -> None:
+        """
+        Add the contacts of the next frame.
+
+        :param contacts: 1D array of the sorted, unique pair indices in
+        contact
+        :type contacts: np.ndarray
+        """
+        frame = self.n_frames
+        contacts = np.asarray(contacts, dtype=np.int64)
+
+        # stretch of every contact, continued if the gap is short enough
+        idx = np.searchsorted(self._pairs, contacts)
+        found = np.zeros(len(contacts), dtype=bool)
+        inside = idx < len(self._pairs)
+        found[inside] = self._pairs[idx[inside]] == contacts[inside]
+        idx = idx[found]
+        continued = frame - self._last[idx] - 1 <= self.window_step
+        start = np.full(len(contacts), frame, dtype=np.int64)
+        start[np.flatnonzero(found)[continued]] = self._start[idx[continued]]
+
+        # surviving origins at every lag, back to the oldest stretch start
+        self._ring[frame % self.tau_max] = contacts
+        for lag in range(min(self.tau_max, frame + 1)):
+            origin = frame - lag
+            alive = contacts[start <= origin]
+            if len(alive) == 0:
+                break
+            earlier = self._ring[origin % self.tau_max]
+            if len(earlier) == 0:
+                continue
+            j = np.minimum(np.searchsorted(earlier, alive), len(earlier) - 1)
+            self.survive[lag] += np.count_nonzero(earlier[j] == alive)
+
+        # forget pairs whose stretch can no longer be continued
+        keep = self._last >= frame - self.window_step
+        keep[idx] = False
+        pairs = np.concatenate((self._pairs[keep], contacts))
+        order = np.argsort(pairs, kind="stable")
+        self._pairs = pairs[order]
+        self._last = np.concatenate((
+            self._last[keep], np.full(len(contacts), frame)))[order]
+        self._start = np.concatenate((self._start[keep], start))[order]
+
+        self.n_frames += 1
+
+    def state(self) -> dict:
+        """
+        :return: Arrays that describe the correlator, see `from_state`
+        :rtype: dict
+        """
+        return {"tau_max": self.tau_max, "window_step": self.window_step,
+                "n_frames": self.n_frames, "survive": self.survive,
+                "ring": list(self._ring), "pairs": self._pairs,
+                "last": self._last, "start": self._start}
+
+    @classmethod
+    def from_state(cls, state: dict) -> "SurvivalCorrelator":
+        """
+        Rebuild a correlator saved with `state`, e.g. from a checkpoint.
+
+        :param state: Arrays returned by `state`
+        :type state: dict
+        :return: Correlator that continues where the saved one stopped
+        :rtype: SurvivalCorrelator
+        """
+        correlator = cls(int(state["tau_max"]), int(state["window_step"]))
+        correlator.n_frames = int(state["n_frames"])
+        correlator.survive = np.array(state["survive"], dtype=float)
+        correlator._ring = [np.asarray(c, dtype=np.int64)
+                            for c in state["ring"]]
+        correlator._pairs = np.asarray(state["pairs"], dtype=np.int64)
+        correlator._last = np.asarray(state["last"], dtype=np.int64)
+        correlator._start = np.asarray(state["start"], dtype=np.int64)
+        return correlator
+
+
 @ nb.jit(nopython=True, parallel=True, nogil=True)
-def _survival_imm(lag: int, atom_pairs: np.ndarray,
-                  atom_pairs_filled: np.ndarray) -> int:
+def _survival_imm(lag: int, pair_states: np.ndarray) -> int:
     """
     Calculate the un-normalized survival probability of all possible atom pairs
     at all frames with range of the trajectory for a specific frame lag time.
@@ -205,129 +530,218 @@ def _survival_imm(lag: int, atom_pairs: np.ndarray,
     :param lag: Number of frames between the start and end frames of the
     atom pair
     :type lag: int
-    :param atom_pairs: 3D array (n_frame, atom_1, atom_2) of booleans indicating
-    whether the atom pair (atom_1, atom_2) exists at the frame
-    :type atom_pairs: np.ndarray
-    :param atom_pairs_filled: 3D array (n_frame, atom_1, atom_2) of booleans
-    indicating whether the atom_pair (atom_1, atom_2) persisted
-    (with recrossings) during the trajectory
-    :type atom_pairs_filled: np.ndarray
+    :param pair_states: 2D array (n_frame, n_pair) that is 2 where the atom
+    pair exists, 1 where it is unpaired during a recrossing event (see
+    `_persistence`) and 0 otherwise
+    :type pair_states: np.ndarray
     :return: Total number of atom pairs that existed in the trajectory for the
     specified lag time
     :rtype: int
     """
     # initialize number of surviving atom pairs to zero
     survive: int = 0
-    n_frames, n_ag1, n_ag2 = np.shape(atom_pairs)
+    n_frames, n_pairs = np.shape(pair_states)
 
     # loop over all possible subsets of trajectory with given lag time
     for start in nb.prange(n_frames - lag):  # pylint: disable=not-an-iterable
         end: int = start + lag
-        # find if pair exists at both ends of trajectory
-        pairs_exist: np.ndarray = \
-            (atom_pairs[start, :, :] + atom_pairs[end, :, :]) == 2
 
         # check if each atom pair survived
-        for ag1 in nb.prange(n_ag1):      # pylint: disable=not-an-iterable
-            for ag2 in nb.prange(n_ag2):  # pylint: disable=not-an-iterable
+        for pair in nb.prange(n_pairs):  # pylint: disable=not-an-iterable
 
-                # only evaluate persistence if the pair exists at both ends
-                # of the trajectory
-                pair_survived: int = 1
-                if pairs_exist[ag1, ag2]:
+            # only evaluate persistence if the pair exists at both ends
+            # of the trajectory
+            pair_survived: int = 1
+            if pair_states[start, pair] == 2 and pair_states[end, pair] == 2:
 
-                    for p in atom_pairs_filled[start:(end+1), ag1, ag2]:
-                        if p == 0:
-                            pair_survived = 0
-                            break
+                for p in pair_states[start:(end+1), pair]:
+                    if p == 0:
+                        pair_survived = 0
+                        break
 
-                    survive += pair_survived
+                survive += pair_survived
 
     return survive
 
 
-def _replace_recrossing_events(arr: np.ndarray, window_step: int) -> np.ndarray:
+def _bound_intervals(contact_index: np.ndarray,
+                     contact_pairs: np.ndarray) -> tuple:
     """
-    Replaces temporary recrossing events with paired state to make calculation
-    of atom pair persistence easier. Original code is modified from
-    https://stackoverflow.com/a/3274416/13215572
+    Split the contacts of every atom pair into contiguous bound intervals.
+
+    :param contact_index: 1D array (n_frame + 1) of CSR offsets into
+    contact_pairs
+    :type contact_index: np.ndarray
+    :param contact_pairs: 1D array of the pair indices in contact, frame by
+    frame
+    :type contact_pairs: np.ndarray
+    :return: 1D arrays of the pair index, first frame and last frame of
+    every interval, sorted by pair and then by frame
+    :rtype: tuple
+    """
+    frames = np.repeat(np.arange(len(contact_index) - 1),
+                       np.diff(contact_index))
+
+    # frames are already in order within every pair after a stable sort
+    order = np.argsort(contact_pairs, kind="stable")
+    pairs = contact_pairs[order]
+    frames = frames[order]
 
-    :param arr: 1D array of 1, 0 pairing states.
-    :type arr: np.ndarray
+    new = np.ones(len(pairs), dtype=bool)
+    new[1:] = (pairs[1:] != pairs[:-1]) | (frames[1:] != frames[:-1] + 1)
+    first = np.flatnonzero(new)
+    last = np.append(first[1:], len(pairs))[:len(first)] - 1
+
+    return pairs[first], frames[first], frames[last]
+
+
+def _survival_intervals(contact_index: np.ndarray,
+                        contact_pairs: np.ndarray, tau_max: int,
+                        window_step: int) -> np.ndarray:
+    """
+    Calculate the un-normalized survival probability for all lag times up to
+    tau_max from the bound intervals of every atom pair. The result is the
+    same as summing `_survival_imm` over all pairs.
+
+    Bound intervals separated by at most window_step unbound frames form one
+    persistent stretch, and every two bound frames t1 <= t2 of a stretch
+    are one surviving origin at lag t2 - t1. An interval of L frames thus
+    gives L - lag origins, and two intervals A, B of the same stretch give
+    the overlap of A with B shifted back by lag, a trapezoid in lag. Both
+    are piecewise linear and are accumulated as second differences, so the
+    cost is linear in the number of intervals (plus the pairs of intervals
+    less than tau_max apart within a stretch).
+
+    :param contact_index: 1D array (n_frame + 1) of CSR offsets into
+    contact_pairs
+    :type contact_index: np.ndarray
+    :param contact_pairs: 1D array of the pair indices in contact, frame by
+    frame
+    :type contact_pairs: np.ndarray
+    :param tau_max: Number of lag times
+    :type tau_max: int
     :param window_step: Maximum number of frames an atom pair can be
     continuously unpaired and be considered a recrossing event
     :type window_step: int
-    :return: 1D array with recrossing events all replaced with ones
+    :return: 1D array (tau_max) of surviving atom pair origins per lag time
     :rtype: np.ndarray
     """
-    # Input checking
-    if arr.ndim != 1:
-        raise ValueError(f"Input array must be 1D: {arr.shape}")
-    if window_step >= len(arr):
+    if window_step >= len(contact_index) - 1:
         raise ValueError(f"Window step must be smaller than array length: "
-                         f"{window_step} > {len(arr)}")
+                         f"{window_step} > {len(contact_index) - 1}")
+
+    pairs, start, end = _bound_intervals(contact_index, contact_pairs)
+    second_diff = np.zeros(tau_max)
+
+    def add(lag: np.ndarray, weight) -> None:
+        keep = lag < tau_max
+        weight = np.broadcast_to(weight, lag.shape)
+        second_diff[:] += np.bincount(lag[keep], weights=weight[keep],
+                                      minlength=tau_max)[:tau_max]
+
+    # every interval with itself: L - lag for lag < L
+    length = end - start + 1
+    second_diff[0] += np.sum(length)
+    add(np.ones_like(length), -(length + 1.0))
+    add(length + 1, 1.0)
+
+    # pairs of intervals in the same stretch, d intervals apart
+    stretch = np.ones(len(pairs), dtype=bool)
+    stretch[1:] = (pairs[1:] != pairs[:-1]) \
+        | (start[1:] - end[:-1] - 1 > window_step)
+    stretch = np.cumsum(stretch)
+
+    a = np.arange(len(pairs))
+    d = 0
+    while len(a) > 0:
+        d += 1
+        a = a[a + d < len(pairs)]
+        b = a + d
+        keep = (stretch[a] == stretch[b]) & (start[b] - end[a] < tau_max)
+        a, b = a[keep], b[keep]
+
+        add(start[b] - end[a], 1.0)
+        add(start[b] - start[a] + 1, -1.0)
+        add(end[b] - end[a] + 1, -1.0)
+        add(end[b] - start[a] + 2, 1.0)
+
+    return np.cumsum(np.cumsum(second_diff))
 
-    # Pad array with ones so that diff can work properly
-    pad_arr = np.concatenate(([1], arr, [1]))
 
-    # Find all indices where pairing state changes
-    diff_arr = np.diff(pad_arr)
-
-    # Find indices of continuous unpaired events
-    idx_start = np.argwhere(diff_arr < 0)  # 1 --> 0
-    idx_end = np.argwhere(diff_arr > 0)    # 0 --> 1
-    duration = idx_end - idx_start
+@ nb.jit(nopython=True, parallel=True, nogil=True)
+def _fill_gaps(pair_states: np.ndarray, window_step: int) -> np.ndarray:
+    """
+    Replace, in place, every run of at most window_step unpaired (zero)
+    frames of every atom pair with ones. The frames before the start and
+    after the end of the trajectory count as paired. Atom pairs are
+    processed in parallel.
 
-    # Find continuous unpairing events that are recrossing events
-    pairs_recrossed = duration <= window_step
-    idx_start = idx_start[pairs_recrossed]
-    idx_end = idx_end[pairs_recrossed]
-    idx_end = idx_end[idx_end < len(arr)]
+    :param pair_states: 2D array (frame, pair) of ints, nonzero where the
+    atom pair exists
+    :type pair_states: np.ndarray
+    :param window_step: Maximum number of frames an atom pair can be
+    continuously unpaired and be considered a recrossing event
+    :type window_step: int
+    :return: pair_states with recrossing events replaced with ones
+    :rtype: np.ndarray
+    """
+    n_frames, n_pairs = np.shape(pair_states)
 
-    # Find all states that correspond to recrossing events
-    idx_recross = np.zeros(len(arr), dtype=int)
-    idx_recross[idx_start] = 1  # 1 at tart of the intervals
-    idx_recross[idx_end] -= 1   # -1 at one frame after end of the intervals
-    idx_recross = np.argwhere(np.cumsum(idx_recross))
+    for pair in nb.prange(n_pairs):  # pylint: disable=not-an-iterable
+        prev = -1
+        for frame in range(n_frames + 1):
+            if frame == n_frames or pair_states[frame, pair] != 0:
+                if frame - prev - 1 <= window_step:
+                    for gap in range(prev + 1, frame):
+                        pair_states[gap, pair] = 1
+                prev = frame
 
-    # replace data in original array with paired state
-    arr[idx_recross] = 1
-    return arr
+    return pair_states
 
 
 def _persistence(pair_states: np.ndarray, window_step: int) -> np.ndarray:
     """
-    Loops over all atom pairs and replaces recrossing events with ones to make
-    pair persistence easier to calculate.
+    Replaces recrossing events of all atom pairs with ones, in place, to make
+    pair persistence easier to calculate. Checks the window step and fills
+    the gaps of every column with `_fill_gaps`.
 
-    :param pair_states: 3D array (frame, atom_1, atom_2) of ints indicating
-    whether the atom pair (atom_1, atom_2) exists at the frame.
+    :param pair_states: 2D array (frame, pair) of ints indicating whether
+    each atom pair exists at the frame.
     :type pair_states: np.ndarray
     :param window_step: Maximum number of frames an atom pair can be
     continuously unpaired and be considered a recrossing event
     :type window_step: int
-    :return: 3D array (frame, atom_1, atom_2) of ints indicating whether
-    the atom pair (atom_1, atom_2) persists at the frame
+    :return: 2D array (frame, pair) of ints indicating whether each atom pair
+    persists at the frame
     """
-    _, n_ag1, n_ag2 = np.shape(pair_states)
-    results = np.zeros_like(pair_states)
-
-    for ag1 in range(n_ag1):
-        for ag2 in range(n_ag2):
-            results[:, ag1, ag2] = \
-                _replace_recrossing_events(
-                    pair_states[:, ag1, ag2], window_step)
-
-    return results
-
-u = mda.Universe(f'production_nve.data', 
-                 f'production_nve.dcd')
-
-ag1 = u.select_atoms("type 3")
-ag2 = u.select_atoms("type 4")
-
-IP = AutocorrelationAtomPair(ag1,ag2,1.5,int(sys.argv[2]))
-
-IP.run(step=2)
-
-IP.df.to_csv("ion_pair.csv")
\ No newline at end of file
+    n_frames = len(pair_states)
+    if window_step >= n_frames:
+        raise ValueError(f"Window step must be smaller than array length: "
+                         f"{window_step} > {n_frames}")
+
+    return _fill_gaps(pair_states, window_step)
+
+if __name__ == "__main__":
+    # pendants and ions, from the per-type store when there is one
+    u = load_universe('production_nve.data', 'production_nve.dcd',
+                      'production_nve_store', ["type_3", "type_4"])
+
+    ag1 = u.select_atoms("type 3")
+    ag2 = u.select_atoms("type 4")
+
+    IP = AutocorrelationAtomPair(ag1,ag2,1.5,int(sys.argv[2]),
+                                 n_threads=int(sys.argv[1]))
+
+    # split the frames over $CPU_THREADS processes, merged in frame order, and
+    # checkpoint every argv[3] frames (0: no checkpoint) to resume after a kill
+    n_workers = int(sys.argv[1])
+    checkpoint_block = int(sys.argv[3]) if len(sys.argv) > 3 else 0
+    if checkpoint_block > 0:
+        run_checkpointed(IP, "ion_pair_checkpoint", step=2,
+                         block=checkpoint_block, n_workers=n_workers)
+    else:
+        IP.run(step=2,
+               backend="multiprocessing" if n_workers > 1 else "serial",
+               n_workers=n_workers)
+
+    IP.df.to_csv("ion_pair.csv")
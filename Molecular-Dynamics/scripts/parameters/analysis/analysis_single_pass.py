@@ -0,0 +1,49 @@
+# Standard library
+import sys
+
+# Third-party packages
+import numpy as np
+
+# Local
+from mpec.single_pass import SinglePass
+from mpec.store import load_universe
+from analysis_cluster import ClusterAnalysis, NetworkTopology
+from analysis_crosslinking import CrossLinking
+from analysis_e2e import ChainRelaxation
+from analysis_ion_pair import AutocorrelationAtomPair
+
+
+# chains and ions, from the per-type store when there is one
+u = load_universe('production_nve.data', 'production_nve.dcd',
+                  'production_nve_store',
+                  ["type_1", "type_2", "type_3", "type_4"])
+
+polymer = u.select_atoms("type 1 2 3")
+nodes = u.select_atoms("type 1 2 3 4")
+metals = u.select_atoms("type 4")
+pendants = u.select_atoms("type 3")
+
+# every analysis of the NVE production, fed by one read of the trajectory;
+# the ion-pair correlation uses every other frame as in analysis_ion_pair.py
+IP = AutocorrelationAtomPair(pendants, metals, 1.5, int(sys.argv[2]),
+                             n_threads=int(sys.argv[1]), verbose=False)
+CL = CrossLinking(metals, pendants, int(sys.argv[3]), verbose=False)
+CA = ClusterAnalysis(nodes, metals, pendants, verbose=False)
+NT = NetworkTopology(metals, pendants, int(sys.argv[3]), contacts=CA,
+                     verbose=False)
+EE = ChainRelaxation(polymer, n_modes=int(sys.argv[4]),
+                     tau_max=int(sys.argv[5]) or None, verbose=False)
+
+SinglePass([IP, CL, CA, NT, EE], strides=[2, 1, 1, 1, 1]).run()
+
+IP.df.to_csv("ion_pair.csv")
+CL.df.to_csv("crosslinking.csv")
+CL.df_degree.to_csv("crosslinking_degree.csv")
+CL.df_motifs.to_csv("crosslinking_motifs.csv")
+CL.save_records("crosslinking.npz")
+CA.df.to_csv("cluster.csv")
+CA.save_sizes("cluster_size.npz")
+np.savetxt("cluster_size.txt", CA.df[["Step", "Largest"]].values, fmt="%d")
+NT.df.to_csv("network.csv")
+EE.df.to_csv("analysis_e2e.csv")
+EE.save("analysis_e2e")
@@ -0,0 +1,17 @@
+# Standard library
+import sys
+
+# MDAnalysis package
+import MDAnalysis as mda
+
+# Local
+from mpec.store import convert
+
+# one-time conversion of a trajectory into a per-type store, e.g.
+# python analysis_store.py production_nve.data production_nve.dcd production_nve_store 4
+u = mda.Universe(sys.argv[1], sys.argv[2])
+
+# blocks of frames are converted by argv[4] processes, each reading its
+# frames from the memory-mapped DCD
+n_workers = int(sys.argv[4]) if len(sys.argv) > 4 else 1
+convert(u, sys.argv[3], n_workers=n_workers)
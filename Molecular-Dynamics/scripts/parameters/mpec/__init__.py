@@ -0,0 +1,4 @@
+"""
+Helper package for building and analysing the Kremer-Grest
+metallo-polyelectrolyte systems simulated by the scripts in this folder.
+"""
@@ -0,0 +1,236 @@
+"""
+On-disk library of relaxed single-chain conformations. Systems that share
+a polymer architecture but differ in their ions reuse the stored chains,
+randomly rotated and translated, instead of growing and relaxing them
+again.
+"""
+# Standard library
+import os
+import tempfile
+import time
+
+# Third-party packages
+import numpy as np
+
+# Local
+from .chains import PENDANT, chain_sequence, grow_chains
+from .relax import soft_relax
+from .system import chain_bond_table
+
+
+def cache_key(sparsity: int, nmonomer: int, bond: float,
+              pendant_size: float) -> str:
+    """
+    Name of the library of one chain architecture.
+
+    :return: Key such as "S27-M12-B0.97-P1"
+    :rtype: str
+    """
+    return f"S{sparsity}-M{nmonomer}-B{bond:g}-P{pendant_size:g}"
+
+
+def random_rotations(n: int, rng: np.random.Generator) -> np.ndarray:
+    """
+    Uniformly distributed rotation matrices, from normalised random
+    quaternions.
+
+    :param n: Number of matrices
+    :type n: int
+    :param rng: Random number generator
+    :type rng: np.random.Generator
+    :return: 3D array (n, 3, 3)
+    :rtype: np.ndarray
+    """
+    q = rng.standard_normal((n, 4))
+    w, x, y, z = (q / np.linalg.norm(q, axis=1, keepdims=True)).T
+    return np.stack((
+        np.stack((1 - 2 * (y * y + z * z), 2 * (x * y - z * w),
+                  2 * (x * z + y * w)), axis=1),
+        np.stack((2 * (x * y + z * w), 1 - 2 * (x * x + z * z),
+                  2 * (y * z - x * w)), axis=1),
+        np.stack((2 * (x * z - y * w), 2 * (y * z + x * w),
+                  1 - 2 * (x * x + y * y)), axis=1)), axis=1)
+
+
+def grow_conformations(n: int, sequence: np.ndarray,
+                       rng: np.random.Generator, bond: float = 0.97,
+                       pendant_size: float = 1.0) -> np.ndarray:
+    """
+    Grow `n` isolated chains and remove their self-overlaps with
+    `soft_relax`. The chains are lined up far enough apart that they do not
+    see each other.
+
+    :return: 3D array (n, nbeads, 3) of conformations centred on their
+    centre of mass
+    :rtype: np.ndarray
+    """
+    chains = grow_chains(n, sequence, np.zeros(3), bond=bond,
+                         pendant_size=pendant_size, rng=rng)
+    chains -= chains.mean(axis=1, keepdims=True)
+    spacing = 2 * np.max(np.abs(chains)) + 4.0
+    chains[:, :, 0] += np.arange(n)[:, None] * spacing
+    box = np.array([n * spacing, spacing, spacing])
+
+    bonds, _ = chain_bond_table(sequence, 0, n)
+    sigma = np.where(np.tile(sequence, n) == PENDANT, pendant_size, 1.0)
+    relaxed, _, _ = soft_relax(chains.reshape(-1, 3), box, sigma, bonds,
+                               bond_length=bond, rng=rng)
+
+    relaxed = relaxed.reshape(chains.shape)
+    return relaxed - relaxed.mean(axis=1, keepdims=True)
+
+
+class ConformationCache:
+    """
+    Directory of conformation libraries, one `.npy` file per chain
+    architecture. Files are written to hidden temporary files and replaced
+    atomically so that parallel builds can share a directory, and the least
+    recently used libraries are deleted once the directory grows beyond
+    `budget` bytes.
+    """
+
+    def __init__(self, directory: str, budget: int = 1 << 30,
+                 stale: float = 3600.0):
+        """
+        :param directory: Cache directory, created if needed
+        :type directory: str
+        :param budget: Disk budget in bytes, defaults to 1 GiB
+        :type budget: int, optional
+        :param stale: Age in seconds after which a temporary file is taken
+        to be left over from a killed build and deleted, defaults to 3600
+        :type stale: float, optional
+        """
+        self.directory: str = directory
+        self.budget: int = budget
+        self.stale: float = stale
+        os.makedirs(directory, exist_ok=True)
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.directory, key + ".npy")
+
+    def load(self, key: str) -> np.ndarray:
+        """
+        Conformations stored under `key`, or None. Loading marks the library
+        as recently used.
+
+        :param key: Library key (see `cache_key`)
+        :type key: str
+        :return: 3D array (n_conformation, nbeads, 3) or None
+        :rtype: np.ndarray
+        """
+        path = self.path(key)
+        try:
+            conformations = np.load(path)
+        except (FileNotFoundError, ValueError):
+            return None
+        os.utime(path)
+        return conformations
+
+    def store(self, key: str, conformations: np.ndarray) -> None:
+        """
+        Save (or replace) a library, then evict old ones if over budget.
+
+        :param key: Library key (see `cache_key`)
+        :type key: str
+        :param conformations: 3D array (n_conformation, nbeads, 3)
+        :type conformations: np.ndarray
+        """
+        fd, tmp = tempfile.mkstemp(prefix=".", suffix=".tmp",
+                                   dir=self.directory)
+        with os.fdopen(fd, "wb") as f:
+            np.save(f, np.asarray(conformations, dtype=np.float32))
+        os.replace(tmp, self.path(key))
+        self.evict(keep=key)
+
+    def evict(self, keep: str = None) -> None:
+        """
+        Delete least recently used libraries until the cache fits its
+        budget. Temporary files are only deleted once they are `stale`, as
+        other builds may still be writing them.
+
+        :param keep: Key that must not be evicted, defaults to None
+        :type keep: str, optional
+        """
+        entries = []
+        now = time.time()
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            if name.endswith(".tmp"):
+                if now - stat.st_mtime > self.stale:
+                    try:
+                        os.remove(path)
+                    except FileNotFoundError:
+                        pass
+                continue
+            if not name.endswith(".npy") or name[:-4] == keep:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, name))
+
+        total = sum(size for _, size, _ in entries)
+        if keep is not None and os.path.exists(self.path(keep)):
+            total += os.path.getsize(self.path(keep))
+        for _, size, name in sorted(entries):
+            if total <= self.budget:
+                break
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except FileNotFoundError:
+                pass
+            total -= size
+
+    def chains(self, nchain: int, sparsity: int, nmonomer: int,
+               box: np.ndarray, rng: np.random.Generator,
+               bond: float = 0.97, pendant_size: float = 1.0,
+               library: int = 64, oversample: int = 4) -> np.ndarray:
+        """
+        Draw `nchain` chains from the library of an architecture, each
+        randomly rotated and placed with its centre of mass anywhere in the
+        box. Libraries are grown to at least `library` and `oversample` *
+        `nchain` conformations and stored first, so that builds of the same
+        architecture draw different subsets of the library.
+
+        :param nchain: Number of chains
+        :type nchain: int
+        :param sparsity: Number of backbone beads per monomer
+        :type sparsity: int
+        :param nmonomer: Number of monomers per chain
+        :type nmonomer: int
+        :param box: Box lengths (x, y, z)
+        :type box: np.ndarray
+        :param rng: Random number generator
+        :type rng: np.random.Generator
+        :param bond: Bond length, defaults to 0.97
+        :type bond: float, optional
+        :param pendant_size: Pendant diameter relative to the backbone
+        beads, defaults to 1.0
+        :type pendant_size: float, optional
+        :param library: Minimum library size, defaults to 64
+        :type library: int, optional
+        :param oversample: Minimum number of conformations per drawn chain,
+        defaults to 4
+        :type oversample: int, optional
+        :return: Unwrapped positions, shape (nchain, nbeads, 3)
+        :rtype: np.ndarray
+        """
+        key = cache_key(sparsity, nmonomer, bond, pendant_size)
+        sequence = chain_sequence(sparsity + 1, nmonomer)
+
+        conformations = self.load(key)
+        if conformations is None or conformations.shape[1] != len(sequence):
+            conformations = np.empty((0, len(sequence), 3), dtype=np.float32)
+
+        missing = max(library, oversample * nchain) - len(conformations)
+        if missing > 0:
+            conformations = np.concatenate((conformations, grow_conformations(
+                missing, sequence, rng, bond=bond,
+                pendant_size=pendant_size)))
+            self.store(key, conformations)
+
+        pick = rng.choice(len(conformations), nchain, replace=False)
+        rotated = np.einsum("cij,cbj->cbi", random_rotations(nchain, rng),
+                            conformations[pick].astype(float))
+        return rotated + rng.random((nchain, 1, 3)) * np.asarray(box, float)
@@ -0,0 +1,157 @@
+"""
+Batched construction of the pendant Kremer-Grest chains used in the
+metallo-polyelectrolyte gels.
+
+Bead types follow the convention of `initialize.py`:
+1 = alpha backbone bead, 2 = neutral backbone bead, 3 = pendant group.
+"""
+# Third-party packages
+import numpy as np
+
+# bead types along the chain
+ALPHA = 1
+NEUTRAL = 2
+PENDANT = 3
+
+
+def monomer_sequence(nbeads: int) -> np.ndarray:
+    """
+    Bead types of a single monomer. The alpha bead and its pendant sit in
+    the middle of the monomer with neutral backbone beads on either side.
+
+    :param nbeads: Number of beads in the monomer (including the pendant)
+    :type nbeads: int
+    :return: 1D array of bead types
+    :rtype: np.ndarray
+    """
+    if nbeads < 2:
+        raise ValueError(f"Monomer needs at least 2 beads: {nbeads}")
+
+    nlead = int((nbeads - 2) / 2)
+    return np.array([NEUTRAL] * nlead + [ALPHA, PENDANT]
+                    + [NEUTRAL] * (nbeads - 2 - nlead), dtype=np.int32)
+
+
+def chain_sequence(nbeads: int, nmonomers: int) -> np.ndarray:
+    """
+    Bead types of a whole chain, in atom ID order. Chains made of 3-bead
+    monomers get an extra neutral bead at the start.
+
+    :param nbeads: Number of beads in each monomer (including the pendant)
+    :type nbeads: int
+    :param nmonomers: Number of monomers per chain
+    :type nmonomers: int
+    :return: 1D array of bead types
+    :rtype: np.ndarray
+    """
+    sequence = np.tile(monomer_sequence(nbeads), nmonomers)
+    if nbeads == 3:
+        sequence = np.concatenate(([NEUTRAL], sequence)).astype(np.int32)
+    return sequence
+
+
+def grow_chains(nchain: int, sequence: np.ndarray, box: np.ndarray,
+                bond: float = 0.97, pendant_size: float = 1.0,
+                rng: np.random.Generator = None) -> np.ndarray:
+    """
+    Grow all chains at once as random walks. The backbone bond vectors are
+    drawn in a single call and summed along each chain, pendants are placed
+    orthogonal to the local backbone direction of their alpha bead.
+
+    :param nchain: Number of chains
+    :type nchain: int
+    :param sequence: Bead types of one chain (see `chain_sequence`)
+    :type sequence: np.ndarray
+    :param box: Box lengths (x, y, z) used to place the first bead of each
+    chain
+    :type box: np.ndarray
+    :param bond: Bond length, defaults to 0.97
+    :type bond: float, optional
+    :param pendant_size: Pendant diameter relative to the backbone beads,
+    scales the alpha-pendant bond, defaults to 1.0
+    :type pendant_size: float, optional
+    :param rng: Random number generator, defaults to a fresh
+    `np.random.default_rng()`
+    :type rng: np.random.Generator, optional
+    :return: Unwrapped positions, shape (nchain, len(sequence), 3)
+    :rtype: np.ndarray
+    """
+    if rng is None:
+        rng = np.random.default_rng()
+
+    sequence = np.asarray(sequence)
+    is_pendant = sequence == PENDANT
+    backbone = np.flatnonzero(~is_pendant)
+    pendant = np.flatnonzero(is_pendant)
+    nbackbone = len(backbone)
+    if nbackbone < 2:
+        raise ValueError("Chains need at least two backbone beads")
+    if np.any(sequence[pendant - 1] != ALPHA):
+        raise ValueError("Every pendant must directly follow an alpha bead")
+
+    # backbone: random start in the box plus cumulative sum of unit steps
+    steps = rng.standard_normal((nchain, nbackbone - 1, 3))
+    steps *= bond / np.linalg.norm(steps, axis=2, keepdims=True)
+    start = rng.random((nchain, 1, 3)) * np.asarray(box, dtype=float)
+
+    positions = np.empty((nchain, len(sequence), 3))
+    positions[:, backbone[0]] = start[:, 0]
+    positions[:, backbone[1:]] = start + np.cumsum(steps, axis=1)
+
+    # pendants: random vector with the component along the backbone removed
+    alpha = np.searchsorted(backbone, pendant - 1)
+    tangent = steps[:, np.minimum(alpha, nbackbone - 2)]
+    tangent /= bond
+    offset = rng.standard_normal((nchain, len(pendant), 3))
+    offset -= np.sum(offset * tangent, axis=2, keepdims=True) * tangent
+    offset *= bond * pendant_size / np.linalg.norm(offset, axis=2,
+                                                   keepdims=True)
+    positions[:, pendant] = positions[:, pendant - 1] + offset
+
+    return positions
+
+
+def chain_dimensions(positions: np.ndarray,
+                     sequence: np.ndarray) -> tuple:
+    """
+    Squared radius of gyration and squared end-to-end distance of every
+    chain. The end-to-end vector joins the first and last backbone beads.
+
+    :param positions: Unwrapped positions, shape (nchain, nbeads, 3)
+    :type positions: np.ndarray
+    :param sequence: Bead types of one chain
+    :type sequence: np.ndarray
+    :return: Arrays of Rg^2 and Ree^2, each of shape (nchain,)
+    :rtype: tuple
+    """
+    backbone = np.flatnonzero(np.asarray(sequence) != PENDANT)
+
+    rel = positions - positions.mean(axis=1, keepdims=True)
+    rg2 = np.einsum("cij,cij->c", rel, rel) / positions.shape[1]
+
+    ree = positions[:, backbone[-1]] - positions[:, backbone[0]]
+    ree2 = np.einsum("ci,ci->c", ree, ree)
+
+    return rg2, ree2
+
+
+def chain_bonds(sequence: np.ndarray) -> tuple:
+    """
+    Bonds within one chain, in the order they are listed in the data file.
+    Backbone beads are bonded to the next backbone bead (type 1) and alpha
+    beads to their pendant (type 2), which comes right after them.
+
+    :param sequence: Bead types of one chain
+    :type sequence: np.ndarray
+    :return: 2D array (n_bond, 2) of bead indices within the chain and 1D
+    array of bond types
+    :rtype: tuple
+    """
+    sequence = np.asarray(sequence)
+    first = np.arange(len(sequence) - 1)
+    bonded = first.copy()
+    bonded[sequence[:-1] == PENDANT] -= 1
+
+    pairs = np.column_stack((bonded, first + 1))
+    types = np.where(sequence[:-1] == ALPHA, 2, 1).astype(np.int32)
+    return pairs, types
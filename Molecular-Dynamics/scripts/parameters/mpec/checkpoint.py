@@ -0,0 +1,230 @@
+"""
+Checkpointing of long MDAnalysis analyses. Frames are analysed in blocks,
+every finished block is written to its own file in a checkpoint directory,
+and an interrupted run resumes after the last finished block. Every block
+is analysed by the public `analysis.run(frames=...)`, with `_conclude`
+skipped, and the blocks are merged with the aggregator of the analysis
+(`_get_aggregator`), the same way MDAnalysis merges the frame blocks of a
+parallel run.
+
+Analyses that carry state from one frame to the next (for example a
+streaming correlator) expose it through two optional methods,
+`_checkpoint_state()` returning a dict of arrays (or lists of 1D arrays)
+and `_restore_checkpoint_state(state)`.
+"""
+# Standard library
+import logging
+import os
+import shutil
+import tempfile
+
+# Third-party packages
+import numpy as np
+from MDAnalysis.analysis.results import Results
+
+logger = logging.getLogger("MDAnalysis.analysis.checkpoint")
+
+
+def pack(values: dict, prefix: str = "") -> dict:
+    """
+    Flatten a dict of arrays and lists of 1D arrays into arrays that
+    `np.savez` can store. A list is stored as its concatenation plus the
+    offsets of its items.
+
+    :param values: Values to store, e.g. the `results` of an analysis
+    :type values: dict
+    :param prefix: Prefix of the stored names, defaults to ""
+    :type prefix: str, optional
+    :return: Arrays by name
+    :rtype: dict
+    """
+    arrays = {}
+    for key, value in values.items():
+        if isinstance(value, list):
+            offsets = np.zeros(len(value) + 1, dtype=np.int64)
+            offsets[1:] = np.cumsum([len(v) for v in value])
+            arrays[f"{prefix}{key}.data"] = \
+                np.concatenate(value) if value else np.empty(0)
+            arrays[f"{prefix}{key}.offsets"] = offsets
+        else:
+            arrays[f"{prefix}{key}"] = np.asarray(value)
+    return arrays
+
+
+def unpack(arrays: dict, prefix: str = "") -> dict:
+    """
+    Undo `pack` for the names that start with `prefix`.
+
+    :param arrays: Arrays by name, e.g. a loaded `.npz` file
+    :type arrays: dict
+    :param prefix: Prefix of the stored names, defaults to ""
+    :type prefix: str, optional
+    :return: Values by key
+    :rtype: dict
+    """
+    values = {}
+    for name in arrays:
+        if not name.startswith(prefix) or name.endswith(".data"):
+            continue
+        key = name[len(prefix):]
+        if key.endswith(".offsets"):
+            key = key[:-len(".offsets")]
+            offsets = arrays[name]
+            data = arrays[f"{prefix}{key}.data"]
+            values[key] = [data[a:b]
+                           for a, b in zip(offsets[:-1], offsets[1:])]
+        else:
+            values[key] = arrays[name]
+    return values
+
+
+def _save(filename: str, arrays: dict) -> None:
+    """
+    Write a compressed `.npz` file atomically, so that an interrupted write
+    never leaves a truncated checkpoint behind.
+    """
+    fd, tmp = tempfile.mkstemp(suffix=".npz",
+                               dir=os.path.dirname(filename) or ".")
+    with os.fdopen(fd, "wb") as f:
+        np.savez_compressed(f, **arrays)
+    os.replace(tmp, filename)
+
+
+def _load(filename: str) -> dict:
+    with np.load(filename) as saved:
+        return {name: saved[name] for name in saved.files}
+
+
+def _skip() -> None:
+    """
+    Stands in for `_conclude` while single blocks are run.
+    """
+
+
+class _RestoringPrepare:
+    """
+    Stands in for `_prepare` while a block is run: the analysis' own
+    `_prepare`, then the state carried over from the previous block.
+    """
+
+    def __init__(self, analysis, state: dict):
+        self.analysis = analysis
+        self.state: dict = state
+
+    def __call__(self) -> None:
+        type(self.analysis)._prepare(self.analysis)
+        self.analysis._restore_checkpoint_state(self.state)
+
+
+def _run_block(analysis, frames: np.ndarray, state: dict, backend: str,
+               n_workers: int) -> tuple:
+    """
+    Analyse one block of frames with the public `analysis.run(frames=...)`,
+    without concluding and starting from the carried state.
+
+    :return: Results, frame numbers and times of the block
+    :rtype: tuple
+    """
+    analysis._conclude = _skip
+    if state:
+        analysis._prepare = _RestoringPrepare(analysis, state)
+    try:
+        analysis.run(frames=frames, backend=backend,
+                     n_workers=min(n_workers, len(frames)))
+    finally:
+        del analysis._conclude
+        analysis.__dict__.pop("_prepare", None)
+    return analysis.results, analysis.frames, analysis.times
+
+
+def run_checkpointed(analysis, directory: str, start: int = None,
+                     stop: int = None, step: int = None, block: int = 1000,
+                     backend: str = "multiprocessing", n_workers: int = 1,
+                     resume: bool = True, keep: bool = False):
+    """
+    Run an analysis like `analysis.run(start, stop, step)`, writing a
+    checkpoint after every `block` frames.
+
+    Every block is saved as `block_<k>.npz` and `state.npz` records how many
+    blocks are finished (plus the carried state of the analysis). A resumed
+    run must analyse the same frames with the same block size, otherwise the
+    checkpoint is discarded and the run starts over.
+
+    :param analysis: Analysis object (subclass of `AnalysisBase`)
+    :param directory: Checkpoint directory, created if needed
+    :type directory: str
+    :param start: First frame, defaults to None
+    :type start: int, optional
+    :param stop: Frame to stop at, defaults to None
+    :type stop: int, optional
+    :param step: Step between frames, defaults to None
+    :type step: int, optional
+    :param block: Number of frames per checkpoint, defaults to 1000
+    :type block: int, optional
+    :param backend: MDAnalysis backend used to split every block over
+    processes when n_workers > 1, defaults to "multiprocessing"
+    :type backend: str, optional
+    :param n_workers: Number of worker processes, defaults to 1
+    :type n_workers: int, optional
+    :param resume: Continue from an existing checkpoint, defaults to True
+    :type resume: bool, optional
+    :param keep: Keep the checkpoint directory after the analysis is
+    concluded, defaults to False
+    :type keep: bool, optional
+    :return: The concluded analysis
+    """
+    indexed = np.arange(len(analysis._trajectory))[start:stop:step]
+    chunks = [indexed[i:i + block] for i in range(0, len(indexed), block)]
+    carries_state = hasattr(analysis, "_checkpoint_state")
+    if not analysis.parallelizable:
+        n_workers = 1
+    if n_workers == 1:
+        backend = "serial"
+
+    os.makedirs(directory, exist_ok=True)
+    state_file = os.path.join(directory, "state.npz")
+    block_file = os.path.join(directory, "block_{:06d}.npz").format
+
+    done, state = 0, None
+    if resume and os.path.exists(state_file):
+        saved = _load(state_file)
+        if saved["block"] == block \
+                and np.array_equal(saved["frames"], indexed):
+            done = int(saved["done"])
+            state = unpack(saved, prefix="state.") if carries_state else None
+            logger.info(f"Resuming from {directory} after {done} of "
+                        f"{len(chunks)} blocks")
+        else:
+            logger.warning(f"Checkpoint in {directory} does not match this "
+                           f"run, starting over")
+
+    for k in range(done, len(chunks)):
+        results, frames, times = _run_block(analysis, chunks[k], state,
+                                            backend, n_workers)
+        _save(block_file(k),
+              {**pack(results), "_frames": frames, "_times": times})
+        state = analysis._checkpoint_state() if carries_state else None
+        _save(state_file, {**pack(state or {}, prefix="state."),
+                           "frames": indexed, "block": block,
+                           "done": k + 1})
+
+    # merge all blocks in frame order and conclude
+    blocks, frames, times = [], [], []
+    for k in range(len(chunks)):
+        saved = _load(block_file(k))
+        frames.append(saved.pop("_frames"))
+        times.append(saved.pop("_times"))
+        blocks.append(Results(**unpack(saved)))
+
+    analysis.n_frames = len(indexed)
+    analysis.frames = np.hstack(frames) if frames else np.zeros(0, dtype=int)
+    analysis.times = np.hstack(times) if times else np.zeros(0)
+    if blocks:
+        analysis.results = analysis._get_aggregator().merge(blocks)
+    if state:
+        analysis._restore_checkpoint_state(state)
+    analysis._conclude()
+
+    if not keep:
+        shutil.rmtree(directory)
+    return analysis
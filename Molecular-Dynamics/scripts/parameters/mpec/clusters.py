@@ -0,0 +1,249 @@
+"""
+Clusters of particles joined by edges (bonds and ion-pendant contacts):
+connected components from a vectorised union-find, and a percolation test
+that tells whether a cluster wraps around the periodic box.
+"""
+# Third-party packages
+import numpy as np
+
+# Local
+from .pbc import box_matrix, minimum_image
+
+
+def union_find(n: int, i: np.ndarray, j: np.ndarray) -> np.ndarray:
+    """
+    Root of every node of the graph with edges (i, j). All edges are
+    processed at once: every round hooks the larger root of each edge onto
+    the smaller one and then compresses all paths by pointer jumping, so the
+    number of rounds grows only logarithmically with the cluster size.
+
+    :param n: Number of nodes
+    :type n: int
+    :param i: 1D array of the first node of every edge
+    :type i: np.ndarray
+    :param j: 1D array of the second node of every edge
+    :type j: np.ndarray
+    :return: 1D array (n) of roots, the smallest node of every component
+    :rtype: np.ndarray
+    """
+    parent = np.arange(n)
+    i = np.asarray(i, dtype=np.int64)
+    j = np.asarray(j, dtype=np.int64)
+
+    while True:
+        ri, rj = parent[i], parent[j]
+        split = ri != rj
+        if not np.any(split):
+            return parent
+        i, j = i[split], j[split]
+        lo = np.minimum(ri[split], rj[split])
+        hi = np.maximum(ri[split], rj[split])
+        np.minimum.at(parent, hi, lo)
+
+        # pointer jumping until every node points at its root
+        while True:
+            grand = parent[parent]
+            if np.array_equal(grand, parent):
+                break
+            parent = grand
+
+
+def cluster_labels(n: int, i: np.ndarray, j: np.ndarray) -> tuple:
+    """
+    Label the connected components of a graph 0, 1, ... in the order of
+    their smallest node.
+
+    :param n: Number of nodes
+    :type n: int
+    :param i: 1D array of the first node of every edge
+    :type i: np.ndarray
+    :param j: 1D array of the second node of every edge
+    :type j: np.ndarray
+    :return: 1D array (n) of cluster labels and 1D array of cluster sizes
+    :rtype: tuple
+    """
+    _, labels, sizes = np.unique(union_find(n, i, j), return_inverse=True,
+                                 return_counts=True)
+    return labels, sizes
+
+
+def percolation(positions: np.ndarray, box: np.ndarray, i: np.ndarray,
+                j: np.ndarray, labels: np.ndarray) -> np.ndarray:
+    """
+    Find the clusters that wrap around the periodic box. Every cluster is
+    unwrapped by a breadth-first walk from its first node along the
+    minimum-image edges. A cluster wraps around a box direction if, after
+    that, some edge still has to cross the box to reach its other end, i.e.
+    the cluster is connected to its own periodic image.
+
+    Edges must be shorter than half the box.
+
+    :param positions: 2D array (n, 3) of positions
+    :type positions: np.ndarray
+    :param box: Box lengths, MDAnalysis dimensions or box matrix
+    :type box: np.ndarray
+    :param i: 1D array of the first node of every edge
+    :type i: np.ndarray
+    :param j: 1D array of the second node of every edge
+    :type j: np.ndarray
+    :param labels: Cluster label of every node (see `cluster_labels`)
+    :type labels: np.ndarray
+    :return: 2D array (n_cluster, 3) of booleans, whether every cluster
+    wraps around each box vector
+    :rtype: np.ndarray
+    """
+    positions = np.asarray(positions, dtype=float)
+    i = np.asarray(i, dtype=np.int64)
+    j = np.asarray(j, dtype=np.int64)
+    n = len(positions)
+    n_cluster = int(labels.max()) + 1 if n else 0
+    delta = minimum_image(positions[j] - positions[i], box)
+
+    # both directions of every edge, grouped by source node (CSR)
+    source = np.concatenate((i, j))
+    target = np.concatenate((j, i))
+    step = np.concatenate((delta, -delta))
+    order = np.argsort(source, kind="stable")
+    source, target, step = source[order], target[order], step[order]
+    indptr = np.searchsorted(source, np.arange(n + 1))
+
+    # breadth-first walk from the first node of every cluster
+    unwrapped = positions.copy()
+    _, frontier = np.unique(labels, return_index=True)
+    visited = np.zeros(n, dtype=bool)
+    visited[frontier] = True
+    while len(frontier) > 0:
+        start, stop = indptr[frontier], indptr[frontier + 1]
+        count = stop - start
+        edges = np.repeat(stop - np.cumsum(count), count) \
+            + np.arange(np.sum(count))
+        edges = edges[~visited[target[edges]]]
+
+        frontier, first = np.unique(target[edges], return_index=True)
+        edges = edges[first]
+        unwrapped[frontier] = unwrapped[source[edges]] + step[edges]
+        visited[frontier] = True
+
+    # edges that still cross the box after unwrapping
+    mismatch = unwrapped[j] - unwrapped[i] - delta
+    shift = np.round(mismatch @ np.linalg.inv(box_matrix(box))) != 0
+    spans = np.zeros((n_cluster, 3), dtype=bool)
+    for axis in range(3):
+        spans[labels[i[shift[:, axis]]], axis] = True
+    return spans
+
+
+class NetworkTracker:
+    """
+    Connected components of a graph whose edges change a little from one
+    frame to the next. The sorted edge keys and the adjacency of every node
+    are kept across frames and only the edge events are applied: a formed
+    edge merges two components by relabelling the smaller one, and a
+    component that lost an edge is walked from its member list to find the
+    pieces it split into.
+
+    A frame of E edges costs O(E log E) in NumPy, to sort its edge keys and
+    to find the formed and broken ones by binary search in the keys of the
+    previous frame. The Python loops only run over the events and the
+    components they touch, so they do not depend on E or on the number of
+    nodes.
+    """
+
+    def __init__(self, n: int):
+        """
+        :param n: Number of nodes
+        :type n: int
+        """
+        self.n: int = n
+        self.labels: np.ndarray = np.arange(n)
+        # sorted edges as min * n + max, and the neighbours of every node
+        self.keys: np.ndarray = np.empty(0, dtype=np.int64)
+        self.adjacency: list = [set() for _ in range(n)]
+        # nodes of every component; a label missing here is a single node,
+        # the one with the same index
+        self.members: dict = {}
+        self._next: int = n
+
+    def _members(self, label: int) -> list:
+        return self.members.get(label, [label])
+
+    def update(self, i: np.ndarray, j: np.ndarray) -> tuple:
+        """
+        Replace the edges by those of the next frame.
+
+        :param i: 1D array of the first node of every edge
+        :type i: np.ndarray
+        :param j: 1D array of the second node of every edge
+        :type j: np.ndarray
+        :return: Number of formed edges, broken edges, cluster merges and
+        cluster splits
+        :rtype: tuple
+        """
+        n = self.n
+        i = np.asarray(i, dtype=np.int64)
+        j = np.asarray(j, dtype=np.int64)
+        keys = np.unique(np.minimum(i, j) * n + np.maximum(i, j))
+
+        # diff of the sorted keys of this frame and the previous one
+        index = np.searchsorted(self.keys, keys)
+        found = index < len(self.keys)
+        found[found] = self.keys[index[found]] == keys[found]
+        kept = np.zeros(len(self.keys), dtype=bool)
+        kept[index[found]] = True
+        formed = keys[~found].tolist()
+        broken = self.keys[~kept].tolist()
+        self.keys = keys
+
+        # walk the components that lost an edge along their kept edges
+        splits = 0
+        affected = set()
+        for key in broken:
+            a, b = divmod(key, n)
+            self.adjacency[a].discard(b)
+            self.adjacency[b].discard(a)
+            affected.add(int(self.labels[a]))
+        for label in affected:
+            pieces, seen = [], set()
+            for node in self._members(label):
+                if node in seen:
+                    continue
+                seen.add(node)
+                piece, stack = [node], [node]
+                while stack:
+                    for other in self.adjacency[stack.pop()]:
+                        if other not in seen:
+                            seen.add(other)
+                            piece.append(other)
+                            stack.append(other)
+                pieces.append(piece)
+            if len(pieces) == 1:
+                continue
+
+            # the largest piece keeps the label
+            splits += len(pieces) - 1
+            pieces.sort(key=len, reverse=True)
+            self.members[label] = pieces[0]
+            for piece in pieces[1:]:
+                self.labels[piece] = self._next
+                self.members[self._next] = piece
+                self._next += 1
+
+        # join the components connected by new edges, the smaller one takes
+        # the label of the larger one
+        merges = 0
+        for key in formed:
+            a, b = divmod(key, n)
+            self.adjacency[a].add(b)
+            self.adjacency[b].add(a)
+            la, lb = int(self.labels[a]), int(self.labels[b])
+            if la == lb:
+                continue
+            big, small = self._members(la), self._members(lb)
+            if len(big) < len(small):
+                la, lb, big, small = lb, la, small, big
+            self.labels[small] = la
+            self.members[la] = big + small
+            self.members.pop(lb, None)
+            merges += 1
+
+        return len(formed), len(broken), merges, splits
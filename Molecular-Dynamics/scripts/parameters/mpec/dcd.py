@@ -0,0 +1,312 @@
+"""
+Random access to the frames of a DCD trajectory. A persistent index of the
+byte offset of every frame is stored next to the DCD, and the file is
+memory-mapped, so any process can jump to any frame without decoding the
+frames before it and all processes reading the same file share its page
+cache.
+
+The DCD stores the x, y and z coordinates of a frame as three separate
+arrays, which `MappedDCD.xyz` returns as zero-copy views of the file (for
+all atoms or a contiguous range of them). Positions as (atoms, 3) rows are
+always copies.
+
+`MappedDCDReader` exposes a `MappedDCD` to MDAnalysis, so that the worker
+processes of a parallel analysis jump straight to their frames.
+"""
+# Standard library
+import os
+
+# Third-party packages
+import numpy as np
+
+# MDAnalysis package
+from MDAnalysis import units as mdaunits
+from MDAnalysis.coordinates.base import ReaderBase
+
+# Local
+from .checkpoint import _load, _save
+
+# bytes of a Fortran record marker
+_MARKER = 4
+
+
+def index_filename(filename: str) -> str:
+    """
+    Name of the frame index of a DCD, e.g. run.dcd -> run.dcd.index.npz.
+    """
+    return f"{filename}.index.npz"
+
+
+def build_index(filename: str) -> dict:
+    """
+    Read the header of a DCD and find the byte offset of every complete
+    frame. All frames of a DCD written by LAMMPS have the same size, and the
+    record markers of every frame are checked. A truncated last frame (e.g.
+    from a run that was killed) is left out.
+
+    :param filename: DCD file
+    :type filename: str
+    :return: Index arrays: offsets (n_frames), n_atoms, has_box,
+    byteorder, istart, nsavc, delta, plus size and mtime of the file
+    :rtype: dict
+    """
+    data = np.memmap(filename, dtype=np.uint8, mode="r")
+    if len(data) < 92:
+        raise ValueError(f"{filename} is too short to be a DCD file")
+
+    # byte order from the marker of the first record (84 bytes)
+    byteorder = "<" if np.frombuffer(data, "<i4", 1)[0] == 84 else ">"
+    i4 = np.dtype(f"{byteorder}i4")
+
+    def marker(offset: int) -> int:
+        return int(np.frombuffer(data, i4, 1, offset)[0])
+
+    if marker(0) != 84 or bytes(data[4:8]) != b"CORD":
+        raise ValueError(f"{filename} is not a DCD file")
+    icntrl = np.frombuffer(data, i4, 20, 8)
+    delta = float(np.frombuffer(data, f"{byteorder}f4", 1, 8 + 9 * 4)[0])
+    has_box, four_dims = bool(icntrl[10]), bool(icntrl[11])
+    if icntrl[8] != 0:
+        raise ValueError("DCD files with fixed atoms are not supported")
+
+    # title record, then number of atoms
+    offset = 84 + 2 * _MARKER
+    offset += marker(offset) + 2 * _MARKER
+    n_atoms = marker(offset + _MARKER)
+    header = offset + 4 + 2 * _MARKER
+
+    # records of one frame: unit cell, then x, y, z (and w)
+    records = ([48] if has_box else []) \
+        + [4 * n_atoms] * (4 if four_dims else 3)
+    frame_size = sum(r + 2 * _MARKER for r in records)
+    n_frames = (len(data) - header) // frame_size
+    offsets = header + frame_size * np.arange(n_frames, dtype=np.int64)
+
+    # check the leading marker of every record of every frame
+    start = 0
+    for size in records:
+        heads = data[(offsets + start)[:, None] + np.arange(4)]
+        if np.any(heads.copy().view(i4).ravel() != size):
+            raise ValueError(f"{filename} has frames of different sizes")
+        start += size + 2 * _MARKER
+
+    stat = os.stat(filename)
+    return {"offsets": offsets, "n_atoms": n_atoms, "has_box": has_box,
+            "four_dims": four_dims, "byteorder": byteorder,
+            "istart": int(icntrl[1]), "nsavc": int(icntrl[2]),
+            "delta": delta, "size": stat.st_size,
+            "mtime": stat.st_mtime_ns}
+
+
+def load_index(filename: str, rebuild: bool = False) -> dict:
+    """
+    Frame index of a DCD, read from the index file next to it. The index
+    is (re)built and saved when it is missing, or when the DCD has changed
+    since (e.g. a restarted run appended frames).
+
+    :param filename: DCD file
+    :type filename: str
+    :param rebuild: Always rebuild the index, defaults to False
+    :type rebuild: bool, optional
+    :return: Index arrays, see `build_index`
+    :rtype: dict
+    """
+    path = index_filename(filename)
+    stat = os.stat(filename)
+    if not rebuild and os.path.exists(path):
+        index = _load(path)
+        if index["size"] == stat.st_size \
+                and index["mtime"] == stat.st_mtime_ns:
+            return index
+
+    index = build_index(filename)
+    _save(path, index)
+    return index
+
+
+def frame_step(trajectory, frame: int) -> int:
+    """
+    MD time step of a frame of an MDAnalysis trajectory, from the first step
+    and the steps between frames in the DCD header, or from the steps of a
+    `MappedDCDReader` or `mpec.store.StoreReader`. For other formats the
+    frame number is returned.
+
+    :param trajectory: MDAnalysis trajectory reader
+    :param frame: Frame number
+    :type frame: int
+    :return: Time step
+    :rtype: int
+    """
+    steps = getattr(trajectory, "steps", None)
+    if steps is not None:
+        return int(steps[frame])
+    header = getattr(getattr(trajectory, "_file", None), "header", None)
+    if not isinstance(header, dict) or "nsavc" not in header:
+        return frame
+    return int(header["istart"]) + frame * int(header["nsavc"])
+
+
+class MappedDCD:
+    """
+    Memory-mapped DCD trajectory with random access to its frames. Several
+    processes can read disjoint frame ranges of the same file at once.
+    """
+
+    def __init__(self, filename: str):
+        """
+        :param filename: DCD file, indexed on first use
+        :type filename: str
+        """
+        index = load_index(filename)
+        self.filename: str = filename
+        self.offsets: np.ndarray = index["offsets"]
+        self.n_atoms: int = int(index["n_atoms"])
+        self.n_frames: int = len(self.offsets)
+        self.has_box: bool = bool(index["has_box"])
+        # time step and interval between frames, as written by LAMMPS
+        self.delta: float = float(index["delta"])
+        self.nsavc: int = int(index["nsavc"])
+        self.istart: int = int(index["istart"])
+
+        byteorder = str(index["byteorder"])
+        self._f4 = np.dtype(f"{byteorder}f4")
+        self._f8 = np.dtype(f"{byteorder}f8")
+        self._data = np.memmap(filename, dtype=np.uint8, mode="r")
+
+    def __len__(self) -> int:
+        return self.n_frames
+
+    def __getstate__(self) -> dict:
+        # the file is mapped again by the receiving process, not copied
+        state = self.__dict__.copy()
+        del state["_data"]
+        return state
+
+    def __setstate__(self, state: dict) -> None:
+        self.__dict__.update(state)
+        self._data = np.memmap(self.filename, dtype=np.uint8, mode="r")
+
+    def _coordinate(self, k: int, axis: int, start: int,
+                    stop: int) -> np.ndarray:
+        offset = self.offsets[k] + _MARKER \
+            + (48 + 2 * _MARKER if self.has_box else 0) \
+            + axis * (4 * self.n_atoms + 2 * _MARKER) + 4 * start
+        return np.frombuffer(self._data, self._f4, stop - start, offset)
+
+    def xyz(self, k: int, atoms: slice = None) -> tuple:
+        """
+        Coordinates of frame k as zero-copy, read-only views of the file.
+
+        :param k: Frame index
+        :type k: int
+        :param atoms: Contiguous range of atoms (slice without step),
+        defaults to None (all)
+        :type atoms: slice, optional
+        :return: 1D arrays (atoms) of x, y and z
+        :rtype: tuple
+        """
+        start, stop, step = (atoms or slice(None)).indices(self.n_atoms)
+        if step != 1:
+            raise ValueError("only contiguous ranges of atoms are views")
+        stop = max(start, stop)
+        return tuple(self._coordinate(k, axis, start, stop)
+                     for axis in range(3))
+
+    def positions(self, k: int, indices: np.ndarray = None) -> np.ndarray:
+        """
+        Positions of frame k, of all atoms or only of the selected ones.
+        The result is always a copy, as the x, y and z of an atom are apart
+        in the file; only the selected coordinates are read. Use `xyz` for
+        views of a contiguous range of atoms.
+
+        :param k: Frame index
+        :type k: int
+        :param indices: Atom indices (or a slice), defaults to None (all)
+        :type indices: np.ndarray, optional
+        :return: 2D array (atoms, 3)
+        :rtype: np.ndarray
+        """
+        if indices is None:
+            indices = slice(None)
+        return np.stack([c[indices] for c in self.xyz(k)], axis=-1)
+
+    def dimensions(self, k: int) -> np.ndarray:
+        """
+        Box of frame k in MDAnalysis order [a, b, c, alpha, beta, gamma].
+        LAMMPS stores the cosines of the angles, which are converted to
+        degrees.
+
+        :param k: Frame index
+        :type k: int
+        :return: 1D array (6)
+        :rtype: np.ndarray
+        """
+        if not self.has_box:
+            return None
+        cell = np.frombuffer(self._data, self._f8, 6,
+                             self.offsets[k] + _MARKER)
+        angles = cell[[4, 3, 1]]
+        if np.all(np.abs(angles) <= 1):
+            angles = np.degrees(np.arccos(angles))
+        return np.concatenate((cell[[0, 2, 5]], angles))
+
+    def step(self, k: int) -> int:
+        """
+        MD time step of frame k.
+        """
+        return self.istart + k * self.nsavc
+
+
+class MappedDCDReader(ReaderBase):
+    """
+    MDAnalysis reader of a DCD through a `MappedDCD`. Frames are located
+    from the persistent index instead of a file position, so processes of a
+    parallel analysis (which receive a pickled copy of the reader) map the
+    file and read their frames without decoding anything before them. Times
+    and boxes are those of the MDAnalysis `DCDReader`.
+    """
+    units = {"time": "AKMA", "length": "Angstrom"}
+
+    def __init__(self, filename: str, dt: float = None, **kwargs):
+        """
+        :param filename: DCD file, indexed on first use
+        :type filename: str
+        :param dt: Time between frames in ps, defaults to None (from the
+        header)
+        :type dt: float, optional
+        """
+        super(MappedDCDReader, self).__init__(filename, **kwargs)
+        self._dcd: MappedDCD = MappedDCD(self.filename)
+        self.n_atoms: int = self._dcd.n_atoms
+        self.n_frames: int = self._dcd.n_frames
+        # MD time step of every frame, see `frame_step`
+        self.steps: np.ndarray = self._dcd.istart \
+            + self._dcd.nsavc * np.arange(self.n_frames, dtype=np.int64)
+        if dt is None:
+            dt = mdaunits.convert(self._dcd.delta, self.units["time"],
+                                  "ps") * self._dcd.nsavc
+        self._ts_kwargs["dt"] = dt
+
+        self.ts = self._Timestep(self.n_atoms, **self._ts_kwargs)
+        self._read_frame(0)
+
+    def _read_frame(self, frame: int):
+        if not 0 <= frame < self.n_frames:
+            raise IOError(f"frame {frame} is not in {self.filename}")
+        ts = self.ts
+        ts.frame = frame
+        for axis, coordinate in enumerate(self._dcd.xyz(frame)):
+            ts.positions[:, axis] = coordinate
+        ts.dimensions = self._dcd.dimensions(frame)
+        ts.time = (frame + self._dcd.istart / max(self._dcd.nsavc, 1)) \
+            * ts.dt
+        ts.data["step"] = self.steps[frame]
+        return ts
+
+    def _read_next_timestep(self, ts=None):
+        if self.ts.frame + 1 >= self.n_frames:
+            raise IOError("trying to go over trajectory limit")
+        return self._read_frame(self.ts.frame + 1)
+
+    def _reopen(self) -> None:
+        self.ts.frame = -1
@@ -0,0 +1,119 @@
+"""
+Parallel generation of independent replicas of one system. Every replica
+draws from its own stream spawned from a single `np.random.SeedSequence`,
+so an ensemble is reproducible from one seed and replicas never share
+random numbers.
+"""
+# Standard library
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+# Third-party packages
+import numpy as np
+
+# Local
+from .lammps_data import TITLE, save_npz, write_data
+from .system import build_system
+
+
+def seed_label(seed: np.random.SeedSequence) -> str:
+    """
+    Text that identifies a seed sequence, recorded in the data file title.
+    `np.random.SeedSequence(entropy, spawn_key=spawn)` rebuilds the stream.
+
+    :param seed: Seed sequence of one build
+    :type seed: np.random.SeedSequence
+    :return: "seed <entropy>" followed by " spawn <key>" for replicas
+    :rtype: str
+    """
+    label = f"seed {seed.entropy}"
+    if seed.spawn_key:
+        label += " spawn " + ",".join(str(k) for k in seed.spawn_key)
+    return label
+
+
+def replica_filename(filename: str, replica: int, nreplica: int) -> str:
+    """
+    Name of the file of one replica, e.g. input.data -> input_007.data.
+
+    :param filename: File name of a single build
+    :type filename: str
+    :param replica: Replica index
+    :type replica: int
+    :param nreplica: Number of replicas, sets the zero padding
+    :type nreplica: int
+    :return: File name of the replica
+    :rtype: str
+    """
+    stem, ext = os.path.splitext(filename)
+    width = max(3, len(str(nreplica - 1)))
+    return f"{stem}_{replica:0{width}d}{ext}"
+
+
+def write_system(filename: str, seed: np.random.SeedSequence,
+                 sidecar: bool = False, **kwargs) -> tuple:
+    """
+    Build one system from a seed sequence and write it to a data file whose
+    title records the seed.
+
+    :param filename: Path of the data file
+    :type filename: str
+    :param seed: Seed sequence of the build
+    :type seed: np.random.SeedSequence
+    :param sidecar: Also save a `.npz` file next to the data file, defaults
+    to False
+    :type sidecar: bool, optional
+    :param kwargs: Arguments of `build_system` (except `seed`)
+    :return: File name, seed label and the built system
+    :rtype: tuple
+    """
+    system = build_system(seed=seed, **kwargs)
+    label = seed_label(seed)
+
+    write_data(filename, system, title=f"{TITLE} {label}")
+    if sidecar:
+        save_npz(os.path.splitext(filename)[0] + ".npz", system)
+    return filename, label, system
+
+
+def _write_replica(job: tuple) -> tuple:
+    """
+    Process pool worker, returns a summary instead of the whole system.
+    """
+    filename, seed, sidecar, kwargs = job
+    _, label, system = write_system(filename, seed, sidecar=sidecar, **kwargs)
+    return filename, label, float(np.mean(system.rg2)), \
+        float(np.mean(system.ree2))
+
+
+def build_ensemble(nreplica: int, filename: str, seed: int = None,
+                   processes: int = None, sidecar: bool = False,
+                   **kwargs) -> list:
+    """
+    Build `nreplica` independent replicas in a process pool and write each
+    to its own data file (see `replica_filename`).
+
+    :param nreplica: Number of replicas
+    :type nreplica: int
+    :param filename: File name of a single build, replica files are
+    derived from it
+    :type filename: str
+    :param seed: Root seed, defaults to None (fresh entropy, still recorded
+    in every file)
+    :type seed: int, optional
+    :param processes: Number of worker processes, defaults to the number of
+    CPUs
+    :type processes: int, optional
+    :param sidecar: Also save `.npz` files, defaults to False
+    :type sidecar: bool, optional
+    :param kwargs: Arguments of `build_system` (except `seed`)
+    :return: (file name, seed label, <Rg^2>, <Ree^2>) of every replica, in
+    replica order
+    :rtype: list
+    """
+    seeds = np.random.SeedSequence(seed).spawn(nreplica)
+    jobs = [(replica_filename(filename, i, nreplica), s, sidecar, kwargs)
+            for i, s in enumerate(seeds)]
+
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        return list(pool.map(_write_replica, jobs))
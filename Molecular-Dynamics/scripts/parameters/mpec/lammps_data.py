@@ -0,0 +1,252 @@
+"""
+Output of built systems as LAMMPS data files (atom_style full) and as
+compact NumPy sidecar files, plus a streaming writer that builds very large
+systems block by block.
+"""
+# Third-party packages
+import numpy as np
+
+# Local
+from .chains import chain_dimensions, grow_chains
+from .pbc import wrap
+from .system import (COION, COUNTERION, System, chain_bond_table,
+                     chain_topology, composition)
+
+# line formats of the Atoms and Bonds sections
+ATOM_FORMAT = "%6i %6i %2i %6.2f %9.4f %9.4f %9.4f %6i %6i %6i\n"
+BOND_FORMAT = "%8i  %i %8i %8i\n"
+
+# default first line of the data files
+TITLE = "#Ionomers PJW 8/2022"
+
+
+def _write_block(f, fmt: str, table: np.ndarray,
+                 chunk: int = 100000) -> None:
+    """
+    Format a table with one `%` operation per chunk of rows instead of one
+    per row.
+
+    :param f: Open text file
+    :param fmt: Format of a single row
+    :type fmt: str
+    :param table: 2D array, one row per line (integer columns stored as
+    floats are exact as long as they fit in a float64 mantissa)
+    :type table: np.ndarray
+    :param chunk: Number of rows formatted at once, defaults to 100000
+    :type chunk: int, optional
+    """
+    for lo in range(0, len(table), chunk):
+        block = table[lo:lo + chunk]
+        f.write((fmt * len(block)) % tuple(block.ravel().tolist()))
+
+
+def header(n_atoms: int, n_bonds: int, box: np.ndarray,
+           diameters: np.ndarray, title: str = TITLE) -> str:
+    """
+    Everything of a data file that comes before the Atoms section.
+
+    :param n_atoms: Number of atoms
+    :type n_atoms: int
+    :param n_bonds: Number of bonds
+    :type n_bonds: int
+    :param box: Box lengths, the box is centred on the origin
+    :type box: np.ndarray
+    :param diameters: LJ diameter of every atom type (index 0 is type 1)
+    :type diameters: np.ndarray
+    :param title: First line of the file, defaults to `TITLE`
+    :type title: str, optional
+    :return: Header text
+    :rtype: str
+    """
+    hx2, hy2, hz2 = np.asarray(box) / 2
+    masses = "".join("%i 1\n" % itype
+                     for itype in range(1, len(diameters) + 1))
+
+    return (
+        f"{title.replace('%', '%%')}\n"
+        "\n"
+        "%10i    atoms\n"
+        "%10i    bonds\n"
+        "%10i    angles\n"
+        "%10i    dihedrals\n"
+        "%10i    impropers\n"
+        "\n"
+        "%10i    atom types\n"
+        "%10i    bond types\n"
+        "\n"
+        " %16.8f %16.8f   xlo xhi\n"
+        " %16.8f %16.8f   ylo yhi\n"
+        " %16.8f %16.8f   zlo zhi\n"
+        "\n"
+        "Masses\n"
+        "\n"
+        f"{masses}"
+        "\n"
+        "Pair Coeffs # lj/cut/coul/long\n"
+        "\n"
+        "1 1 1\n"
+        "2 1 1\n"
+        "3 1 1\n"
+        "4 1 %0.2f\n"
+        "5 1 %0.1f\n"
+        "\n"
+        "Bond Coeffs # fene\n"
+        "\n"
+        "1 30 1.5 1 1\n"
+        "2 30 1.5 1 1\n"
+        "\n"
+    ) % (n_atoms, n_bonds, 0, 0, 0,
+         len(diameters), 2,
+         -hx2, hx2, -hy2, hy2, -hz2, hz2,
+         diameters[3], diameters[4])
+
+
+def write_data(filename: str, system: System,
+               title: str = TITLE) -> None:
+    """
+    Write a system to a LAMMPS data file.
+
+    :param filename: Path of the data file
+    :type filename: str
+    :param system: System to write
+    :type system: System
+    :param title: First line of the file, defaults to `TITLE`
+    :type title: str, optional
+    """
+    atoms = np.column_stack((
+        np.arange(1, system.n_atoms + 1), system.molecules, system.types,
+        system.charges, system.positions, system.images))
+    bonds = np.column_stack((
+        np.arange(1, system.n_bonds + 1), system.bond_types,
+        system.bonds + 1)).astype(np.int64)
+
+    with open(filename, "w") as f:
+        f.write(header(system.n_atoms, system.n_bonds, system.box,
+                       system.diameters, title=title))
+        f.write("Atoms\n\n")
+        _write_block(f, ATOM_FORMAT, atoms)
+        f.write("\nBonds\n\n")
+        _write_block(f, BOND_FORMAT, bonds)
+
+
+def _write_atoms(f, first: int, positions: np.ndarray, box: np.ndarray,
+                 types: np.ndarray, charges: np.ndarray,
+                 molecules: np.ndarray) -> None:
+    """
+    Wrap a block of atoms built in [0, box) and write their Atoms lines,
+    `first` being the index (0-based) of the first atom.
+    """
+    positions, images = wrap(positions - box / 2, box, origin=-box / 2)
+    _write_block(f, ATOM_FORMAT, np.column_stack((
+        np.arange(first + 1, first + len(types) + 1), molecules, types,
+        charges, positions, images)))
+
+
+def stream_data(filename: str, nchain: int, sparsity: int, nmonomer: int,
+                nmetal: int, metal_charge: int, metal_diameter: float,
+                density: float, seed: int = None, bond: float = 0.97,
+                pendant_size: float = 1.0, coion_diameter: float = 0.5,
+                block: int = 1000, title: str = TITLE) -> tuple:
+    """
+    Build a system like `build_system` (without overlap rejection) and write
+    it straight to a data file, `block` chains at a time, so that memory use
+    does not depend on the number of chains. The Atoms section is written
+    first; the Bonds section is then derived from the chain layout alone.
+    With `block` at least `nchain` the file is identical to writing
+    `build_system` with the same seed.
+
+    :param filename: Path of the data file
+    :type filename: str
+    :param block: Number of chains (and block * chain length ions) built at
+    once, defaults to 1000
+    :type block: int, optional
+    :param title: First line of the file, defaults to `TITLE`
+    :type title: str, optional
+    :return: Box lengths, number of co-ions, <Rg^2> and <Ree^2> of the
+    chains
+    :rtype: tuple
+    """
+    rng = np.random.default_rng(seed)
+
+    sequence, ncoion, coion_charge, box = composition(
+        nchain, sparsity, nmonomer, nmetal, metal_charge, metal_diameter,
+        density, pendant_size=pendant_size)
+    chain_length = len(sequence)
+    chain_nbond = chain_length - 1
+    npolyatoms = nchain * chain_length
+    diameters = np.array([1.0, 1.0, 1.0, metal_diameter, coion_diameter])
+
+    rg2 = ree2 = 0.0
+    with open(filename, "w") as f:
+        f.write(header(npolyatoms + nmetal + ncoion, nchain * chain_nbond,
+                       box, diameters, title=title))
+        f.write("Atoms\n\n")
+
+        for first in range(0, nchain, block):
+            n = min(block, nchain - first)
+            chains = grow_chains(n, sequence, box, bond=bond,
+                                 pendant_size=pendant_size, rng=rng)
+            block_rg2, block_ree2 = chain_dimensions(chains, sequence)
+            rg2 += np.sum(block_rg2)
+            ree2 += np.sum(block_ree2)
+            _write_atoms(f, first * chain_length, chains.reshape(-1, 3), box,
+                         *chain_topology(sequence, first, n))
+
+        # every ion is its own molecule, numbered after the chains
+        nion = block * chain_length
+        for itype, charge, start, count in (
+                (COUNTERION, float(metal_charge), npolyatoms, nmetal),
+                (COION, coion_charge, npolyatoms + nmetal, ncoion)):
+            for lo in range(0, count, nion):
+                n = min(nion, count - lo)
+                ids = np.arange(start + lo, start + lo + n)
+                _write_atoms(f, start + lo, rng.random((n, 3)) * box, box,
+                             np.full(n, itype), np.full(n, charge),
+                             ids - npolyatoms + nchain + 1)
+
+        f.write("\nBonds\n\n")
+        for first in range(0, nchain, block):
+            n = min(block, nchain - first)
+            bonds, bond_types = chain_bond_table(sequence, first, n)
+            _write_block(f, BOND_FORMAT, np.column_stack((
+                np.arange(first * chain_nbond + 1,
+                          (first + n) * chain_nbond + 1),
+                bond_types, bonds + 1)).astype(np.int64))
+
+    return box, ncoion, float(rg2 / nchain), float(ree2 / nchain)
+
+
+def save_npz(filename: str, system: System) -> None:
+    """
+    Save a system to an uncompressed `.npz` file, which is much faster to
+    load than the text data file.
+
+    :param filename: Path of the `.npz` file
+    :type filename: str
+    :param system: System to save
+    :type system: System
+    """
+    np.savez(filename, box=system.box, positions=system.positions,
+             images=system.images, types=system.types,
+             charges=system.charges, molecules=system.molecules,
+             bonds=system.bonds, bond_types=system.bond_types,
+             diameters=system.diameters, nchain=system.nchain,
+             chain_length=system.chain_length, rg2=system.rg2,
+             ree2=system.ree2)
+
+
+def load_npz(filename: str) -> System:
+    """
+    Load a system saved with `save_npz`.
+
+    :param filename: Path of the `.npz` file
+    :type filename: str
+    :return: The saved system
+    :rtype: System
+    """
+    with np.load(filename) as data:
+        return System(data["box"], data["positions"], data["images"],
+                      data["types"], data["charges"], data["molecules"],
+                      data["bonds"], data["bond_types"], data["diameters"],
+                      int(data["nchain"]), int(data["chain_length"]),
+                      data["rg2"], data["ree2"])
@@ -0,0 +1,256 @@
+"""
+Cell-list neighbour search in orthogonal periodic boxes.
+"""
+# Standard library
+import itertools
+
+# Third-party packages
+import numpy as np
+
+# Local
+from .pbc import minimum_image
+
+
+def _neighbour_offsets(ncell: np.ndarray) -> np.ndarray:
+    """
+    Offsets of the cells adjacent to (and including) a cell. Offsets that
+    point to the same cell because there are fewer than three cells along a
+    dimension are only returned once.
+
+    :param ncell: Number of cells along each dimension
+    :type ncell: np.ndarray
+    :return: 2D array (n_offset, 3) of cell offsets
+    :rtype: np.ndarray
+    """
+    offsets = np.array(list(itertools.product((-1, 0, 1), repeat=3)))
+    return np.unique(offsets % ncell, axis=0)
+
+
+def cell_pairs(points: np.ndarray, box: np.ndarray, cutoff: float) -> tuple:
+    """
+    Find all pairs of points closer than `cutoff` under periodic boundary
+    conditions. Points are sorted by cell and only the 27 surrounding cells
+    are searched, so the cost is linear in the number of points.
+
+    :param points: 2D array (n, 3) of positions (need not be wrapped)
+    :type points: np.ndarray
+    :param box: Box lengths (x, y, z)
+    :type box: np.ndarray
+    :param cutoff: Pair distance cutoff
+    :type cutoff: float
+    :return: Arrays i, j (with i < j) and the pair distances
+    :rtype: tuple
+    """
+    points = np.asarray(points, dtype=float)
+    box = np.asarray(box, dtype=float)
+    n = len(points)
+
+    # sorting into cells does not pay off for a handful of points
+    if n <= 128:
+        i, j = np.triu_indices(n, 1)
+        delta = minimum_image(points[j] - points[i], box)
+        dist = np.sqrt(np.einsum("ij,ij->i", delta, delta))
+        keep = dist < cutoff
+        return i[keep], j[keep], dist[keep]
+
+    ncell = np.maximum((box // cutoff).astype(np.int64), 1)
+    idx = np.floor(points / box * ncell).astype(np.int64) % ncell
+    key = (idx[:, 0] * ncell[1] + idx[:, 1]) * ncell[2] + idx[:, 2]
+    order = np.argsort(key, kind="stable")
+    sorted_key = key[order]
+    # visiting the points in cell order keeps the lookups below cache
+    # friendly
+    sorted_idx = idx[order]
+
+    # direct per-cell lookup tables when the grid is not much larger than
+    # the number of points, binary searches otherwise
+    dense = np.prod(ncell) <= 32 * n
+    if dense:
+        cell_count = np.bincount(key, minlength=int(np.prod(ncell)))
+        cell_start = np.cumsum(cell_count) - cell_count
+
+    pair_i, pair_j = [], []
+    for offset in _neighbour_offsets(ncell):
+        nidx = (sorted_idx + offset) % ncell
+        nkey = (nidx[:, 0] * ncell[1] + nidx[:, 1]) * ncell[2] + nidx[:, 2]
+        if dense:
+            lo = cell_start[nkey]
+            counts = cell_count[nkey]
+        else:
+            lo = np.searchsorted(sorted_key, nkey, side="left")
+            counts = np.searchsorted(sorted_key, nkey, side="right") - lo
+
+        # expand the [lo, hi) ranges of every point into candidate pairs
+        i = np.repeat(order, counts)
+        start = np.repeat(lo - np.cumsum(counts) + counts, counts)
+        j = order[start + np.arange(len(i))]
+
+        keep = i < j
+        pair_i.append(i[keep])
+        pair_j.append(j[keep])
+
+    i = np.concatenate(pair_i)
+    j = np.concatenate(pair_j)
+    delta = minimum_image(points[j] - points[i], box)
+    dist = np.sqrt(np.einsum("ij,ij->i", delta, delta))
+    keep = dist < cutoff
+
+    return i[keep], j[keep], dist[keep]
+
+
+class CellList:
+    """
+    Spatial hash of spheres in an orthogonal periodic box that supports
+    incremental insertion, removal and overlap queries. Every query only
+    looks at the surrounding cells, so checking a new sphere costs O(1).
+    """
+
+    def __init__(self, box: np.ndarray, cutoff: float, capacity: int):
+        """
+        :param box: Box lengths (x, y, z)
+        :type box: np.ndarray
+        :param cutoff: Largest overlap distance (sum of two radii) that will
+        be queried
+        :type cutoff: float
+        :param capacity: Largest sphere ID + 1 that will be inserted
+        :type capacity: int
+        """
+        self.box: np.ndarray = np.asarray(box, dtype=float)
+
+        # cells are at least `cutoff` wide, but not much smaller than the
+        # mean volume per sphere to keep the grid memory in check
+        width = max(cutoff, (np.prod(self.box) / max(capacity, 1)) ** (1 / 3))
+        self.ncell: np.ndarray = np.maximum(
+            (self.box // width).astype(np.int64), 1)
+        self.offsets: np.ndarray = _neighbour_offsets(self.ncell)
+
+        self.cells: np.ndarray = np.full(
+            (np.prod(self.ncell), 4), -1, dtype=np.int64)
+        self.count: np.ndarray = np.zeros(len(self.cells), dtype=np.int64)
+
+        self.positions: np.ndarray = np.zeros((capacity, 3))
+        self.radius: np.ndarray = np.zeros(capacity)
+        self.cell_of: np.ndarray = np.full(capacity, -1, dtype=np.int64)
+        self.slot_of: np.ndarray = np.full(capacity, -1, dtype=np.int64)
+
+    def _cell_index(self, points: np.ndarray) -> np.ndarray:
+        """
+        Integer cell coordinates (n, 3) of each point.
+        """
+        return np.floor(points / self.box * self.ncell).astype(
+            np.int64) % self.ncell
+
+    def _key(self, idx: np.ndarray) -> np.ndarray:
+        """
+        Flat cell index of integer cell coordinates.
+        """
+        return (idx[..., 0] * self.ncell[1] + idx[..., 1]) \
+            * self.ncell[2] + idx[..., 2]
+
+    def compact(self) -> None:
+        """
+        Move the holes left by `remove` to the end of every cell.
+        """
+        order = np.argsort(self.cells < 0, axis=1, kind="stable")
+        self.cells = np.take_along_axis(self.cells, order, axis=1)
+        self.count = np.sum(self.cells >= 0, axis=1)
+
+        row, slot = np.nonzero(self.cells >= 0)
+        self.slot_of[self.cells[row, slot]] = slot
+
+    def insert(self, ids: np.ndarray, points: np.ndarray,
+               radii: np.ndarray) -> None:
+        """
+        Add spheres to the cell list.
+
+        :param ids: 1D array of unique sphere IDs in [0, capacity)
+        :type ids: np.ndarray
+        :param points: 2D array (n, 3) of sphere centres
+        :type points: np.ndarray
+        :param radii: Sphere radii, scalar or 1D array
+        :type radii: np.ndarray
+        """
+        ids = np.asarray(ids, dtype=np.int64)
+        points = np.asarray(points, dtype=float).reshape(-1, 3)
+        key = self._key(self._cell_index(points))
+
+        # rank of each sphere among those inserted into the same cell
+        order = np.argsort(key, kind="stable")
+        sorted_key = key[order]
+        rank = np.empty(len(key), dtype=np.int64)
+        rank[order] = np.arange(len(key)) \
+            - np.searchsorted(sorted_key, sorted_key, side="left")
+
+        slot = self.count[key] + rank
+        if len(slot) and slot.max() >= self.cells.shape[1]:
+            self.compact()
+            slot = self.count[key] + rank
+        if len(slot) and slot.max() >= self.cells.shape[1]:
+            grow = max(self.cells.shape[1], slot.max() + 1)
+            self.cells = np.pad(self.cells, ((0, 0), (0, grow)),
+                                constant_values=-1)
+
+        self.cells[key, slot] = ids
+        np.maximum.at(self.count, key, slot + 1)
+        self.positions[ids] = points
+        self.radius[ids] = radii
+        self.cell_of[ids] = key
+        self.slot_of[ids] = slot
+
+    def remove(self, ids: np.ndarray) -> None:
+        """
+        Remove spheres from the cell list.
+
+        :param ids: 1D array of sphere IDs currently in the cell list
+        :type ids: np.ndarray
+        """
+        ids = np.asarray(ids, dtype=np.int64)
+        self.cells[self.cell_of[ids], self.slot_of[ids]] = -1
+        self.cell_of[ids] = -1
+        self.slot_of[ids] = -1
+
+    def overlaps(self, points: np.ndarray, radii: np.ndarray,
+                 exclude: np.ndarray = None,
+                 chunk: int = 4096) -> np.ndarray:
+        """
+        Check which spheres would overlap a sphere already in the cell list.
+
+        :param points: 2D array (n, 3) of sphere centres
+        :type points: np.ndarray
+        :param radii: Sphere radii, scalar or 1D array
+        :type radii: np.ndarray
+        :param exclude: IDs to ignore for each sphere (e.g. the bead it is
+        bonded to), shape (n,) or (n, k), -1 for none, defaults to None
+        :type exclude: np.ndarray, optional
+        :param chunk: Number of spheres checked at once, defaults to 4096
+        :type chunk: int, optional
+        :return: 1D boolean array, True where a sphere overlaps
+        :rtype: np.ndarray
+        """
+        points = np.asarray(points, dtype=float).reshape(-1, 3)
+        radii = np.broadcast_to(np.asarray(radii, dtype=float),
+                                (len(points),))
+        if exclude is not None:
+            exclude = np.asarray(exclude, dtype=np.int64).reshape(
+                len(points), -1)
+
+        nslot = max(int(self.count.max()), 1)
+        result = np.zeros(len(points), dtype=bool)
+        for lo in range(0, len(points), chunk):
+            hi = min(lo + chunk, len(points))
+            idx = self._cell_index(points[lo:hi])
+            keys = self._key((idx[:, None, :] + self.offsets) % self.ncell)
+            cand = self.cells[keys, :nslot].reshape(hi - lo, -1)
+
+            valid = cand >= 0
+            if exclude is not None:
+                valid &= np.all(cand[:, :, None] != exclude[lo:hi, None, :],
+                                axis=2)
+
+            delta = minimum_image(
+                self.positions[cand] - points[lo:hi, None, :], self.box)
+            dist2 = np.einsum("ijk,ijk->ij", delta, delta)
+            reach = self.radius[cand] + radii[lo:hi, None]
+            result[lo:hi] = np.any(valid & (dist2 < reach * reach), axis=1)
+
+        return result
@@ -0,0 +1,145 @@
+"""
+Periodic boundary helpers working on whole coordinate arrays, for both
+orthogonal and triclinic boxes.
+
+A box can be given as
+* box lengths (lx, ly, lz) of an orthogonal box,
+* MDAnalysis dimensions (lx, ly, lz, alpha, beta, gamma),
+* a 3x3 matrix whose rows are the box vectors.
+"""
+# Third-party packages
+import numpy as np
+
+
+def box_matrix(box: np.ndarray) -> np.ndarray:
+    """
+    Convert any box description to a 3x3 matrix of box vectors (rows).
+
+    :param box: Box lengths, MDAnalysis dimensions or box matrix
+    :type box: np.ndarray
+    :return: 2D array (3, 3), lower triangular for MDAnalysis dimensions
+    :rtype: np.ndarray
+    """
+    box = np.asarray(box, dtype=float)
+    if box.shape == (3, 3):
+        return box
+    if box.shape == (3,):
+        return np.diag(box)
+    if box.shape != (6,):
+        raise ValueError(f"Unknown box format: {box.shape}")
+
+    lx, ly, lz = box[:3]
+    alpha, beta, gamma = np.radians(box[3:])
+    if np.allclose(box[3:], 90.0):
+        return np.diag(box[:3])
+
+    cx = lz * np.cos(beta)
+    cy = lz * (np.cos(alpha) - np.cos(beta) * np.cos(gamma)) / np.sin(gamma)
+    return np.array([[lx, 0.0, 0.0],
+                     [ly * np.cos(gamma), ly * np.sin(gamma), 0.0],
+                     [cx, cy, np.sqrt(lz * lz - cx * cx - cy * cy)]])
+
+
+def _lengths(box: np.ndarray) -> np.ndarray:
+    """
+    Box lengths if the box is orthogonal, None otherwise.
+    """
+    box = np.asarray(box, dtype=float)
+    if box.shape == (3,):
+        return box
+    if box.shape == (6,) and np.allclose(box[3:], 90.0):
+        return box[:3]
+    if box.shape == (3, 3) and not np.any(box - np.diag(np.diag(box))):
+        return np.diag(box).copy()
+    return None
+
+
+def wrap(positions: np.ndarray, box: np.ndarray,
+         origin: np.ndarray = None) -> tuple:
+    """
+    Wrap positions into the primary cell and return the image flags needed
+    to undo it (unwrapped = wrapped + images @ box_matrix).
+
+    :param positions: Array (..., 3) of positions
+    :type positions: np.ndarray
+    :param box: Box lengths, MDAnalysis dimensions or box matrix
+    :type box: np.ndarray
+    :param origin: Lower corner of the primary cell, defaults to (0, 0, 0)
+    :type origin: np.ndarray, optional
+    :return: Wrapped positions and integer image flags, same shape
+    :rtype: tuple
+    """
+    positions = np.asarray(positions, dtype=float)
+    origin = np.zeros(3) if origin is None else np.asarray(origin, float)
+
+    lengths = _lengths(box)
+    if lengths is not None:
+        images = np.floor((positions - origin) / lengths)
+        return positions - images * lengths, images.astype(np.int32)
+
+    matrix = box_matrix(box)
+    fractional = (positions - origin) @ np.linalg.inv(matrix)
+    images = np.floor(fractional)
+    return positions - images @ matrix, images.astype(np.int32)
+
+
+def unwrap(positions: np.ndarray, images: np.ndarray,
+           box: np.ndarray) -> np.ndarray:
+    """
+    Undo `wrap` using image flags.
+
+    :param positions: Array (..., 3) of wrapped positions
+    :type positions: np.ndarray
+    :param images: Integer image flags, same shape
+    :type images: np.ndarray
+    :param box: Box lengths, MDAnalysis dimensions or box matrix
+    :type box: np.ndarray
+    :return: Unwrapped positions
+    :rtype: np.ndarray
+    """
+    return np.asarray(positions, dtype=float) + images @ box_matrix(box)
+
+
+def minimum_image(delta: np.ndarray, box: np.ndarray) -> np.ndarray:
+    """
+    Shortest periodic image of separation vectors.
+
+    :param delta: Array (..., 3) of separation vectors
+    :type delta: np.ndarray
+    :param box: Box lengths, MDAnalysis dimensions or box matrix
+    :type box: np.ndarray
+    :return: Separation vectors of the nearest images
+    :rtype: np.ndarray
+    """
+    delta = np.asarray(delta, dtype=float)
+
+    lengths = _lengths(box)
+    if lengths is not None:
+        return delta - lengths * np.round(delta / lengths)
+
+    matrix = box_matrix(box)
+    return delta - np.round(delta @ np.linalg.inv(matrix)) @ matrix
+
+
+def unwrap_chains(positions: np.ndarray, box: np.ndarray) -> np.ndarray:
+    """
+    Make chains whole by walking along them: every bead is moved to the
+    image closest to the bead before it. Consecutive beads must be closer
+    than half a box length, which holds for beads stored in chain order
+    (including pendants that sit between two backbone beads).
+
+    :param positions: Array (..., nbeads, 3) of wrapped positions, e.g.
+    (nchain, nbeads, 3) or (nframe, nchain, nbeads, 3) for one box
+    :type positions: np.ndarray
+    :param box: Box lengths, MDAnalysis dimensions or box matrix
+    :type box: np.ndarray
+    :return: Unwrapped positions, the first bead of every chain stays put
+    :rtype: np.ndarray
+    """
+    positions = np.asarray(positions, dtype=float)
+    steps = minimum_image(np.diff(positions, axis=-2), box)
+
+    unwrapped = np.empty_like(positions)
+    unwrapped[..., :1, :] = positions[..., :1, :]
+    unwrapped[..., 1:, :] = positions[..., :1, :] + np.cumsum(steps, axis=-2)
+    return unwrapped
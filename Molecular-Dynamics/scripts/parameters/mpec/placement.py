@@ -0,0 +1,225 @@
+"""
+Overlap-aware placement of chains and free ions using a cell list.
+"""
+# Third-party packages
+import numpy as np
+
+# Local
+from .chains import PENDANT
+from .neighbors import CellList, cell_pairs
+
+
+def _parents(sequence: np.ndarray) -> np.ndarray:
+    """
+    Index of the bead each bead of a chain is bonded to when growing the
+    chain in atom ID order (-1 for the first bead). Pendants hang off the
+    preceding alpha bead and the backbone continues from the alpha bead.
+
+    :param sequence: Bead types of one chain
+    :type sequence: np.ndarray
+    :return: 1D array of parent indices
+    :rtype: np.ndarray
+    """
+    sequence = np.asarray(sequence)
+    parent = np.arange(len(sequence)) - 1
+    after_pendant = np.flatnonzero(sequence[:-1] == PENDANT) + 1
+    after_pendant = after_pendant[sequence[after_pendant] != PENDANT]
+    parent[after_pendant] -= 1
+    return parent
+
+
+def _batch_conflicts(points: np.ndarray, radii: np.ndarray,
+                     box: np.ndarray) -> np.ndarray:
+    """
+    Flag spheres of a batch that overlap an earlier sphere of the same
+    batch, so that accepting all unflagged spheres is overlap free.
+
+    :param points: 2D array (n, 3) of sphere centres
+    :type points: np.ndarray
+    :param radii: 1D array of sphere radii
+    :type radii: np.ndarray
+    :param box: Box lengths (x, y, z)
+    :type box: np.ndarray
+    :return: 1D boolean array, True for spheres to reject
+    :rtype: np.ndarray
+    """
+    conflict = np.zeros(len(points), dtype=bool)
+    if len(points) < 2:
+        return conflict
+
+    i, j, dist = cell_pairs(points, box, 2 * radii.max())
+    clash = dist < radii[i] + radii[j]
+    conflict[j[clash]] = True
+    return conflict
+
+
+def _random_directions(n: int, rng: np.random.Generator) -> np.ndarray:
+    """
+    Uniformly distributed unit vectors, shape (n, 3).
+    """
+    vec = rng.standard_normal((n, 3))
+    return vec / np.linalg.norm(vec, axis=1, keepdims=True)
+
+
+def insert_particles(cells: CellList, ids: np.ndarray, radius: float,
+                     rng: np.random.Generator,
+                     max_rounds: int = 1000) -> np.ndarray:
+    """
+    Place free particles (counterions, co-ions) uniformly in the box without
+    overlapping anything already in the cell list. All particles still to be
+    placed are proposed at once every round and only the rejected ones are
+    drawn again.
+
+    :param cells: Cell list holding the spheres already placed, updated
+    in place
+    :type cells: CellList
+    :param ids: 1D array of cell list IDs of the new particles
+    :type ids: np.ndarray
+    :param radius: Exclusion radius of the new particles
+    :type radius: float
+    :param rng: Random number generator
+    :type rng: np.random.Generator
+    :param max_rounds: Number of proposal rounds before giving up,
+    defaults to 1000
+    :type max_rounds: int, optional
+    :return: 2D array (n, 3) of positions in [0, box)
+    :rtype: np.ndarray
+    """
+    ids = np.asarray(ids, dtype=np.int64)
+    positions = np.zeros((len(ids), 3))
+    todo = np.arange(len(ids))
+
+    for _ in range(max_rounds):
+        if len(todo) == 0:
+            return positions
+
+        trial = rng.random((len(todo), 3)) * cells.box
+        radii = np.full(len(todo), radius)
+        ok = ~cells.overlaps(trial, radii)
+        ok[ok] = ~_batch_conflicts(trial[ok], radii[ok], cells.box)
+
+        cells.insert(ids[todo[ok]], trial[ok], radii[ok])
+        positions[todo[ok]] = trial[ok]
+        todo = todo[~ok]
+
+    if len(todo):
+        raise RuntimeError(f"Could not place {len(todo)} particles without "
+                           f"overlap after {max_rounds} rounds")
+    return positions
+
+
+def insert_chains(cells: CellList, first_id: int, nchain: int,
+                  sequence: np.ndarray, radii: np.ndarray,
+                  rng: np.random.Generator, bond: float = 0.97,
+                  pendant_size: float = 1.0, max_tries: int = 20,
+                  backoff: int = 2, max_backoffs: int = 100) -> np.ndarray:
+    """
+    Grow self-avoiding chains bead by bead, all chains in parallel. Every
+    step proposes the next bead of each unfinished chain, rejects proposals
+    that overlap placed beads (ignoring the bead they are bonded to) or each
+    other, and retries. A chain that keeps failing removes its last beads
+    and regrows them; the removed segment doubles on every further failure
+    until the chain grows past the bead it got stuck on.
+
+    :param cells: Cell list holding the spheres already placed, updated
+    in place
+    :type cells: CellList
+    :param first_id: Cell list ID of the first bead, bead j of chain c gets
+    ID first_id + c * len(sequence) + j
+    :type first_id: int
+    :param nchain: Number of chains
+    :type nchain: int
+    :param sequence: Bead types of one chain
+    :type sequence: np.ndarray
+    :param radii: 1D array of exclusion radii of the beads of one chain
+    :type radii: np.ndarray
+    :param rng: Random number generator
+    :type rng: np.random.Generator
+    :param bond: Bond length, defaults to 0.97
+    :type bond: float, optional
+    :param pendant_size: Pendant diameter relative to the backbone beads,
+    defaults to 1.0
+    :type pendant_size: float, optional
+    :param max_tries: Failed proposals of one bead before backing off,
+    defaults to 20
+    :type max_tries: int, optional
+    :param backoff: Number of beads removed on the first back-off,
+    defaults to 2
+    :type backoff: int, optional
+    :param max_backoffs: Back-offs of one chain at the same bead before
+    giving up, defaults to 100
+    :type max_backoffs: int, optional
+    :return: Unwrapped positions, shape (nchain, len(sequence), 3)
+    :rtype: np.ndarray
+    """
+    sequence = np.asarray(sequence)
+    radii = np.asarray(radii, dtype=float)
+    nper = len(sequence)
+    parent = _parents(sequence)
+    length = np.where(sequence == PENDANT, bond * pendant_size, bond)
+    first_id = int(first_id)
+
+    positions = np.zeros((nchain, nper, 3))
+    step = np.zeros(nchain, dtype=np.int64)
+    tries = np.zeros(nchain, dtype=np.int64)
+    fails = np.zeros(nchain, dtype=np.int64)
+    stuck_at = np.zeros(nchain, dtype=np.int64)
+
+    while True:
+        chain = np.flatnonzero(step < nper)
+        if len(chain) == 0:
+            return positions
+
+        bead = step[chain]
+        up = parent[bead]
+        start = up < 0
+
+        # propose the next bead of every unfinished chain
+        direction = _random_directions(len(chain), rng)
+        pendant = (sequence[bead] == PENDANT) & (parent[np.maximum(up, 0)]
+                                                 >= 0) & ~start
+        if np.any(pendant):
+            c, p = chain[pendant], up[pendant]
+            tangent = positions[c, p] - positions[c, parent[p]]
+            tangent /= np.linalg.norm(tangent, axis=1, keepdims=True)
+            d = direction[pendant]
+            d -= np.sum(d * tangent, axis=1, keepdims=True) * tangent
+            direction[pendant] = d / np.linalg.norm(d, axis=1, keepdims=True)
+
+        trial = np.empty((len(chain), 3))
+        trial[start] = rng.random((np.sum(start), 3)) * cells.box
+        trial[~start] = positions[chain[~start], up[~start]] \
+            + direction[~start] * length[bead[~start], None]
+
+        # reject overlaps with placed beads and within the batch
+        ids = first_id + chain * nper + bead
+        exclude = np.where(start, -1, first_id + chain * nper + up)
+        ok = ~cells.overlaps(trial, radii[bead], exclude)
+        ok[ok] = ~_batch_conflicts(trial[ok], radii[bead[ok]], cells.box)
+
+        cells.insert(ids[ok], trial[ok], radii[bead[ok]])
+        positions[chain[ok], bead[ok]] = trial[ok]
+        step[chain[ok]] += 1
+        tries[chain[ok]] = 0
+        fails[step > stuck_at] = 0
+
+        # chains stuck on the same bead remove their last segment
+        tries[chain[~ok]] += 1
+        stuck = chain[~ok][tries[chain[~ok]] > max_tries]
+        if len(stuck) == 0:
+            continue
+        if np.any(fails[stuck] >= max_backoffs):
+            raise RuntimeError("Could not grow chains without overlap, "
+                               "lower the density or minimum separation")
+
+        back = np.minimum(step[stuck],
+                          backoff * 2 ** np.minimum(fails[stuck], 20))
+        removed = np.repeat(step[stuck] - back, back) \
+            + np.arange(back.sum()) \
+            - np.repeat(np.cumsum(back) - back, back)
+        cells.remove(first_id + np.repeat(stuck, back) * nper + removed)
+
+        stuck_at[stuck] = np.maximum(stuck_at[stuck], step[stuck])
+        step[stuck] -= back
+        tries[stuck] = 0
+        fails[stuck] += 1
@@ -0,0 +1,157 @@
+"""
+Cheap pre-relaxation of freshly built systems: steepest descent on a capped
+soft repulsion that removes the worst overlaps before the LAMMPS
+minimisation, while the bonds are held near their built length.
+"""
+# Standard library
+import warnings
+
+# Third-party packages
+import numpy as np
+
+# Local
+from .neighbors import cell_pairs
+from .pbc import minimum_image
+
+
+def _accumulate(i: np.ndarray, j: np.ndarray, force: np.ndarray,
+                n: int) -> np.ndarray:
+    """
+    Sum pair forces acting on j (and the opposite on i) per atom.
+    """
+    total = np.empty((n, 3))
+    for k in range(3):
+        total[:, k] = (np.bincount(j, weights=force[:, k], minlength=n)
+                       - np.bincount(i, weights=force[:, k], minlength=n))
+    return total
+
+
+def soft_relax(positions: np.ndarray, box: np.ndarray, sigma: np.ndarray,
+               bonds: np.ndarray, tolerance: float = 0.2,
+               max_steps: int = 500, max_move: float = 0.1,
+               step: float = 0.01, strength: float = 20.0,
+               bond_length: float = 0.97, bond_k: float = 30.0,
+               bond_max: float = 1.5, skin: float = 0.3,
+               rng: np.random.Generator = None) -> tuple:
+    """
+    Push overlapping atoms apart with the soft-sphere potential
+    E = A sigma_ij / 2 (1 - r / sigma_ij)^2 for r < sigma_ij, whose force is
+    capped at A for fully overlapping atoms, plus a harmonic spring on every
+    bond. Each iteration moves every atom along its force, by at most
+    `max_move`, and undoes the moves that would stretch a bond past 90 % of
+    the FENE limit `bond_max`. Neighbour pairs come from a cell list built
+    with a skin and are only rebuilt once atoms have moved by half the skin.
+    Bonded pairs are left to the spring. Iteration stops once no pair is
+    closer than sigma_ij - `tolerance`, and a `RuntimeWarning` is issued
+    when `max_steps` iterations did not get there.
+
+    :param positions: 2D array (n, 3) of positions (need not be wrapped)
+    :type positions: np.ndarray
+    :param box: Box lengths (x, y, z)
+    :type box: np.ndarray
+    :param sigma: Diameter of every atom, sigma_ij = (sigma_i + sigma_j) / 2
+    :type sigma: np.ndarray
+    :param bonds: 2D array (n_bond, 2) of bonded atom indices (0-based)
+    :type bonds: np.ndarray
+    :param tolerance: Largest overlap sigma_ij - r_ij left at the end,
+    defaults to 0.2
+    :type tolerance: float, optional
+    :param max_steps: Maximum number of iterations, defaults to 500
+    :type max_steps: int, optional
+    :param max_move: Largest displacement of an atom per iteration,
+    defaults to 0.1
+    :type max_move: float, optional
+    :param step: Displacement per unit force, defaults to 0.01
+    :type step: float, optional
+    :param strength: Largest soft repulsion force A, defaults to 20.0
+    :type strength: float, optional
+    :param bond_length: Rest length of the bond springs, defaults to 0.97
+    :type bond_length: float, optional
+    :param bond_k: Spring constant of the bonds, defaults to 30.0
+    :type bond_k: float, optional
+    :param bond_max: Maximum FENE bond extension R0, defaults to 1.5
+    :type bond_max: float, optional
+    :param skin: Neighbour list skin, defaults to 0.3
+    :type skin: float, optional
+    :param rng: Random number generator used to separate atoms sitting on
+    top of each other, defaults to a fresh `np.random.default_rng()`
+    :type rng: np.random.Generator, optional
+    :return: Relaxed positions (same images as the input), number of
+    iterations and the largest overlap left
+    :rtype: tuple
+    """
+    if rng is None:
+        rng = np.random.default_rng()
+
+    x = np.array(positions, dtype=float)
+    box = np.asarray(box, dtype=float)
+    sigma = np.asarray(sigma, dtype=float)
+    n = len(x)
+    bonds = np.sort(np.asarray(bonds, dtype=np.int64).reshape(-1, 2), axis=1)
+    bond_keys = np.sort(bonds[:, 0] * n + bonds[:, 1])
+    stretch_limit = 0.9 * bond_max
+    cutoff = sigma.max() + skin
+
+    i = j = sij = None
+    reference = x
+    worst = 0.0
+    for iteration in range(max_steps + 1):
+        # rebuild the neighbour pairs once anything moved half the skin
+        moved = minimum_image(x - reference, box)
+        if i is None or np.max(np.einsum("ij,ij->i", moved, moved)) \
+                > (skin / 2) ** 2:
+            i, j, _ = cell_pairs(x, box, cutoff)
+            nonbonded = ~np.isin(i * n + j, bond_keys)
+            i, j = i[nonbonded], j[nonbonded]
+            sij = (sigma[i] + sigma[j]) / 2
+            reference = x.copy()
+
+        delta = minimum_image(x[j] - x[i], box)
+        dist = np.sqrt(np.einsum("ij,ij->i", delta, delta))
+        overlap = sij - dist
+        close = overlap > 0
+        worst = float(np.max(overlap[close], initial=0.0))
+        if worst < tolerance or iteration == max_steps:
+            break
+
+        # soft repulsion, random directions for coincident atoms
+        d = dist[close]
+        direction = delta[close]
+        stacked = d < 1e-8
+        if np.any(stacked):
+            direction[stacked] = rng.standard_normal((np.sum(stacked), 3))
+            d = np.where(stacked, np.linalg.norm(direction, axis=1), d)
+        magnitude = strength * overlap[close] / sij[close]
+        force = _accumulate(i[close], j[close],
+                            direction * (magnitude / d)[:, None], n)
+
+        # bond springs
+        bdelta = minimum_image(x[bonds[:, 1]] - x[bonds[:, 0]], box)
+        blen2 = np.einsum("ij,ij->i", bdelta, bdelta)
+        blen = np.sqrt(blen2)
+        force -= _accumulate(
+            bonds[:, 0], bonds[:, 1],
+            bdelta * (bond_k * (blen - bond_length) / blen)[:, None], n)
+
+        # capped steepest descent step
+        move = step * force
+        length = np.linalg.norm(move, axis=1)
+        move *= np.minimum(1.0, max_move / np.maximum(length, 1e-300))[:, None]
+
+        # undo the moves of atoms in bonds that would get too long
+        while True:
+            trial = x + move
+            bdelta = minimum_image(trial[bonds[:, 1]] - trial[bonds[:, 0]],
+                                   box)
+            trial2 = np.einsum("ij,ij->i", bdelta, bdelta)
+            long = (trial2 > stretch_limit ** 2) & (trial2 > blen2)
+            if not np.any(long):
+                break
+            move[bonds[long].ravel()] = 0.0
+        x = trial
+
+    if worst >= tolerance:
+        warnings.warn(f"soft_relax left an overlap of {worst:.3f} > "
+                      f"{tolerance} after {max_steps} steps",
+                      RuntimeWarning, stacklevel=2)
+    return x, iteration, worst
@@ -0,0 +1,134 @@
+"""
+Chain relaxation: end-to-end vectors and Rouse modes of all chains, and
+their time autocorrelation functions. The correlations are computed with
+zero-padded FFTs of all chains and modes at once, streamed over chunks of
+frames, so memory depends on the chunk and the longest lag, not on the
+length of the trajectory, and the beads are reduced to a few modes as soon
+as a frame is read.
+"""
+# Third-party packages
+import numpy as np
+
+# Local
+from .pbc import unwrap_chains
+
+
+def rouse_basis(n_beads: int, n_modes: int) -> np.ndarray:
+    """
+    Projection onto the Rouse modes p = 1 ... n_modes of a chain of n_beads
+    beads, X_p = 1/N sum_n r_n cos(p pi (n - 1/2) / N).
+
+    :param n_beads: Number of beads of the chain contour
+    :type n_beads: int
+    :param n_modes: Number of modes
+    :type n_modes: int
+    :return: 2D array (n_modes, n_beads)
+    :rtype: np.ndarray
+    """
+    p = np.arange(1, n_modes + 1)[:, None]
+    n = np.arange(1, n_beads + 1)[None, :]
+    return np.cos(np.pi * p * (n - 0.5) / n_beads) / n_beads
+
+
+def chain_modes(positions: np.ndarray, box: np.ndarray,
+                backbone: np.ndarray, basis: np.ndarray) -> np.ndarray:
+    """
+    End-to-end vector and Rouse modes of every chain of one frame. The
+    chains are made whole by walking along their bonds (`unwrap_chains`),
+    then the modes are projected on the backbone beads.
+
+    :param positions: Wrapped positions, shape (nchain, nbeads, 3)
+    :type positions: np.ndarray
+    :param box: Box lengths, MDAnalysis dimensions or box matrix
+    :type box: np.ndarray
+    :param backbone: Indices of the backbone beads within a chain
+    :type backbone: np.ndarray
+    :param basis: Rouse basis of the backbone (see `rouse_basis`)
+    :type basis: np.ndarray
+    :return: 3D array (nchain, 1 + n_modes, 3), the end-to-end vector
+    followed by the modes
+    :rtype: np.ndarray
+    """
+    contour = unwrap_chains(positions, box)[:, backbone]
+    modes = np.empty((len(contour), 1 + len(basis), 3))
+    modes[:, 0] = contour[:, -1] - contour[:, 0]
+    modes[:, 1:] = np.einsum("pn,cni->cpi", basis, contour)
+    return modes
+
+
+class StreamingCorrelator:
+    """
+    Time autocorrelation <x(t0) . x(t0 + tau)> of many vector series, for
+    lags up to tau_max - 1, fed one chunk of frames at a time.
+
+    Every pair of frames is counted with the chunk of its later frame: a
+    chunk is correlated against itself and the last tau_max - 1 frames
+    before it with one FFT over all series.
+    """
+
+    def __init__(self, tau_max: int, group_size: int = 3072):
+        """
+        :param tau_max: Number of lags (0 ... tau_max - 1)
+        :type tau_max: int
+        :param group_size: Number of scalar series transformed at once,
+        defaults to 3072
+        :type group_size: int, optional
+        """
+        if tau_max < 1:
+            raise ValueError("tau_max must be at least 1")
+        self.tau_max: int = tau_max
+        self.group_size: int = group_size
+        self.n_frames: int = 0
+        self.sum: np.ndarray = None
+        self._tail: np.ndarray = None
+
+    def update(self, chunk: np.ndarray) -> None:
+        """
+        Add the next frames.
+
+        :param chunk: Array (frames, ..., 3) of vectors, the same series
+        in every chunk
+        :type chunk: np.ndarray
+        """
+        chunk = np.asarray(chunk, dtype=float)
+        if len(chunk) == 0:
+            return
+        if self.sum is None:
+            self.sum = np.zeros((self.tau_max,) + chunk.shape[1:-1])
+            self._tail = chunk[:0]
+
+        series = np.concatenate((self._tail, chunk))
+        later = series.copy()
+        later[:len(self._tail)] = 0.0
+
+        # sum_t x(t - tau) . x(t) over the frames t of this chunk, a group
+        # of series at a time to bound the size of the FFT arrays
+        n = 1 << int(len(series) + self.tau_max - 1).bit_length()
+        lags = min(self.tau_max, len(series))
+        flat_series = series.reshape(len(series), -1)
+        flat_later = later.reshape(len(series), -1)
+        flat_sum = self.sum.reshape(self.tau_max, -1)
+        group = 3 * max(1, self.group_size // 3)
+        for i in range(0, flat_series.shape[1], group):
+            spectrum = np.fft.rfft(flat_series[:, i:i + group], n=n,
+                                   axis=0).conj() \
+                * np.fft.rfft(flat_later[:, i:i + group], n=n, axis=0)
+            corr = np.fft.irfft(spectrum, n=n, axis=0)[:lags]
+            flat_sum[:lags, i // 3:(i + group) // 3] += \
+                corr.reshape(lags, -1, 3).sum(axis=-1)
+
+        self.n_frames += len(chunk)
+        self._tail = series[max(0, len(series) - (self.tau_max - 1)):] \
+            if self.tau_max > 1 else series[:0]
+
+    def correlation(self) -> np.ndarray:
+        """
+        Correlation averaged over the time origins, NaN for lags longer
+        than the series.
+
+        :return: Array (tau_max, ...) of correlations
+        :rtype: np.ndarray
+        """
+        count = self.n_frames - np.arange(self.tau_max, dtype=float)
+        count[count <= 0] = np.nan
+        return self.sum / count.reshape((-1,) + (1,) * (self.sum.ndim - 1))
@@ -0,0 +1,115 @@
+"""
+Run several MDAnalysis analyses in one pass over a trajectory. Every frame
+is read and decoded once and handed to each analysis (an observer) through
+its own hooks: `_prepare` before the first frame, `_single_frame` for every
+frame and `_conclude` after the last one, exactly as `AnalysisBase.run`
+would call them.
+"""
+# Standard library
+import logging
+
+# Third-party packages
+import numpy as np
+
+# MDAnalysis package
+from MDAnalysis.analysis.base import AnalysisBase
+
+
+class SinglePass(AnalysisBase):  # subclass AnalysisBase
+    """
+    Drive a list of analyses (subclasses of `AnalysisBase`) built on the same
+    universe with a single read of its trajectory. After `run`, every
+    observer holds its results, frames and times as if it had been run on
+    its own.
+
+    An observer can analyse a subset of the frames: with a stride of k it
+    sees every k-th frame of the run (like `run(step=k)`). Observers share the
+    positions of the current frame and must not modify them.
+
+    The frames are read in order by one process, so observers may carry
+    state from one frame to the next (e.g. `NetworkTopology`).
+
+    :param AnalysisBase: MDAnalysis analysis class
+    :type AnalysisBase: AnalysisBase
+    """
+    # observers see every frame in order and hold their own state, so the
+    # frames are never split between processes, even when every observer
+    # could be run in parallel on its own
+    _analysis_algorithm_is_parallelizable = False
+
+    @classmethod
+    def get_supported_backends(cls) -> tuple:
+        return ("serial",)
+
+    def __init__(self, observers: list, strides: list = None,
+                 verbose: bool = True, **kwargs):
+        """
+        :param observers: Analyses to run, all on the same universe
+        :type observers: list
+        :param strides: Stride of every observer within the frames of the
+        run, defaults to None (every frame for all observers)
+        :type strides: list, optional
+        :param verbose: Output verbose information for debugging and logging,
+        defaults to True
+        :type verbose: bool, optional
+        """
+        if len(observers) == 0:
+            raise ValueError("at least one observer is needed")
+
+        # must first run AnalysisBase.__init__ and pass the trajectory
+        super(SinglePass, self).__init__(
+            observers[0]._trajectory, verbose=verbose, **kwargs)
+
+        # Verify that the observers read the same trajectory
+        if not all(isinstance(obs, AnalysisBase) for obs in observers):
+            raise TypeError("observers must be of type AnalysisBase")
+        if any(obs._trajectory is not self._trajectory for obs in observers):
+            raise ValueError("observers must analyse the same universe")
+
+        self.logger = logging.getLogger("MDAnalysis.analysis.SinglePass")
+
+        self.observers: list = list(observers)
+        self.strides: list = [1] * len(observers) if strides is None \
+            else [int(s) for s in strides]
+        if len(self.strides) != len(self.observers) or min(self.strides) < 1:
+            raise ValueError("strides must be one positive integer per "
+                             "observer")
+
+    def _setup_frames(self, trajectory, start=None, stop=None, step=None,
+                      frames=None) -> None:
+        slicer = self._define_run_frames(trajectory, start, stop, step,
+                                         frames)
+        self._prepare_sliced_trajectory(slicer)
+
+        # frames of the run, then the share of every observer
+        numbers = np.arange(trajectory.n_frames)[slicer]
+        for obs, stride in zip(self.observers, self.strides):
+            obs._prepare_sliced_trajectory(numbers[::stride])
+
+    def _prepare(self) -> None:
+        if self._verbose:
+            self.logger.info("Preparing analysis of SinglePass")
+
+        for obs in self.observers:
+            obs._prepare()
+
+    def _single_frame(self) -> None:
+        if self._verbose:
+            self.logger.info(f"Analyzing frame index {self._frame_index}")
+
+        for obs, stride in zip(self.observers, self.strides):
+            if self._frame_index % stride != 0:
+                continue
+            index = self._frame_index // stride
+            obs._frame_index = index
+            obs._ts = self._ts
+            obs.frames[index] = self._ts.frame
+            obs.times[index] = self._ts.time
+            obs._single_frame()
+
+    def _conclude(self) -> None:
+        if self._verbose:
+            self.logger.info("Finishing analysis of SinglePass")
+
+        for obs in self.observers:
+            obs._conclude()
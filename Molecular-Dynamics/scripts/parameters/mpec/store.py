@@ -0,0 +1,385 @@
+"""
+Per-selection trajectory store. A trajectory is converted once into a
+directory that holds, for every atom selection (by default every atom
+type), the positions in blocks of frames, one `.npy` file per block, plus an
+index with the frame numbers, times, steps and box of every frame.
+
+Analyses then read only the selections and frame ranges they need. Blocks
+are memory-mapped, so a frame range inside one block is a zero-copy view
+and many processes share the page cache of the same files. Blocks can also
+be stored compressed (`.npz`), which saves disk space but loads every block
+into memory.
+
+MDAnalysis analyses read a store through `load_universe`, which builds a
+universe of only the stored selections they need, with a `StoreReader`
+trajectory.
+
+A DCD can be converted by several processes at once, each reading its own
+blocks of frames straight from the memory-mapped file (see `mpec.dcd`).
+"""
+# Standard library
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+# Third-party packages
+import numpy as np
+
+# MDAnalysis package
+import MDAnalysis as mda
+from MDAnalysis.coordinates.base import ReaderBase
+
+# Local
+from .checkpoint import _load, _save, pack, unpack
+from .dcd import MappedDCD, MappedDCDReader, frame_step
+
+
+def type_selections(universe) -> dict:
+    """
+    One selection per atom type, named "type_<t>".
+
+    :param universe: MDAnalysis universe
+    :return: Selection strings by name
+    :rtype: dict
+    """
+    types = sorted(set(universe.atoms.types), key=lambda t: (len(t), t))
+    return {f"type_{t}": f"type {t}" for t in types}
+
+
+def _block_file(directory: str, name: str, k: int, compress: bool) -> str:
+    ext = "npz" if compress else "npy"
+    return os.path.join(directory, name, f"block_{k:06d}.{ext}")
+
+
+def _save_block(filename: str, positions: np.ndarray, compress: bool) -> None:
+    """
+    Write one block atomically, as `.npy` or compressed `.npz`.
+    """
+    if compress:
+        _save(filename, {"positions": positions})
+        return
+    fd, tmp = tempfile.mkstemp(suffix=".npy", dir=os.path.dirname(filename))
+    with os.fdopen(fd, "wb") as f:
+        np.save(f, positions)
+    os.replace(tmp, filename)
+
+
+def convert(universe, directory: str, selections: dict = None,
+            block: int = 1000, compress: bool = False,
+            start: int = None, stop: int = None, step: int = None,
+            n_workers: int = 1) -> None:
+    """
+    Convert the trajectory of a universe into a store with one read of the
+    trajectory. Positions are stored in single precision, like the DCD.
+
+    :param universe: MDAnalysis universe with topology and trajectory
+    :param directory: Store directory, created if needed
+    :type directory: str
+    :param selections: Selection strings by name, defaults to None (one
+    selection per atom type, see `type_selections`)
+    :type selections: dict, optional
+    :param block: Number of frames per block, defaults to 1000
+    :type block: int, optional
+    :param compress: Store compressed blocks that cannot be memory-mapped,
+    defaults to False
+    :type compress: bool, optional
+    :param start: First frame, defaults to None
+    :type start: int, optional
+    :param stop: Frame to stop at, defaults to None
+    :type stop: int, optional
+    :param step: Step between frames, defaults to None
+    :type step: int, optional
+    :param n_workers: Number of processes that convert blocks of a DCD
+    trajectory in parallel, defaults to 1
+    :type n_workers: int, optional
+    """
+    if selections is None:
+        selections = type_selections(universe)
+    groups = {name: universe.select_atoms(sel)
+              for name, sel in selections.items()}
+    for name in groups:
+        os.makedirs(os.path.join(directory, name), exist_ok=True)
+
+    if n_workers > 1 and str(universe.trajectory.filename).endswith(".dcd"):
+        _convert_mapped(universe, directory, groups, block, compress,
+                        slice(start, stop, step), n_workers)
+        return
+
+    trajectory = universe.trajectory[start:stop:step]
+    n_frames = len(trajectory)
+    frames = np.zeros(n_frames, dtype=np.int64)
+    steps = np.zeros(n_frames, dtype=np.int64)
+    times = np.zeros(n_frames)
+    box = np.zeros((n_frames, 6))
+    buffers = {name: np.zeros((min(block, n_frames), len(ag), 3),
+                              dtype=np.float32)
+               for name, ag in groups.items()}
+
+    for idx, ts in enumerate(trajectory):
+        frames[idx] = ts.frame
+        steps[idx] = frame_step(universe.trajectory, ts.frame)
+        times[idx] = ts.time
+        box[idx] = ts.dimensions
+        for name, ag in groups.items():
+            buffers[name][idx % block] = ag.positions
+
+        # write every full block and the last, partial one
+        if (idx + 1) % block == 0 or idx + 1 == n_frames:
+            k, size = idx // block, idx % block + 1
+            for name in groups:
+                _save_block(_block_file(directory, name, k, compress),
+                            buffers[name][:size], compress)
+
+    _save_index(directory, groups, frames, steps, times, box, block,
+                compress)
+
+
+def _save_index(directory: str, groups: dict, frames: np.ndarray,
+                steps: np.ndarray, times: np.ndarray, box: np.ndarray,
+                block: int, compress: bool) -> None:
+    """
+    Write the index of a store. It is written last: a store without index
+    is incomplete.
+    """
+    _save(os.path.join(directory, "index.npz"), {
+        **pack({name: ag.indices for name, ag in groups.items()},
+               prefix="indices."),
+        "frame": frames, "step": steps, "time": times, "box": box,
+        "block": block, "compress": compress})
+
+
+def _convert_block(job: tuple) -> None:
+    """
+    Process pool worker, converts one block of frames of a DCD.
+    """
+    filename, directory, k, frames, indices, compress = job
+    dcd = MappedDCD(filename)
+    for name, idx in indices.items():
+        positions = np.stack([dcd.positions(f, idx) for f in frames])
+        _save_block(_block_file(directory, name, k, compress),
+                    positions.astype(np.float32), compress)
+
+
+def _convert_mapped(universe, directory: str, groups: dict, block: int,
+                    compress: bool, frames: slice, n_workers: int) -> None:
+    """
+    Convert a DCD trajectory with a pool of processes, one block of frames
+    per task, read from the memory-mapped file.
+    """
+    trajectory = universe.trajectory
+    filename = trajectory.filename
+    # the frame index is built once, before the workers read it
+    dcd = MappedDCD(filename)
+    frames = np.arange(min(trajectory.n_frames, dcd.n_frames))[frames]
+    indices = {name: ag.indices for name, ag in groups.items()}
+
+    jobs = [(filename, directory, k, frames[i:i + block], indices, compress)
+            for k, i in enumerate(range(0, len(frames), block))]
+    with ProcessPoolExecutor(max_workers=n_workers) as pool:
+        list(pool.map(_convert_block, jobs))
+
+    steps = np.array([frame_step(trajectory, f) for f in frames],
+                     dtype=np.int64)
+    box = np.array([dcd.dimensions(f) for f in frames]) if dcd.has_box \
+        else np.zeros((len(frames), 6))
+    _save_index(directory, groups, frames, steps, frames * trajectory.dt,
+                box, block, compress)
+
+
+class TrajectoryStore:
+    """
+    Read access to a store written by `convert`.
+    """
+
+    def __init__(self, directory: str):
+        """
+        :param directory: Store directory
+        :type directory: str
+        """
+        index = _load(os.path.join(directory, "index.npz"))
+        self.directory: str = directory
+        self.frames: np.ndarray = index["frame"]
+        self.steps: np.ndarray = index["step"]
+        self.times: np.ndarray = index["time"]
+        self.box: np.ndarray = index["box"]
+        self.block: int = int(index["block"])
+        self.compress: bool = bool(index["compress"])
+        # atom indices (in the universe) of every selection
+        self.indices: dict = unpack(index, prefix="indices.")
+        self.n_frames: int = len(self.frames)
+
+    @property
+    def selections(self) -> list:
+        return list(self.indices)
+
+    def load_block(self, name: str, k: int) -> np.ndarray:
+        """
+        Positions of one block of frames of one selection, memory-mapped
+        (read-only) unless the store is compressed.
+
+        :param name: Selection name
+        :type name: str
+        :param k: Block index
+        :type k: int
+        :return: 3D array (frames of the block, atoms, 3)
+        :rtype: np.ndarray
+        """
+        filename = _block_file(self.directory, name, k, self.compress)
+        if self.compress:
+            return _load(filename)["positions"]
+        return np.load(filename, mmap_mode="r")
+
+    def blocks(self, name: str, start: int = 0, stop: int = None):
+        """
+        Iterate over the frames [start, stop) of one selection block by
+        block, without copying uncompressed blocks.
+
+        :param name: Selection name
+        :type name: str
+        :param start: First frame (index in the store), defaults to 0
+        :type start: int, optional
+        :param stop: Frame to stop at, defaults to None (last frame)
+        :type stop: int, optional
+        :return: Generator of the first frame and positions of every block
+        """
+        stop = self.n_frames if stop is None else min(stop, self.n_frames)
+        for k in range(start // self.block, -(-stop // self.block)):
+            first = k * self.block
+            lo, hi = max(start, first), min(stop, first + self.block)
+            yield lo, self.load_block(name, k)[lo - first:hi - first]
+
+    def positions(self, name: str, start: int = 0,
+                  stop: int = None) -> np.ndarray:
+        """
+        Positions of the frames [start, stop) of one selection. A range
+        inside one uncompressed block is a read-only view of the file,
+        longer ranges are copied into one array.
+
+        :param name: Selection name
+        :type name: str
+        :param start: First frame (index in the store), defaults to 0
+        :type start: int, optional
+        :param stop: Frame to stop at, defaults to None (last frame)
+        :type stop: int, optional
+        :return: 3D array (frames, atoms, 3)
+        :rtype: np.ndarray
+        """
+        parts = [p for _, p in self.blocks(name, start, stop)]
+        if len(parts) == 1:
+            return parts[0]
+        if len(parts) == 0:
+            return np.zeros((0, len(self.indices[name]), 3),
+                            dtype=np.float32)
+        return np.concatenate(parts)
+
+
+class StoreReader(ReaderBase):
+    """
+    MDAnalysis reader of the frames of a store, for a universe made of the
+    atoms of some of its selections in index order (see `load_universe`).
+    Only the blocks of the current frame are mapped.
+    """
+    units = {"time": "ps", "length": "Angstrom"}
+
+    def __init__(self, filename: str, selections: list = None, **kwargs):
+        """
+        :param filename: Store directory
+        :type filename: str
+        :param selections: Names of the selections read, defaults to None
+        (all)
+        :type selections: list, optional
+        """
+        kwargs.pop("convert_units", None)
+        super(StoreReader, self).__init__(filename, convert_units=False,
+                                          **kwargs)
+        self.store: TrajectoryStore = TrajectoryStore(self.filename)
+        self.selections: list = list(selections or self.store.selections)
+        indices = np.concatenate([self.store.indices[name]
+                                  for name in self.selections])
+        # stored atoms in universe order
+        self._order: np.ndarray = np.argsort(indices, kind="stable")
+        self.n_atoms: int = len(indices)
+        self.n_frames: int = self.store.n_frames
+        # MD time step of every frame, see `mpec.dcd.frame_step`
+        self.steps: np.ndarray = self.store.steps
+        if self.n_frames > 1:
+            self._ts_kwargs.setdefault(
+                "dt", float(self.store.times[1] - self.store.times[0]))
+
+        self._k: int = -1
+        self._blocks: list = None
+        self.ts = self._Timestep(self.n_atoms, **self._ts_kwargs)
+        self._read_frame(0)
+
+    def _read_frame(self, frame: int):
+        if not 0 <= frame < self.n_frames:
+            raise IOError(f"frame {frame} is not in the store")
+        k, row = divmod(frame, self.store.block)
+        if k != self._k:
+            self._blocks = [self.store.load_block(name, k)
+                            for name in self.selections]
+            self._k = k
+
+        ts = self.ts
+        ts.frame = frame
+        ts.positions = np.concatenate(
+            [b[row] for b in self._blocks])[self._order]
+        box = self.store.box[frame]
+        ts.dimensions = box if np.any(box) else None
+        ts.time = self.store.times[frame]
+        ts.data["step"] = self.store.steps[frame]
+        return ts
+
+    def _read_next_timestep(self, ts=None):
+        if self.ts.frame + 1 >= self.n_frames:
+            raise IOError("trying to go over trajectory limit")
+        return self._read_frame(self.ts.frame + 1)
+
+    def _reopen(self) -> None:
+        self.ts.frame = -1
+
+    def close(self) -> None:
+        self._k, self._blocks = -1, None
+
+    def __getstate__(self) -> dict:
+        # processes map the blocks again rather than receive copies
+        state = self.__dict__.copy()
+        state["_k"], state["_blocks"] = -1, None
+        return state
+
+
+def load_universe(topology: str, trajectory: str, directory: str,
+                  selections: list = None, **kwargs):
+    """
+    Universe of a trajectory, read from its store when the store is complete
+    and newer than the trajectory. The universe then holds only the atoms of
+    the stored `selections`, in index order and with the bonds between them;
+    otherwise it is the full universe reading the trajectory, a DCD through
+    a `MappedDCDReader`.
+
+    :param topology: Topology file, e.g. a LAMMPS data file
+    :type topology: str
+    :param trajectory: Trajectory file
+    :type trajectory: str
+    :param directory: Store directory of the trajectory
+    :type directory: str
+    :param selections: Names of the stored selections needed, defaults to
+    None (all)
+    :type selections: list, optional
+    :return: MDAnalysis universe
+    """
+    index = os.path.join(directory, "index.npz")
+    if not os.path.exists(index) or (
+            os.path.exists(trajectory)
+            and os.path.getmtime(trajectory) > os.path.getmtime(index)):
+        if str(trajectory).endswith(".dcd"):
+            kwargs.setdefault("format", MappedDCDReader)
+        return mda.Universe(topology, trajectory, **kwargs)
+
+    store = TrajectoryStore(directory)
+    selections = list(selections or store.selections)
+    indices = np.sort(np.concatenate([store.indices[name]
+                                      for name in selections]))
+    universe = mda.Merge(mda.Universe(topology, **kwargs).atoms[indices])
+    universe.load_new(directory, format=StoreReader, selections=selections)
+    return universe
@@ -0,0 +1,274 @@
+"""
+Construction of complete metallo-polyelectrolyte systems (chains, metal
+counterions and co-ions) as plain arrays.
+"""
+# Third-party packages
+import numpy as np
+
+# Local
+from .chains import (PENDANT, chain_bonds, chain_dimensions, chain_sequence,
+                     grow_chains)
+from .neighbors import CellList
+from .pbc import wrap
+from .placement import insert_chains, insert_particles
+from .relax import soft_relax
+
+# atom types of the free ions
+COUNTERION = 4
+COION = 5
+
+# charge of each chain bead type
+BEAD_CHARGE = {1: 0.0, 2: 0.0, 3: -1.0}
+
+
+class System:
+    """
+    Array-backed topology and configuration of a built system. Atom i of
+    the arrays has atom ID i + 1 in the LAMMPS data file and the box spans
+    [-box / 2, box / 2) along every dimension.
+    """
+
+    def __init__(self, box: np.ndarray, positions: np.ndarray,
+                 images: np.ndarray, types: np.ndarray, charges: np.ndarray,
+                 molecules: np.ndarray, bonds: np.ndarray,
+                 bond_types: np.ndarray, diameters: np.ndarray,
+                 nchain: int, chain_length: int,
+                 rg2: np.ndarray, ree2: np.ndarray):
+        """
+        :param box: Box lengths (x, y, z)
+        :type box: np.ndarray
+        :param positions: 2D array (n_atom, 3) of wrapped positions
+        :type positions: np.ndarray
+        :param images: 2D array (n_atom, 3) of image flags
+        :type images: np.ndarray
+        :param types: 1D array of atom types
+        :type types: np.ndarray
+        :param charges: 1D array of atom charges
+        :type charges: np.ndarray
+        :param molecules: 1D array of molecule IDs
+        :type molecules: np.ndarray
+        :param bonds: 2D array (n_bond, 2) of bonded atom indices (0-based)
+        :type bonds: np.ndarray
+        :param bond_types: 1D array of bond types
+        :type bond_types: np.ndarray
+        :param diameters: LJ diameter of every atom type (index 0 is type 1)
+        :type diameters: np.ndarray
+        :param nchain: Number of chains, stored first in the atom arrays
+        :type nchain: int
+        :param chain_length: Number of beads per chain
+        :type chain_length: int
+        :param rg2: Squared radius of gyration of every chain
+        :type rg2: np.ndarray
+        :param ree2: Squared end-to-end distance of every chain
+        :type ree2: np.ndarray
+        """
+        self.box: np.ndarray = box
+        self.positions: np.ndarray = positions
+        self.images: np.ndarray = images
+        self.types: np.ndarray = types
+        self.charges: np.ndarray = charges
+        self.molecules: np.ndarray = molecules
+        self.bonds: np.ndarray = bonds
+        self.bond_types: np.ndarray = bond_types
+        self.diameters: np.ndarray = diameters
+        self.nchain: int = nchain
+        self.chain_length: int = chain_length
+        self.rg2: np.ndarray = rg2
+        self.ree2: np.ndarray = ree2
+
+    @property
+    def n_atoms(self) -> int:
+        return len(self.types)
+
+    @property
+    def n_bonds(self) -> int:
+        return len(self.bonds)
+
+    @property
+    def n_atom_types(self) -> int:
+        return len(self.diameters)
+
+
+def composition(nchain: int, sparsity: int, nmonomer: int, nmetal: int,
+                metal_charge: int, metal_diameter: float, density: float,
+                pendant_size: float = 1.0) -> tuple:
+    """
+    Chain sequence, co-ions and box size of a system, see `build_system`
+    for the parameters.
+
+    :return: Bead types of one chain, number of co-ions, co-ion charge and
+    box lengths
+    :rtype: tuple
+    """
+    sequence = chain_sequence(sparsity + 1, nmonomer)
+    npendant = nchain * int(np.sum(sequence == PENDANT))
+    npolyatoms = nchain * len(sequence)
+
+    # metal ions neutralise the pendants, co-ions take up the difference
+    ncoion = npendant - metal_charge * nmetal
+    coion_charge = 1.0 if ncoion >= 0 else -1.0
+    ncoion = abs(ncoion)
+
+    volume = (npolyatoms - npendant + npendant * pendant_size ** 3
+              + nmetal * metal_diameter ** 3) / density
+    return sequence, ncoion, coion_charge, np.full(3, volume ** (1 / 3))
+
+
+def chain_topology(sequence: np.ndarray, first: int, nchain: int) -> tuple:
+    """
+    Atom types, charges and molecule IDs of chains `first` to
+    `first + nchain - 1`, chain c being molecule c + 1.
+
+    :param sequence: Bead types of one chain
+    :type sequence: np.ndarray
+    :param first: Index of the first chain
+    :type first: int
+    :param nchain: Number of chains
+    :type nchain: int
+    :return: 1D arrays of types, charges and molecule IDs
+    :rtype: tuple
+    """
+    types = np.tile(sequence, nchain).astype(np.int32)
+    charges = np.tile([BEAD_CHARGE[t] for t in sequence], nchain)
+    molecules = np.repeat(np.arange(first + 1, first + nchain + 1),
+                          len(sequence)).astype(np.int32)
+    return types, charges, molecules
+
+
+def chain_bond_table(sequence: np.ndarray, first: int, nchain: int) -> tuple:
+    """
+    Bonds of chains `first` to `first + nchain - 1`, derived from the bonds
+    of one chain and the chain length (chains are stored first and back to
+    back in the atom arrays).
+
+    :param sequence: Bead types of one chain
+    :type sequence: np.ndarray
+    :param first: Index of the first chain
+    :type first: int
+    :param nchain: Number of chains
+    :type nchain: int
+    :return: 2D array (n_bond, 2) of atom indices (0-based) and 1D array of
+    bond types
+    :rtype: tuple
+    """
+    pairs, pair_types = chain_bonds(sequence)
+    offsets = np.arange(first, first + nchain)[:, None, None] * len(sequence)
+    return (pairs[None] + offsets).reshape(-1, 2), np.tile(pair_types, nchain)
+
+
+def build_system(nchain: int, sparsity: int, nmonomer: int, nmetal: int,
+                 metal_charge: int, metal_diameter: float, density: float,
+                 seed: int = None, overlap: bool = False,
+                 minsep: float = 1.0, bond: float = 0.97,
+                 pendant_size: float = 1.0,
+                 coion_diameter: float = 0.5, relax: bool = False,
+                 relax_tolerance: float = 0.2, cache=None) -> System:
+    """
+    Build a gel of `nchain` pendant chains neutralised by `nmetal` metal
+    ions of valence `metal_charge`. Any remaining charge is balanced with
+    monovalent co-ions. Chains come first in the atom arrays, followed by
+    the metal ions and the co-ions, each ion being its own molecule.
+
+    :param nchain: Number of chains
+    :type nchain: int
+    :param sparsity: Number of backbone beads per monomer, every monomer
+    also carries one charged pendant
+    :type sparsity: int
+    :param nmonomer: Number of monomers per chain
+    :type nmonomer: int
+    :param nmetal: Number of metal ions
+    :type nmetal: int
+    :param metal_charge: Valence of the metal ions
+    :type metal_charge: int
+    :param metal_diameter: Diameter of the metal ions relative to the beads
+    :type metal_diameter: float
+    :param density: Reduced bead density, the volume is corrected for the
+    pendant and ion sizes
+    :type density: float
+    :param seed: Seed of the random number generator, either an integer or
+    a `np.random.SeedSequence` (e.g. spawned for a replica), defaults to None
+    :type seed: int or np.random.SeedSequence, optional
+    :param overlap: Reject beads closer than minsep * (d_i + d_j) / 2,
+    defaults to False
+    :type overlap: bool, optional
+    :param minsep: Minimum separation of two unit beads when `overlap` is
+    set, defaults to 1.0
+    :type minsep: float, optional
+    :param bond: Bond length, defaults to 0.97
+    :type bond: float, optional
+    :param pendant_size: Pendant diameter relative to the backbone beads,
+    defaults to 1.0
+    :type pendant_size: float, optional
+    :param coion_diameter: Diameter of the co-ions, defaults to 0.5
+    :type coion_diameter: float, optional
+    :param relax: Remove the worst overlaps with `soft_relax` before the
+    system is returned, which warns if `relax_tolerance` is not reached,
+    defaults to False
+    :type relax: bool, optional
+    :param relax_tolerance: Largest overlap left by the relaxation, defaults
+    to 0.2
+    :type relax_tolerance: float, optional
+    :param cache: Take the chains from this conformation library instead of
+    growing them (ignored with `overlap`), defaults to None
+    :type cache: mpec.cache.ConformationCache, optional
+    :return: The built system
+    :rtype: System
+    """
+    rng = np.random.default_rng(seed)
+
+    sequence, ncoion, coion_charge, box = composition(
+        nchain, sparsity, nmonomer, nmetal, metal_charge, metal_diameter,
+        density, pendant_size=pendant_size)
+    chain_length = len(sequence)
+    npolyatoms = nchain * chain_length
+    ntot = npolyatoms + nmetal + ncoion
+
+    # positions in [0, box)
+    if overlap:
+        diameters = (1.0, pendant_size, metal_diameter, coion_diameter)
+        cells = CellList(box, minsep * max(diameters), ntot)
+        radii = np.where(sequence == PENDANT, pendant_size, 1.0) * minsep / 2
+        chains = insert_chains(cells, 0, nchain, sequence, radii, rng,
+                               bond=bond, pendant_size=pendant_size)
+        metals = insert_particles(
+            cells, np.arange(npolyatoms, npolyatoms + nmetal),
+            minsep * metal_diameter / 2, rng)
+        coions = insert_particles(
+            cells, np.arange(npolyatoms + nmetal, ntot),
+            minsep * coion_diameter / 2, rng)
+    else:
+        if cache is not None:
+            chains = cache.chains(nchain, sparsity, nmonomer, box, rng,
+                                  bond=bond, pendant_size=pendant_size)
+        else:
+            chains = grow_chains(nchain, sequence, box, bond=bond,
+                                 pendant_size=pendant_size, rng=rng)
+        metals = rng.random((nmetal, 3)) * box
+        coions = rng.random((ncoion, 3)) * box
+    positions = np.concatenate((chains.reshape(-1, 3), metals, coions))
+
+    # topology
+    types, charges, molecules = chain_topology(sequence, 0, nchain)
+    types = np.concatenate((types, np.full(nmetal, COUNTERION),
+                            np.full(ncoion, COION))).astype(np.int32)
+    charges = np.concatenate((charges, np.full(nmetal, float(metal_charge)),
+                              np.full(ncoion, coion_charge)))
+    molecules = np.concatenate((
+        molecules,
+        np.arange(nchain + 1, nchain + 1 + nmetal + ncoion))).astype(np.int32)
+    bonds, bond_types = chain_bond_table(sequence, 0, nchain)
+
+    diameters = np.array([1.0, 1.0, 1.0, metal_diameter, coion_diameter])
+
+    if relax:
+        positions, _, _ = soft_relax(positions, box, diameters[types - 1],
+                                     bonds, tolerance=relax_tolerance,
+                                     bond_length=bond, rng=rng)
+    rg2, ree2 = chain_dimensions(
+        positions[:npolyatoms].reshape(nchain, chain_length, 3), sequence)
+
+    # shift to the box centred on the origin, keeping the image flags
+    positions, images = wrap(positions - box / 2, box, origin=-box / 2)
+
+    return System(box, positions, images, types, charges, molecules, bonds,
+                  bond_types, diameters, nchain, chain_length, rg2, ree2)
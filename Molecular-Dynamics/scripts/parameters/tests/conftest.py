@@ -0,0 +1,89 @@
+"""
+Shared fixtures of the tests of the `mpec` package: a small gel written to
+a LAMMPS data file and a short DCD trajectory of it, and universes built
+from given ion-pendant contacts.
+"""
+# Standard library
+import os
+import sys
+
+# Third-party packages
+import numpy as np
+import pytest
+
+# MDAnalysis package
+import MDAnalysis as mda
+from MDAnalysis.coordinates.memory import MemoryReader
+
+# the scripts import `mpec` from the parameters folder, and the analyses
+# import each other from the analysis folder
+PARAMETERS = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [PARAMETERS, os.path.join(PARAMETERS, "analysis")]
+
+# Local
+from mpec.lammps_data import write_data  # noqa: E402
+from mpec.system import build_system  # noqa: E402
+
+N_FRAMES = 12
+
+
+@pytest.fixture(scope="session")
+def trajectory(tmp_path_factory) -> tuple:
+    """
+    Data file and DCD trajectory (`N_FRAMES` frames, random displacements
+    and a fluctuating box) of 4 chains of 4 monomers with divalent ions.
+
+    :return: Paths of the data file and of the DCD
+    :rtype: tuple
+    """
+    directory = tmp_path_factory.mktemp("trajectory")
+    data = str(directory / "production_nve.data")
+    dcd = str(directory / "production_nve.dcd")
+    write_data(data, build_system(4, 3, 4, 4, 2, 1.0, 0.85, seed=1))
+
+    rng = np.random.default_rng(2)
+    u = mda.Universe(data)
+    with mda.Writer(dcd, u.atoms.n_atoms, nsavc=100, istart=500) as w:
+        for _ in range(N_FRAMES):
+            u.atoms.positions += rng.normal(scale=0.1,
+                                            size=(u.atoms.n_atoms, 3))
+            box = u.dimensions
+            box[:3] *= 1 + rng.normal(scale=0.01)
+            u.dimensions = box
+            w.write(u.atoms)
+    return data, dcd
+
+
+def contact_universe(coord: np.ndarray, charge: int) -> mda.Universe:
+    """
+    Chains of `charge` pendants (type 3) bonded in order and ions (type 4)
+    with the given contacts. Every bound pendant is placed 1 away from its
+    ion, and the ions and the unbound pendants far apart from everything
+    else.
+
+    :param coord: 3D boolean array (frame, ion, pendant) of the contacts,
+    every pendant bound to at most one ion
+    :type coord: np.ndarray
+    :param charge: Number of pendants per chain
+    :type charge: int
+    :return: Universe with one frame per contact set
+    :rtype: mda.Universe
+    """
+    n_frames, n_ion, n_pendant = coord.shape
+    n_atoms = n_pendant + n_ion
+    u = mda.Universe.empty(n_atoms, n_residues=n_atoms,
+                           atom_resindex=np.arange(n_atoms))
+    u.add_TopologyAttr("type", ["3"] * n_pendant + ["4"] * n_ion)
+    u.add_TopologyAttr("bonds", [(c * charge + k, c * charge + k + 1)
+                                 for c in range(n_pendant // charge)
+                                 for k in range(charge - 1)])
+
+    sites = 10.0 * np.stack(np.unravel_index(
+        np.arange(n_atoms), (10, 10, 10)), axis=1) + 5.0
+    positions = np.broadcast_to(sites, (n_frames, n_atoms, 3)).copy()
+    for frame, ion, pendant in zip(*np.nonzero(coord)):
+        positions[frame, pendant] = sites[n_pendant + ion] + [1.0, 0, 0]
+
+    u.load_new(positions.astype(np.float32), format=MemoryReader,
+               dimensions=[200.0, 200.0, 200.0, 90, 90, 90])
+    return u
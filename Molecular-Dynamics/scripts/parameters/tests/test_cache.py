@@ -0,0 +1,106 @@
+"""
+On-disk conformation libraries: eviction of the least recently used
+libraries, sparing of temporary files and chains drawn from a stored
+library.
+"""
+# Standard library
+import os
+import time
+
+# Third-party packages
+import numpy as np
+
+# Local
+from mpec import cache as cache_module
+from mpec.cache import ConformationCache, cache_key, random_rotations
+
+
+def internal_distances(chains: np.ndarray) -> np.ndarray:
+    return np.linalg.norm(chains[:, :, None] - chains[:, None], axis=3)
+
+
+def test_lru_eviction(tmp_path):
+    library = np.zeros((10, 20, 3))
+    size = 10 * 20 * 3 * 4 + 128
+    cache = ConformationCache(str(tmp_path), budget=3 * size)
+    for k, key in enumerate(("a", "b", "c")):
+        cache.store(key, library)
+        os.utime(cache.path(key), (1000 + k, 1000 + k))
+    assert os.path.getsize(cache.path("a")) == size
+
+    # loading "a" makes "b" the least recently used library
+    assert cache.load("a").shape == library.shape
+    cache.store("d", library)
+    assert sorted(os.listdir(tmp_path)) == ["a.npy", "c.npy", "d.npy"]
+
+    # the library just stored is kept even when it alone is over budget
+    cache.budget = size // 2
+    cache.store("e", library)
+    assert os.listdir(tmp_path) == ["e.npy"]
+    assert cache.load("b") is None
+
+
+def test_temporary_files_are_spared(tmp_path):
+    cache = ConformationCache(str(tmp_path), budget=1, stale=60.0)
+    live, stale = tmp_path / ".live.tmp", tmp_path / ".stale.tmp"
+    for path in (live, stale):
+        path.write_bytes(b"0" * 4096)
+    old = time.time() - 120
+    os.utime(stale, (old, old))
+
+    # a build still writing its library keeps its file, a killed one not
+    cache.store("a", np.zeros((10, 20, 3)))
+    assert sorted(os.listdir(tmp_path)) == [".live.tmp", "a.npy"]
+
+
+def test_library_is_oversampled(tmp_path):
+    cache = ConformationCache(str(tmp_path))
+    box = np.full(3, 20.0)
+    cache.chains(2, 3, 4, box, np.random.default_rng(1), library=3,
+                 oversample=2)
+    path = cache.path(cache_key(3, 4, 0.97, 1.0))
+    first = np.load(path)
+    assert len(first) == 4
+
+    # more chains grow the stored library instead of replacing it
+    cache.chains(5, 3, 4, box, np.random.default_rng(2), library=3,
+                 oversample=2)
+    grown = np.load(path)
+    assert len(grown) == 10
+    np.testing.assert_array_equal(grown[:4], first)
+
+
+def test_chains_from_library(tmp_path, monkeypatch):
+    cache = ConformationCache(str(tmp_path))
+    box = np.array([20.0, 25.0, 30.0])
+    chains = cache.chains(5, 3, 4, box, np.random.default_rng(1),
+                          library=8, oversample=1)
+    library = np.load(cache.path(cache_key(3, 4, 0.97, 1.0)))
+    assert library.shape == (8, 16, 3)
+
+    # drawn again without growing anything
+    def grow(*args, **kwargs):
+        raise AssertionError("library was grown again")
+
+    monkeypatch.setattr(cache_module, "grow_conformations", grow)
+    again = cache.chains(5, 3, 4, box, np.random.default_rng(2), library=8,
+                         oversample=1)
+
+    # rigid copies of distinct library conformations, centred in the box
+    stored = internal_distances(library.astype(float))
+    for drawn in (chains, again):
+        match = [np.flatnonzero(np.all(np.isclose(
+            stored, d, atol=1e-4), axis=(1, 2))) for d in
+            internal_distances(drawn)]
+        assert all(len(m) == 1 for m in match)
+        assert len(np.unique(match)) == 5
+        centres = drawn.mean(axis=1)
+        assert np.all((centres >= 0) & (centres < box))
+
+
+def test_random_rotations():
+    rotations = random_rotations(100, np.random.default_rng(3))
+    np.testing.assert_allclose(rotations @ rotations.transpose(0, 2, 1),
+                               np.broadcast_to(np.eye(3), (100, 3, 3)),
+                               atol=1e-12)
+    np.testing.assert_allclose(np.linalg.det(rotations), 1.0)
@@ -0,0 +1,86 @@
+"""
+Chain sequences against the monomer loop of the original `initialize.py`,
+and the geometry of the chains grown all at once.
+"""
+# Third-party packages
+import numpy as np
+import pytest
+
+# Local
+from mpec.chains import (ALPHA, PENDANT, chain_dimensions, chain_sequence,
+                         grow_chains)
+
+
+def baseline_sequence(nbeads: int, nmono: int) -> list:
+    """
+    Bead types of one chain as built by the original `initialize.py`.
+    """
+    sequence = []
+    for i in range(nbeads + 1):
+        if i < int((nbeads - 2) / 2) or i > int(nbeads / 2 + 1):
+            sequence.append(2)
+        elif i == int(nbeads / 2):
+            sequence.append(1)
+        elif i == int(nbeads / 2 + 1):
+            sequence.append(3)
+    return ([2] if nbeads == 3 else []) + sequence * nmono
+
+
+@pytest.mark.parametrize("nbeads", range(3, 10))
+def test_sequence_matches_baseline(nbeads):
+    np.testing.assert_array_equal(chain_sequence(nbeads, 4),
+                                  baseline_sequence(nbeads, 4))
+
+
+@pytest.mark.parametrize("nbeads, pendant_size", [(3, 1.0), (4, 1.0),
+                                                  (6, 1.5)])
+def test_grown_geometry(nbeads, pendant_size):
+    sequence = chain_sequence(nbeads, 5)
+    box = np.array([10.0, 12.0, 14.0])
+    positions = grow_chains(20, sequence, box, bond=0.97,
+                            pendant_size=pendant_size,
+                            rng=np.random.default_rng(1))
+    assert positions.shape == (20, len(sequence), 3)
+
+    backbone = np.flatnonzero(sequence != PENDANT)
+    pendant = np.flatnonzero(sequence == PENDANT)
+    assert np.all(sequence[pendant - 1] == ALPHA)
+
+    # backbone bonds, first bead in the box
+    steps = np.diff(positions[:, backbone], axis=1)
+    np.testing.assert_allclose(np.linalg.norm(steps, axis=2), 0.97)
+    first = positions[:, backbone[0]]
+    assert np.all((first >= 0) & (first < box))
+
+    # pendants hang off their alpha bead, orthogonal to the next step
+    offset = positions[:, pendant] - positions[:, pendant - 1]
+    np.testing.assert_allclose(np.linalg.norm(offset, axis=2),
+                               0.97 * pendant_size)
+    after = np.searchsorted(backbone, pendant - 1)
+    np.testing.assert_allclose(
+        np.sum(offset * steps[:, np.minimum(after, len(backbone) - 2)],
+               axis=2), 0.0, atol=1e-12)
+
+
+def test_seeded_growth_is_reproducible():
+    sequence = chain_sequence(4, 3)
+    grown = [grow_chains(5, sequence, np.full(3, 8.0),
+                         rng=np.random.default_rng(seed))
+             for seed in (7, 7, 8)]
+    np.testing.assert_array_equal(grown[0], grown[1])
+    assert not np.allclose(grown[0], grown[2])
+
+
+def test_dimensions_match_loop():
+    sequence = chain_sequence(5, 4)
+    positions = grow_chains(6, sequence, np.full(3, 8.0),
+                            rng=np.random.default_rng(2))
+    rg2, ree2 = chain_dimensions(positions, sequence)
+
+    backbone = np.flatnonzero(sequence != PENDANT)
+    for c, chain in enumerate(positions):
+        centre = chain.mean(axis=0)
+        assert rg2[c] == pytest.approx(
+            sum(np.dot(r - centre, r - centre) for r in chain) / len(chain))
+        ree = chain[backbone[-1]] - chain[backbone[0]]
+        assert ree2[c] == pytest.approx(np.dot(ree, ree))
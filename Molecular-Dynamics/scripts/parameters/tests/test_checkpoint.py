@@ -0,0 +1,126 @@
+"""
+Checkpointed runs: an interrupted run resumes after its last finished block
+and ends with the results of an uninterrupted run.
+"""
+# Standard library
+import os
+
+# Third-party packages
+import numpy as np
+import pytest
+
+# MDAnalysis package
+import MDAnalysis as mda
+from MDAnalysis.analysis.base import AnalysisBase
+from MDAnalysis.analysis.results import ResultsGroup
+
+# Local
+from mpec import checkpoint
+from mpec.checkpoint import run_checkpointed
+
+
+class RunningCentre(AnalysisBase):
+    """
+    Centre of the atoms in every frame, and their mean square displacement
+    from the first analysed frame, which is carried between blocks.
+    """
+
+    def __init__(self, ag, **kwargs):
+        super(RunningCentre, self).__init__(ag.universe.trajectory, **kwargs)
+        self.ag = ag
+        self.analysed: list = []
+        self._reference = None
+        self._msd = 0.0
+
+    def _prepare(self) -> None:
+        self.results.centre = np.zeros((self.n_frames, 3))
+
+    def _single_frame(self) -> None:
+        positions = self.ag.positions.astype(float)
+        if self._reference is None:
+            self._reference = positions
+        self._msd += np.mean(np.sum((positions - self._reference) ** 2,
+                                    axis=1))
+        self.results.centre[self._frame_index] = positions.mean(axis=0)
+        self.analysed.append(self._ts.frame)
+
+    def _conclude(self) -> None:
+        self.results.msd = self._msd / self.n_frames
+
+    def _get_aggregator(self) -> ResultsGroup:
+        return ResultsGroup(lookup={"centre": ResultsGroup.ndarray_vstack})
+
+    def _checkpoint_state(self) -> dict:
+        return {"reference": self._reference, "msd": np.array(self._msd)}
+
+    def _restore_checkpoint_state(self, state: dict) -> None:
+        self._reference = state["reference"]
+        self._msd = float(state["msd"])
+
+
+def interrupt_after(monkeypatch, n_saves: int) -> None:
+    """
+    Let `n_saves` state files be written, then interrupt the run.
+    """
+    save, saves = checkpoint._save, []
+
+    def interrupting_save(filename: str, arrays: dict) -> None:
+        save(filename, arrays)
+        if os.path.basename(filename) == "state.npz":
+            saves.append(filename)
+            if len(saves) == n_saves:
+                raise KeyboardInterrupt
+
+    monkeypatch.setattr(checkpoint, "_save", interrupting_save)
+
+
+def centre(trajectory) -> RunningCentre:
+    u = mda.Universe(*trajectory)
+    return RunningCentre(u.select_atoms("type 1 or type 2"))
+
+
+@pytest.mark.parametrize("step, interrupted", [(None, 1), (None, 2), (2, 1)])
+def test_resume_matches_uninterrupted(tmp_path, monkeypatch, trajectory,
+                                      step, interrupted):
+    expected = centre(trajectory)
+    expected.run(step=step)
+
+    directory = str(tmp_path / "checkpoint")
+    with monkeypatch.context() as patch:
+        interrupt_after(patch, interrupted)
+        with pytest.raises(KeyboardInterrupt):
+            run_checkpointed(centre(trajectory), directory, step=step,
+                             block=2)
+
+    resumed = run_checkpointed(centre(trajectory), directory, step=step,
+                               block=2)
+
+    # only the blocks after the checkpoint are analysed again
+    np.testing.assert_array_equal(resumed.analysed,
+                                  expected.frames[2 * interrupted:])
+    np.testing.assert_array_equal(resumed.frames, expected.frames)
+    np.testing.assert_allclose(resumed.times, expected.times)
+    np.testing.assert_allclose(resumed.results.centre,
+                               expected.results.centre)
+    assert resumed.results.msd == pytest.approx(expected.results.msd)
+    assert not os.path.exists(directory)
+
+
+def test_mismatched_checkpoint_starts_over(tmp_path, monkeypatch,
+                                           trajectory):
+    directory = str(tmp_path / "checkpoint")
+    with monkeypatch.context() as patch:
+        interrupt_after(patch, 1)
+        with pytest.raises(KeyboardInterrupt):
+            run_checkpointed(centre(trajectory), directory, block=2)
+
+    expected = centre(trajectory)
+    expected.run()
+    resumed = run_checkpointed(centre(trajectory), directory, block=3,
+                               keep=True)
+
+    np.testing.assert_array_equal(resumed.analysed, expected.frames)
+    np.testing.assert_allclose(resumed.results.centre,
+                               expected.results.centre)
+    assert resumed.results.msd == pytest.approx(expected.results.msd)
+    assert os.path.exists(os.path.join(directory, "state.npz"))
@@ -0,0 +1,145 @@
+"""
+Components tracked by `NetworkTracker` from the edge events, and the
+network of `NetworkTopology`, against a union-find of every frame from
+scratch.
+"""
+# Third-party packages
+import numpy as np
+import pytest
+
+# Local
+from mpec.clusters import NetworkTracker, cluster_labels
+from analysis_cluster import NetworkTopology
+
+from conftest import contact_universe
+
+
+def reference_roots(n: int, i: np.ndarray, j: np.ndarray) -> np.ndarray:
+    """
+    Root of every node from a sequential union-find with path halving.
+    """
+    parent = list(range(n))
+
+    def find(a: int) -> int:
+        while parent[a] != a:
+            parent[a] = parent[parent[a]]
+            a = parent[a]
+        return a
+
+    for a, b in zip(i.tolist(), j.tolist()):
+        parent[find(a)] = find(b)
+    return np.array([find(a) for a in range(n)])
+
+
+def same_partition(a: np.ndarray, b: np.ndarray) -> bool:
+    pairs = np.unique(np.column_stack((a, b)), axis=0)
+    return len(pairs) == len(np.unique(a)) == len(np.unique(b))
+
+
+def edge_frames(n: int, n_frames: int, n_edges: int, churn: int,
+                seed: int):
+    """
+    Edges of consecutive frames, `churn` of them replaced every frame.
+    """
+    rng = np.random.default_rng(seed)
+    edges = rng.integers(0, n, size=(n_edges, 2))
+    for _ in range(n_frames):
+        yield edges[:, 0], edges[:, 1]
+        edges = edges.copy()
+        edges[rng.choice(n_edges, churn, replace=False)] = rng.integers(
+            0, n, size=(churn, 2))
+
+
+@pytest.mark.parametrize("n, n_edges, churn", [
+    (50, 20, 3), (50, 45, 10), (200, 180, 40), (30, 60, 60)])
+def test_matches_union_find(n, n_edges, churn):
+    tracker = NetworkTracker(n)
+    previous = np.arange(n)
+    for i, j in edge_frames(n, 40, n_edges, churn, seed=n + churn):
+        formed, broken, merges, splits = tracker.update(i, j)
+        roots = reference_roots(n, i, j)
+
+        assert same_partition(tracker.labels, roots)
+        assert same_partition(cluster_labels(n, i, j)[0], roots)
+
+        # member lists agree with the labels
+        for label in np.unique(tracker.labels):
+            np.testing.assert_array_equal(
+                np.sort(tracker._members(int(label))),
+                np.flatnonzero(tracker.labels == label))
+
+        # every merge removes a component and every split adds one
+        assert len(np.unique(roots)) - len(np.unique(previous)) \
+            == splits - merges
+        previous = roots
+
+
+def test_self_loops_and_duplicates():
+    tracker = NetworkTracker(6)
+    tracker.update(np.array([0, 1, 1, 3, 4]), np.array([1, 0, 1, 3, 5]))
+    assert same_partition(tracker.labels, [0, 0, 2, 3, 4, 4])
+
+    assert tracker.update(np.array([4]), np.array([5])) == (0, 3, 0, 1)
+    assert same_partition(tracker.labels, [0, 1, 2, 3, 4, 4])
+
+
+def bound_pendants(n_frames: int, n_ion: int, n_pendant: int,
+                   seed: int) -> np.ndarray:
+    """
+    Contacts (frame, ion, pendant) that change a little every frame, every
+    pendant bound to at most one ion.
+    """
+    rng = np.random.default_rng(seed)
+    ion = rng.integers(-n_ion, n_ion, size=n_pendant)
+    coord = np.zeros((n_frames, n_ion, n_pendant), dtype=bool)
+    for frame in range(n_frames):
+        bound = np.flatnonzero(ion >= 0)
+        coord[frame, ion[bound], bound] = True
+        move = rng.choice(n_pendant, 4, replace=False)
+        ion[move] = rng.integers(-n_ion, n_ion, size=4)
+    return coord
+
+
+def test_network_topology_matches_scratch():
+    n_chain, charge, n_ion = 10, 3, 12
+    coord = bound_pendants(30, n_ion, n_chain * charge, seed=4)
+    u = contact_universe(coord, charge)
+    nt = NetworkTopology(u.select_atoms("type 4"), u.select_atoms("type 3"),
+                         charge, verbose=False)
+    nt.run()
+
+    n = n_chain + n_ion
+    previous = set()
+    for frame, contacts in enumerate(coord):
+        # chain - ion edges, and the ions bound to two chains or more
+        bound = contacts.reshape(n_ion, n_chain, charge).any(axis=2)
+        ion, chain = np.nonzero(bound)
+        edges = set(zip(chain.tolist(), (n_chain + ion).tolist()))
+        crosslink = bound.sum(axis=1) >= 2
+
+        def n_clusters(pairs: set) -> int:
+            i, j = np.array(sorted(pairs), dtype=int).reshape(-1, 2).T
+            return len(np.unique(reference_roots(n, i, j)))
+
+        roots = reference_roots(n, n_chain + ion, chain)[:n_chain]
+        labels, first, chains = np.unique(roots, return_index=True,
+                                          return_counts=True)
+        # ties go to the cluster of the first chain
+        largest = roots == labels[np.lexsort((first, -chains))[0]]
+        holds = bound[crosslink].sum(axis=0)
+        expected = [largest.sum(), np.count_nonzero(largest & (holds >= 2))]
+
+        # broken edges are applied first, then the formed ones
+        if frame > 0:
+            kept = edges & previous
+            expected += [len(edges - previous), len(previous - edges),
+                         n_clusters(kept) - n_clusters(edges),
+                         n_clusters(kept) - n_clusters(previous)]
+        else:
+            expected += [0, 0, 0, 0]
+        np.testing.assert_array_equal(nt.results.timeseries[frame], expected)
+        previous = edges
+
+    events = nt.results.timeseries[1:, 2:]
+    assert np.all(events.sum(axis=0) > 0)
+    assert np.any(nt.results.timeseries[:, 1] > 0)
@@ -0,0 +1,147 @@
+"""
+Crosslink degrees and coordination motifs of `CrossLinking` against the
+per-ion loop of the original analysis, on hand-built contacts.
+"""
+# Third-party packages
+import numpy as np
+import pytest
+
+# MDAnalysis package
+# Local
+from analysis_crosslinking import CrossLinking, motif_keys, motif_labels
+
+from conftest import contact_universe
+
+N_CHAIN, CHARGE, N_ION = 8, 4, 14
+
+
+def baseline_counts(coord: np.ndarray, charge: int) -> tuple:
+    """
+    Crosslink degree of every chain and the n_100 ... n_300 counters of the
+    original `_single_frame`, which looped over the ions.
+
+    :param coord: 2D boolean array (ion, pendant) of the contacts
+    """
+    ncross = np.zeros(coord.shape[1] // charge)
+    counters = dict.fromkeys(CrossLinking.MOTIFS, 0)
+    for i in range(len(coord)):
+        Coord = np.add.reduceat(coord[i], np.arange(0, len(coord[i]), charge))
+        cross = Coord > 0
+        cross = cross * (sum(cross) - 1)
+        ncross += cross
+        Coord = list(Coord[Coord != 0])
+        if Coord == [1]:
+            counters["100"] += 1
+        elif Coord == [2]:
+            counters["200"] += 1
+        elif Coord == [1, 1]:
+            counters["110"] += 1
+        elif Coord == [3]:
+            counters["300"] += 1
+        elif Coord == [2, 1] or Coord == [1, 2]:
+            counters["210"] += 1
+        elif Coord == [1, 1, 1]:
+            counters["111"] += 1
+    return ncross, counters
+
+
+def baseline_labels(coord: np.ndarray, charge: int, max_chains: int,
+                    max_count: int) -> list:
+    """
+    Motif of every ion by the same loop: bound pendants per chain in
+    descending order, or "other".
+    """
+    labels = []
+    for row in coord:
+        Coord = np.add.reduceat(row, np.arange(0, len(row), charge))
+        Coord = sorted(Coord[Coord != 0], reverse=True)
+        if len(Coord) > max_chains or max(Coord, default=0) > max_count:
+            labels.append("other")
+        else:
+            labels.append("".join(str(c) for c in Coord)
+                          .ljust(max_chains, "0"))
+    return labels
+
+
+def contact_frames(n_frames: int, seed: int) -> np.ndarray:
+    """
+    Contacts (frame, ion, pendant), every pendant bound to at most one ion.
+    The first frame holds an ion bound to four chains, an ion bound to four
+    pendants of one chain and one of another, and an unbound ion.
+    """
+    rng = np.random.default_rng(seed)
+    n_pendant = N_CHAIN * CHARGE
+    coord = np.zeros((n_frames, N_ION, n_pendant), dtype=bool)
+    for frame in range(n_frames):
+        ion = rng.integers(-N_ION // 2, N_ION, size=n_pendant)
+        bound = np.flatnonzero(ion >= 0)
+        coord[frame, ion[bound], bound] = True
+
+    coord[0] = False
+    coord[0, 0, [0, 4, 8, 12]] = True
+    coord[0, 1, [13, 16, 17, 18, 19]] = True
+    coord[0, 3, [20, 21, 24, 28, 29]] = True
+    coord[0, 4, [22, 23, 25]] = True
+    coord[0, 5, [26, 30]] = True
+    coord[0, 6, [27]] = True
+    coord[0, 7, [5, 6, 9]] = True
+    coord[0, 8, [1, 2, 3]] = True
+    coord[0, 9, [10, 11]] = True
+    return coord
+
+
+def bound_counts(coord: np.ndarray) -> tuple:
+    """
+    (ion, count) of every bound (ion, chain), as passed to `motif_keys`.
+    """
+    per_chain = coord.reshape(len(coord), -1, CHARGE).sum(axis=2)
+    ion, _ = np.nonzero(per_chain)
+    return ion, per_chain[per_chain > 0]
+
+
+@pytest.mark.parametrize("max_chains, max_count", [(3, 3), (4, 4), (3, 5)])
+def test_motif_keys_match_baseline(max_chains, max_count):
+    labels = motif_labels(max_chains, max_count)
+    assert len(labels) == (max_count + 1) ** max_chains + 1
+    assert labels[0] == "0" * max_chains and labels[-1] == "other"
+
+    for coord in contact_frames(4, seed=1):
+        ion, count = bound_counts(coord)
+        keys = motif_keys(ion, count, N_ION, max_chains, max_count)
+        assert [labels[k] for k in keys] == baseline_labels(
+            coord, CHARGE, max_chains, max_count)
+
+
+def test_overflow_key():
+    coord = contact_frames(1, seed=2)[0]
+    ion, count = bound_counts(coord)
+    keys = motif_keys(ion, count, N_ION, 3, 3)
+
+    # four chains, four pendants of one chain, unbound
+    assert list(keys[:3]) == [4 ** 3, 4 ** 3, 0]
+    assert [motif_labels(3, 3)[k] for k in keys[3:]] \
+        == ["221", "210", "110", "100", "210", "300", "200"] + ["000"] * 4
+    assert motif_keys(ion, count, N_ION, 4, 4)[1] == 4 * 5 ** 3 + 5 ** 2
+
+
+@pytest.mark.parametrize("max_chains, max_count", [(3, 3), (4, 4)])
+def test_single_frame_matches_baseline(max_chains, max_count):
+    coord = contact_frames(5, seed=3)
+    u = contact_universe(coord, CHARGE)
+    cl = CrossLinking(u.select_atoms("type 4"), u.select_atoms("type 3"),
+                      CHARGE, max_chains=max_chains, max_count=max_count,
+                      verbose=False)
+    cl.run()
+
+    for frame in range(len(coord)):
+        ncross, counters = baseline_counts(coord[frame], CHARGE)
+        np.testing.assert_array_equal(cl.results.Ncross[frame], ncross)
+        for motif, n in counters.items():
+            assert cl.df[f"n_{motif}"][frame] == n
+
+        # the full histogram counts every ion once
+        motifs = dict(zip(cl.motif_labels, cl.results.motifs[frame]))
+        labels = baseline_labels(coord[frame], CHARGE, max_chains,
+                                 max_count)
+        assert motifs == {label: labels.count(label)
+                          for label in cl.motif_labels}
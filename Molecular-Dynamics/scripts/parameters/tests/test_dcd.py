@@ -0,0 +1,90 @@
+"""
+Memory-mapped DCD access against the MDAnalysis `DCDReader`.
+"""
+# Standard library
+import os
+import pickle
+import shutil
+
+# Third-party packages
+import numpy as np
+import pytest
+
+# MDAnalysis package
+import MDAnalysis as mda
+
+# Local
+from mpec.dcd import (MappedDCD, MappedDCDReader, frame_step, index_filename,
+                      load_index)
+
+from conftest import N_FRAMES
+
+
+def test_positions_match_mdanalysis(trajectory):
+    data, dcd = trajectory
+    u = mda.Universe(data, dcd)
+    mapped = MappedDCD(dcd)
+    indices = np.array([3, 0, 17, 40])
+
+    assert len(mapped) == N_FRAMES == u.trajectory.n_frames
+    for ts in u.trajectory:
+        np.testing.assert_array_equal(mapped.positions(ts.frame),
+                                      ts.positions)
+        np.testing.assert_array_equal(mapped.positions(ts.frame, indices),
+                                      ts.positions[indices])
+        np.testing.assert_allclose(mapped.dimensions(ts.frame),
+                                   ts.dimensions, rtol=1e-6)
+        assert mapped.step(ts.frame) == frame_step(u.trajectory, ts.frame)
+
+
+def test_xyz_views(trajectory):
+    _, dcd = trajectory
+    mapped = MappedDCD(dcd)
+    x, y, z = mapped.xyz(5, slice(10, 20))
+
+    assert not x.flags.writeable and not x.flags.owndata
+    np.testing.assert_array_equal(np.column_stack((x, y, z)),
+                                  mapped.positions(5)[10:20])
+    with pytest.raises(ValueError):
+        mapped.xyz(5, slice(10, 20, 2))
+
+
+def test_index_follows_the_file(tmp_path, trajectory):
+    _, dcd = trajectory
+    copy = str(tmp_path / "copy.dcd")
+    shutil.copyfile(dcd, copy)
+    assert len(load_index(copy)["offsets"]) == N_FRAMES
+    assert os.path.exists(index_filename(copy))
+
+    # a killed run leaves a truncated last frame, which is left out
+    frame = os.path.getsize(dcd) - int(load_index(copy)["offsets"][-1])
+    with open(dcd, "rb") as f:
+        partial = f.read()[-frame:-frame // 2]
+    with open(copy, "ab") as f:
+        f.write(partial)
+    mapped = MappedDCD(copy)
+    assert len(mapped) == N_FRAMES
+    np.testing.assert_array_equal(mapped.positions(N_FRAMES - 1),
+                                  MappedDCD(dcd).positions(N_FRAMES - 1))
+
+
+def test_reader_matches_mdanalysis(trajectory):
+    data, dcd = trajectory
+    reference = mda.Universe(data, dcd)
+    u = mda.Universe(data, dcd, format=MappedDCDReader)
+
+    assert u.trajectory.n_frames == N_FRAMES
+    for frame in (0, 7, 3, N_FRAMES - 1):
+        ts, expected = u.trajectory[frame], reference.trajectory[frame]
+        np.testing.assert_allclose(ts.positions, expected.positions)
+        np.testing.assert_allclose(ts.dimensions, expected.dimensions,
+                                   rtol=1e-6)
+        assert ts.time == pytest.approx(expected.time)
+        assert frame_step(u.trajectory, frame) \
+            == frame_step(reference.trajectory, frame)
+
+    # a pickled reader maps the file again and keeps its frame
+    copy = pickle.loads(pickle.dumps(u.trajectory))
+    np.testing.assert_array_equal(copy.ts.positions, u.trajectory.ts.positions)
+    np.testing.assert_array_equal(copy[2].positions,
+                                  reference.trajectory[2].positions)
@@ -0,0 +1,60 @@
+"""
+Replica ensembles seeded from spawned `np.random.SeedSequence` children.
+"""
+# Third-party packages
+import numpy as np
+
+# Local
+from mpec.ensemble import build_ensemble, replica_filename, write_system
+from mpec.lammps_data import load_npz
+
+SYSTEM = dict(nchain=3, sparsity=3, nmonomer=4, nmetal=6, metal_charge=2,
+              metal_diameter=1.0, density=0.85)
+
+
+def test_replicas_are_reproducible_and_independent(tmp_path):
+    runs = []
+    for run in ("a", "b"):
+        (tmp_path / run).mkdir()
+        summary = build_ensemble(3, str(tmp_path / run / "input.data"),
+                                 seed=11, processes=2, sidecar=True,
+                                 **SYSTEM)
+        assert [s[0] for s in summary] == [
+            str(tmp_path / run / f"input_00{k}.data") for k in range(3)]
+        runs.append(summary)
+
+    # the same root seed gives the same files
+    for a, b in zip(*runs):
+        assert a[1:] == b[1:]
+        with open(a[0], "rb") as fa, open(b[0], "rb") as fb:
+            assert fa.read() == fb.read()
+
+    # every replica has its own stream
+    labels = [s[1] for s in runs[0]]
+    assert labels == [f"seed 11 spawn {k}" for k in range(3)]
+    positions = [load_npz(str(tmp_path / "a" / f"input_00{k}.npz")).positions
+                 for k in range(3)]
+    for k in range(3):
+        for other in range(k):
+            assert not np.allclose(positions[k], positions[other])
+
+
+def test_label_rebuilds_the_replica(tmp_path):
+    summary = build_ensemble(2, str(tmp_path / "input.data"), seed=12,
+                             processes=1, **SYSTEM)
+    filename, label, _, _ = summary[1]
+    with open(filename) as f:
+        assert f.readline().rstrip("\n").endswith(label)
+
+    # "seed <entropy> spawn <key>" is enough to build the replica again
+    words = label.split()
+    seed = np.random.SeedSequence(int(words[1]), spawn_key=(int(words[3]),))
+    rebuilt = str(tmp_path / "rebuilt.data")
+    write_system(rebuilt, seed, **SYSTEM)
+    with open(filename, "rb") as fa, open(rebuilt, "rb") as fb:
+        assert fa.read() == fb.read()
+
+
+def test_replica_filename():
+    assert replica_filename("run/input.data", 7, 10) == "run/input_007.data"
+    assert replica_filename("input.data", 7, 12345) == "input_00007.data"
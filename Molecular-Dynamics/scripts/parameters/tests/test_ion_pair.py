@@ -0,0 +1,173 @@
+"""
+Survival probabilities of the ion-pair analysis against a brute-force count
+over every atom pair and time origin.
+"""
+# Third-party packages
+import numpy as np
+import pytest
+
+# MDAnalysis package
+import MDAnalysis as mda
+from MDAnalysis.analysis.distances import distance_array
+
+# Local
+from analysis_ion_pair import (AutocorrelationAtomPair, SurvivalCorrelator,
+                               _persistence, _survival_imm,
+                               _survival_intervals)
+
+
+def brute_survival(contacts: np.ndarray, tau_max: int,
+                   window_step: int) -> np.ndarray:
+    """
+    Number of (pair, origin) in contact at the origin and `lag` frames
+    later, and never unpaired for more than `window_step` frames in a row
+    in between.
+
+    :param contacts: 2D boolean array (frame, pair)
+    """
+    n_frames, n_pairs = contacts.shape
+    survive = np.zeros(tau_max)
+    for pair in range(n_pairs):
+        bound = contacts[:, pair]
+        for t0 in np.flatnonzero(bound):
+            gap = 0
+            for lag in range(min(tau_max, n_frames - t0)):
+                gap = 0 if bound[t0 + lag] else gap + 1
+                if gap > window_step:
+                    break
+                survive[lag] += gap == 0
+    return survive
+
+
+def random_contacts(n_frames: int, n_pairs: int, seed: int) -> np.ndarray:
+    """
+    Contacts that switch on and off with a different rate for every pair,
+    so that both long intervals and short gaps occur.
+    """
+    rng = np.random.default_rng(seed)
+    flip = rng.random(n_pairs) * 0.6
+    contacts = np.empty((n_frames, n_pairs), dtype=bool)
+    contacts[0] = rng.random(n_pairs) < 0.5
+    for t in range(1, n_frames):
+        contacts[t] = contacts[t - 1] ^ (rng.random(n_pairs) < flip)
+    return contacts
+
+
+def csr(contacts: np.ndarray, offset: int = 0) -> tuple:
+    """
+    Contact index and sorted pair indices of every frame.
+    """
+    contact_index = np.zeros(len(contacts) + 1, dtype=np.int64)
+    contact_index[1:] = np.cumsum(contacts.sum(axis=1))
+    return contact_index, np.nonzero(contacts)[1].astype(np.int64) + offset
+
+
+# n_frames, n_pairs, tau_max, window_step
+CASES = [(30, 12, 10, 0), (30, 12, 10, 1), (30, 12, 30, 3),
+         (25, 8, 40, 24), (40, 20, 7, 6), (1, 5, 3, 0), (12, 1, 12, 11)]
+
+
+@pytest.mark.parametrize("n_frames, n_pairs, tau_max, window_step", CASES)
+def test_intervals_match_brute_force(n_frames, n_pairs, tau_max,
+                                     window_step):
+    contacts = random_contacts(n_frames, n_pairs, seed=n_frames + n_pairs)
+    expected = brute_survival(contacts, tau_max, window_step)
+
+    survive = _survival_intervals(*csr(contacts, offset=100), tau_max,
+                                  window_step)
+    np.testing.assert_allclose(survive, expected)
+
+
+@pytest.mark.parametrize("n_frames, n_pairs, tau_max, window_step", CASES)
+def test_impey_matches_brute_force(n_frames, n_pairs, tau_max, window_step):
+    contacts = random_contacts(n_frames, n_pairs, seed=n_frames + n_pairs)
+    expected = brute_survival(contacts, tau_max, window_step)
+
+    pair_states = np.where(contacts, 2, 0).astype(np.int8)
+    _persistence(pair_states, window_step)
+    survive = [_survival_imm(lag, pair_states) for lag in range(tau_max)]
+    np.testing.assert_allclose(survive, expected)
+
+
+@pytest.mark.parametrize("n_frames, n_pairs, tau_max, window_step", CASES)
+def test_correlator_matches_brute_force(n_frames, n_pairs, tau_max,
+                                        window_step):
+    contacts = random_contacts(n_frames, n_pairs, seed=n_frames + n_pairs)
+    expected = brute_survival(contacts, tau_max, window_step)
+
+    correlator = SurvivalCorrelator(tau_max, window_step)
+    for frame, bound in enumerate(contacts):
+        if frame == n_frames // 2:
+            # as resumed from a checkpoint
+            correlator = SurvivalCorrelator.from_state(correlator.state())
+        correlator.update(np.flatnonzero(bound))
+
+    assert correlator.n_frames == n_frames
+    np.testing.assert_allclose(correlator.survive, expected)
+
+
+def test_recrossing_fills_short_gaps():
+    # 2: paired, 1: filled gap; the trajectory ends count as paired
+    states = np.array([0, 2, 0, 0, 2, 0, 0, 0, 2, 0], dtype=np.int8)
+    filled = {window: _persistence(states[:, None].copy(), window)
+              for window in (0, 1, 2, 3)}
+    np.testing.assert_array_equal(filled[0][:, 0], states)
+    np.testing.assert_array_equal(filled[1][:, 0],
+                                  [1, 2, 0, 0, 2, 0, 0, 0, 2, 1])
+    np.testing.assert_array_equal(filled[2][:, 0],
+                                  [1, 2, 1, 1, 2, 0, 0, 0, 2, 1])
+    np.testing.assert_array_equal(filled[3][:, 0],
+                                  [1, 2, 1, 1, 2, 1, 1, 1, 2, 1])
+
+    # the pair survives across the first gap only once it is filled
+    contacts = states[:, None] == 2
+    for window in (0, 1, 2, 3):
+        survive = [_survival_imm(lag, filled[window]) for lag in range(10)]
+        np.testing.assert_allclose(survive,
+                                   brute_survival(contacts, 10, window))
+
+
+def test_window_step_must_fit_the_trajectory():
+    contact_index, contact_pairs = csr(random_contacts(5, 3, seed=1))
+    with pytest.raises(ValueError):
+        _survival_intervals(contact_index, contact_pairs, 4, 5)
+    with pytest.raises(ValueError):
+        _persistence(np.zeros((5, 3), dtype=np.int8), 5)
+
+
+def test_selections_and_cutoffs(trajectory):
+    u = mda.Universe(*trajectory)
+    ag1 = [u.select_atoms("type 3"), u.select_atoms("type 1")]
+    ag2 = [u.select_atoms("type 4"), u.select_atoms("type 4")]
+    cutoffs = [1.5, 3.0]
+    tau_max, window_step = 6, 1
+
+    # brute force of every (selection pair, cutoff) on its own
+    distance = [np.array([distance_array(g1.positions, g2.positions,
+                                         box=ts.dimensions).ravel()
+                          for ts in u.trajectory])
+                for g1, g2 in zip(ag1, ag2)]
+    expected = []
+    for d in distance:
+        for cut in cutoffs:
+            survive = brute_survival((d > 1e-6) & (d < cut), tau_max,
+                                     window_step)
+            assert survive[0] > 0
+            expected.append(survive / survive[0])
+
+    # stored contacts with either engine, and streamed
+    for kwargs in ({}, {"engine": "impey", "pair_block": 7},
+                   {"streaming": True}):
+        ip = AutocorrelationAtomPair(ag1, ag2, cutoffs, tau_max,
+                                     window_step=window_step,
+                                     labels=["pendant", "backbone"],
+                                     verbose=False, **kwargs)
+        ip.run()
+        columns = [c for c in ip.df.columns
+                   if c.startswith("ACF_Survival_Probability")]
+        assert columns == [f"ACF_Survival_Probability[{label},{cut:g}]"
+                           for label in ("pendant", "backbone")
+                           for cut in cutoffs]
+        for column, survive in zip(columns, expected):
+            np.testing.assert_allclose(ip.df[column][:tau_max], survive)
+            assert np.all(ip.df[column][tau_max:] == 0)
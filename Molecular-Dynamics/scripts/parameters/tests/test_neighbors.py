@@ -0,0 +1,128 @@
+"""
+Cell-list searches and overlap-free placement against brute-force
+minimum-image distances.
+"""
+# Third-party packages
+import numpy as np
+import pytest
+
+# Local
+from mpec.chains import PENDANT, chain_sequence
+from mpec.neighbors import CellList, cell_pairs
+from mpec.placement import insert_chains, insert_particles
+
+BOX = np.array([6.0, 7.0, 8.0])
+
+
+def distances(a: np.ndarray, b: np.ndarray, box: np.ndarray) -> np.ndarray:
+    """
+    Minimum-image distances (len(a), len(b)) of every pair.
+    """
+    delta = b[None] - a[:, None]
+    delta -= box * np.round(delta / box)
+    return np.linalg.norm(delta, axis=2)
+
+
+def brute_overlaps(points, radii, centres, centre_radii, box,
+                   exclude=None) -> np.ndarray:
+    close = distances(points, centres, box) < radii[:, None] + centre_radii
+    if exclude is not None:
+        close[np.arange(len(points)), exclude] = False
+    return np.any(close, axis=1)
+
+
+@pytest.mark.parametrize("n", [50, 600])
+def test_cell_pairs_match_brute_force(n):
+    # points up to a box length outside the box, pairs across every face
+    points = np.random.default_rng(n).uniform(-BOX, 2 * BOX, size=(n, 3))
+    i, j, dist = cell_pairs(points, BOX, 0.9)
+
+    full = distances(points, points, BOX)
+    ri, rj = np.nonzero(np.triu(full < 0.9, 1))
+    order = np.lexsort((j, i))
+    np.testing.assert_array_equal(i[order], ri)
+    np.testing.assert_array_equal(j[order], rj)
+    np.testing.assert_allclose(dist[order], full[ri, rj])
+
+
+def test_overlaps_match_brute_force():
+    rng = np.random.default_rng(3)
+    ids = np.arange(400)
+    centres = rng.random((400, 3)) * BOX
+    centre_radii = rng.uniform(0.2, 0.5, 400)
+    cells = CellList(BOX, 1.0, 400)
+    cells.insert(ids, centres, centre_radii)
+
+    # queries hug the faces of the box so that half of them only overlap
+    # through a periodic image
+    points = rng.random((500, 3)) * BOX
+    face = rng.integers(0, 3, 500)
+    points[np.arange(500), face] = rng.choice([0.01, -0.01], 500) % \
+        BOX[face]
+    radii = rng.uniform(0.1, 0.5, 500)
+    exclude = rng.integers(0, 400, 500)
+
+    np.testing.assert_array_equal(
+        cells.overlaps(points, radii, chunk=128),
+        brute_overlaps(points, radii, centres, centre_radii, BOX))
+    np.testing.assert_array_equal(
+        cells.overlaps(points, radii, exclude),
+        brute_overlaps(points, radii, centres, centre_radii, BOX, exclude))
+
+    # holes left by remove, then moved to the end of the cells
+    removed = rng.choice(400, 150, replace=False)
+    kept = np.setdiff1d(ids, removed)
+    cells.remove(removed)
+    expected = brute_overlaps(points, radii, centres[kept],
+                              centre_radii[kept], BOX)
+    np.testing.assert_array_equal(cells.overlaps(points, radii), expected)
+    cells.compact()
+    np.testing.assert_array_equal(cells.overlaps(points, radii), expected)
+
+    # reinserting fills the holes and grows full cells
+    cells.insert(removed, centres[removed], centre_radii[removed])
+    np.testing.assert_array_equal(
+        cells.overlaps(points, radii),
+        brute_overlaps(points, radii, centres, centre_radii, BOX))
+
+
+def test_crowded_cells_grow():
+    rng = np.random.default_rng(4)
+    centres = rng.random((100, 3)) * 0.9
+    cells = CellList(BOX, 1.0, 100)
+    cells.insert(np.arange(100), centres, 0.05)
+
+    points = rng.random((50, 3)) * 1.5 - 0.25
+    np.testing.assert_array_equal(
+        cells.overlaps(points, 0.1),
+        brute_overlaps(points, np.full(50, 0.1), centres, np.full(100, 0.05),
+                       BOX))
+
+
+def test_placement_has_no_overlaps():
+    rng = np.random.default_rng(5)
+    sequence = chain_sequence(4, 5)
+    nchain, nper = 6, len(sequence)
+    radii = np.where(sequence == PENDANT, 0.6, 0.5)
+    cells = CellList(BOX, 1.2, nchain * nper + 30)
+    chains = insert_chains(cells, 0, nchain, sequence, radii, rng,
+                           pendant_size=1.2)
+    ions = insert_particles(cells, np.arange(nchain * nper,
+                                             nchain * nper + 30), 0.25, rng)
+
+    # bonded beads touch, nothing else overlaps
+    positions = np.concatenate((chains.reshape(-1, 3), ions))
+    reach = np.concatenate((np.tile(radii, nchain), np.full(30, 0.25)))
+    bonded = np.zeros((len(positions), len(positions)), dtype=bool)
+    for c in range(nchain):
+        for j in range(1, nper):
+            up = j - 2 if sequence[j - 1] == PENDANT else j - 1
+            bonded[c * nper + up, c * nper + j] = True
+            length = 0.97 * (1.2 if sequence[j] == PENDANT else 1.0)
+            assert np.linalg.norm(chains[c, j] - chains[c, up]) \
+                == pytest.approx(length)
+    close = distances(positions, positions, BOX) \
+        < reach[:, None] + reach[None]
+    np.fill_diagonal(close, False)
+    assert not np.any(np.triu(close) & ~bonded)
+    assert np.all((ions >= 0) & (ions < BOX))
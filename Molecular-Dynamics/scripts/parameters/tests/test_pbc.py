@@ -0,0 +1,60 @@
+"""
+Periodic boundary helpers for orthogonal and triclinic boxes.
+"""
+# Third-party packages
+import numpy as np
+import pytest
+
+# MDAnalysis package
+from MDAnalysis.lib.mdamath import triclinic_vectors
+
+# Local
+from mpec.pbc import box_matrix, minimum_image, unwrap, unwrap_chains, wrap
+
+BOXES = [np.array([5.0, 6.0, 7.0]),
+         np.array([5.0, 6.0, 7.0, 90.0, 90.0, 90.0]),
+         np.array([5.0, 6.0, 7.0, 80.0, 95.0, 70.0])]
+
+
+@pytest.mark.parametrize("box", BOXES)
+def test_wrap_round_trip(box):
+    positions = np.random.default_rng(1).uniform(-20, 20, size=(200, 3))
+    origin = np.array([-1.0, 0.5, 2.0])
+    wrapped, images = wrap(positions, box, origin=origin)
+
+    fractional = (wrapped - origin) @ np.linalg.inv(box_matrix(box))
+    assert np.all((fractional >= -1e-12) & (fractional < 1 + 1e-12))
+    np.testing.assert_allclose(unwrap(wrapped, images, box), positions)
+    if len(box) == 6:
+        np.testing.assert_allclose(box_matrix(box), triclinic_vectors(box),
+                                   atol=1e-5)
+
+
+@pytest.mark.parametrize("box", BOXES)
+def test_minimum_image(box):
+    delta = np.random.default_rng(2).uniform(-20, 20, size=(200, 3))
+    matrix = box_matrix(box)
+    shortest = minimum_image(delta, box)
+
+    # same point up to a lattice vector, within half a cell
+    shift = (delta - shortest) @ np.linalg.inv(matrix)
+    np.testing.assert_allclose(shift, np.round(shift), atol=1e-9)
+    assert np.all(np.abs(shortest @ np.linalg.inv(matrix)) <= 0.5 + 1e-12)
+    if len(box) == 3:
+        images = np.array(np.meshgrid(*[[-1, 0, 1]] * 3)).reshape(3, -1).T
+        brute = np.linalg.norm(shortest[:, None] + images @ matrix, axis=2)
+        np.testing.assert_allclose(np.linalg.norm(shortest, axis=1),
+                                   brute.min(axis=1))
+
+
+@pytest.mark.parametrize("box", BOXES)
+def test_unwrap_chains(box):
+    rng = np.random.default_rng(3)
+    steps = rng.normal(scale=0.5, size=(4, 30, 3))
+    chains = np.cumsum(steps, axis=1) + rng.uniform(0, 5, size=(4, 1, 3))
+    wrapped, _ = wrap(chains, box)
+    whole = unwrap_chains(wrapped, box)
+
+    np.testing.assert_allclose(np.diff(whole, axis=1), np.diff(chains,
+                                                                axis=1))
+    np.testing.assert_allclose(whole[:, 0], wrapped[:, 0])
@@ -0,0 +1,84 @@
+"""
+Soft pre-relaxation of built systems, checked with brute-force overlaps.
+"""
+# Third-party packages
+import numpy as np
+import pytest
+
+# Local
+from mpec.relax import soft_relax
+from mpec.system import build_system
+
+
+def worst_overlap(positions: np.ndarray, box: np.ndarray, sigma: np.ndarray,
+                  bonds: np.ndarray) -> float:
+    """
+    Largest sigma_ij - r_ij of all non-bonded pairs.
+    """
+    n = len(positions)
+    delta = positions[None] - positions[:, None]
+    delta -= box * np.round(delta / box)
+    overlap = (sigma[:, None] + sigma[None]) / 2 - np.linalg.norm(delta,
+                                                                   axis=2)
+    overlap[np.tril_indices(n)] = -np.inf
+    overlap[bonds[:, 0], bonds[:, 1]] = -np.inf
+    overlap[bonds[:, 1], bonds[:, 0]] = -np.inf
+    return float(overlap.max())
+
+
+def test_relax_removes_overlaps():
+    system = build_system(8, 3, 6, 12, 2, 1.0, 0.85, seed=1)
+    sigma = system.diameters[system.types - 1]
+    before = worst_overlap(system.positions, system.box, sigma, system.bonds)
+
+    relaxed, steps, worst = soft_relax(system.positions, system.box, sigma,
+                                       system.bonds, tolerance=0.2,
+                                       rng=np.random.default_rng(2))
+    after = worst_overlap(relaxed, system.box, sigma, system.bonds)
+
+    assert before > 0.5
+    assert 0 < steps < 500
+    assert worst == after and after < 0.2
+
+    # bonds stay clear of the FENE limit
+    delta = relaxed[system.bonds[:, 1]] - relaxed[system.bonds[:, 0]]
+    delta -= system.box * np.round(delta / system.box)
+    assert np.all(np.linalg.norm(delta, axis=1) < 0.9 * 1.5 + 1e-12)
+
+
+def test_warns_when_not_converged():
+    system = build_system(8, 3, 6, 12, 2, 1.0, 0.85, seed=1)
+    sigma = system.diameters[system.types - 1]
+    before = worst_overlap(system.positions, system.box, sigma, system.bonds)
+
+    with pytest.warns(RuntimeWarning, match="overlap"):
+        relaxed, steps, worst = soft_relax(
+            system.positions, system.box, sigma, system.bonds,
+            tolerance=0.2, max_steps=2, rng=np.random.default_rng(2))
+
+    assert steps == 2
+    assert worst == worst_overlap(relaxed, system.box, sigma, system.bonds)
+    assert 0.2 < worst < before
+
+
+def test_stacked_atoms_are_separated():
+    box = np.full(3, 5.0)
+    positions = np.array([[1.0, 1.0, 1.0]] * 3 + [[4.9, 2.0, 2.0],
+                                                  [0.1, 2.0, 2.0]])
+    sigma = np.ones(5)
+    bonds = np.zeros((0, 2), dtype=int)
+
+    relaxed, _, worst = soft_relax(positions, box, sigma, bonds,
+                                   tolerance=0.05,
+                                   rng=np.random.default_rng(3))
+    assert worst < 0.05
+    assert worst_overlap(relaxed, box, sigma, bonds) < 0.05
+
+
+def test_build_with_relax():
+    system = build_system(8, 3, 6, 12, 2, 1.0, 0.85, seed=1, relax=True,
+                          relax_tolerance=0.25)
+    sigma = system.diameters[system.types - 1]
+    assert worst_overlap(system.positions, system.box, sigma,
+                         system.bonds) < 0.25
+    assert np.all(np.abs(system.positions) <= system.box / 2)
@@ -0,0 +1,47 @@
+"""
+Chunked FFT correlations of `StreamingCorrelator` against a direct sum over
+the time origins.
+"""
+# Third-party packages
+import numpy as np
+import pytest
+
+# Local
+from mpec.rouse import StreamingCorrelator
+
+
+def direct_correlation(series: np.ndarray, tau_max: int) -> np.ndarray:
+    """
+    <x(t0) . x(t0 + tau)> of every series by summing over all t0.
+    """
+    corr = np.full((tau_max,) + series.shape[1:-1], np.nan)
+    for tau in range(min(tau_max, len(series))):
+        corr[tau] = np.mean(np.sum(series[:len(series) - tau]
+                                   * series[tau:], axis=-1), axis=0)
+    return corr
+
+
+@pytest.mark.parametrize("tau_max, chunks", [
+    (1, [40]), (8, [40]), (8, [3, 5, 1, 13, 18]), (25, [7] * 6),
+    (60, [10, 20, 10])])
+def test_matches_direct_sum(tau_max, chunks):
+    rng = np.random.default_rng(6)
+    series = rng.normal(size=(sum(chunks), 4, 2, 3))
+    correlator = StreamingCorrelator(tau_max, group_size=9)
+    for k in np.split(np.arange(len(series)), np.cumsum(chunks)[:-1]):
+        correlator.update(series[k])
+
+    np.testing.assert_allclose(correlator.correlation(),
+                               direct_correlation(series, tau_max),
+                               atol=1e-12)
+
+
+def test_empty_chunks_are_ignored():
+    series = np.random.default_rng(7).normal(size=(12, 5, 3))
+    correlator = StreamingCorrelator(6)
+    for chunk in (series[:0], series[:5], series[5:5], series[5:]):
+        correlator.update(chunk)
+
+    assert correlator.n_frames == 12
+    np.testing.assert_allclose(correlator.correlation(),
+                               direct_correlation(series, 6), atol=1e-12)
@@ -0,0 +1,116 @@
+"""
+Analyses driven by `SinglePass` against the same analyses run on their own.
+"""
+# Third-party packages
+import numpy as np
+import pandas as pd
+import pytest
+
+# MDAnalysis package
+import MDAnalysis as mda
+from MDAnalysis.analysis.base import AnalysisBase
+
+# Local
+from mpec.single_pass import SinglePass
+from analysis_cluster import ClusterAnalysis, NetworkTopology
+from analysis_crosslinking import CrossLinking
+
+
+class Displacement(AnalysisBase):
+    """
+    Displacement of every atom from the previous analysed frame, which
+    depends on the frames an analysis sees and on their order.
+    """
+
+    def __init__(self, ag, **kwargs):
+        super(Displacement, self).__init__(ag.universe.trajectory, **kwargs)
+        self.ag = ag
+
+    def _prepare(self) -> None:
+        self.results.step = np.zeros((self.n_frames, len(self.ag), 3))
+        self._previous = None
+
+    def _single_frame(self) -> None:
+        positions = self.ag.positions.copy()
+        if self._previous is not None:
+            self.results.step[self._frame_index] = positions - self._previous
+        self._previous = positions
+
+    def _conclude(self) -> None:
+        self.results.total = self.results.step.sum(axis=0)
+
+
+OBSERVERS = {
+    "crosslinking": lambda u: CrossLinking(
+        u.select_atoms("type 4"), u.select_atoms("type 3"), 4,
+        verbose=False),
+    "cluster": lambda u: ClusterAnalysis(
+        u.select_atoms("type 1 2 3 4"), u.select_atoms("type 4"),
+        u.select_atoms("type 3"), verbose=False),
+    "network": lambda u: NetworkTopology(
+        u.select_atoms("type 4"), u.select_atoms("type 3"), 4,
+        verbose=False),
+    "displacement": lambda u: Displacement(u.atoms),
+}
+
+
+def assert_same(a, b) -> None:
+    """
+    Recursive comparison of results (arrays, lists, dicts, data frames).
+    """
+    if isinstance(a, pd.DataFrame):
+        pd.testing.assert_frame_equal(a, b)
+    elif isinstance(a, dict):
+        assert sorted(a) == sorted(b)
+        for key in a:
+            assert_same(a[key], b[key])
+    elif isinstance(a, (list, tuple)):
+        assert len(a) == len(b)
+        for x, y in zip(a, b):
+            assert_same(x, y)
+    else:
+        np.testing.assert_array_equal(a, b)
+
+
+@pytest.mark.parametrize("first, second", [
+    ("crosslinking", "cluster"), ("network", "displacement"),
+    ("displacement", "crosslinking")])
+@pytest.mark.parametrize("start, stop", [(None, None), (1, 10)])
+def test_observers_match_own_runs(trajectory, first, second, start, stop):
+    u = mda.Universe(*trajectory)
+    observers = [OBSERVERS[first](u), OBSERVERS[second](u)]
+    SinglePass(observers, strides=[2, 1], verbose=False).run(start=start,
+                                                              stop=stop)
+
+    alone = [OBSERVERS[first](u), OBSERVERS[second](u)]
+    alone[0].run(start=start, stop=stop, step=2)
+    alone[1].run(start=start, stop=stop)
+
+    for obs, expected in zip(observers, alone):
+        assert obs.n_frames == expected.n_frames
+        np.testing.assert_array_equal(obs.frames, expected.frames)
+        np.testing.assert_allclose(obs.times, expected.times)
+        assert_same(dict(obs.results), dict(expected.results))
+        if hasattr(expected, "df"):
+            assert_same(obs.df, expected.df)
+
+
+def test_observers_share_one_universe(trajectory):
+    u, other = mda.Universe(*trajectory), mda.Universe(*trajectory)
+    with pytest.raises(ValueError):
+        SinglePass([Displacement(u.atoms), Displacement(other.atoms)])
+    with pytest.raises(ValueError):
+        SinglePass([Displacement(u.atoms)], strides=[0])
+
+
+def test_frames_are_read_by_one_process(trajectory):
+    u = mda.Universe(*trajectory)
+    observers = [OBSERVERS["crosslinking"](u), OBSERVERS["cluster"](u)]
+    assert all(obs.parallelizable for obs in observers)
+
+    single_pass = SinglePass(observers, verbose=False)
+    assert SinglePass._analysis_algorithm_is_parallelizable is False
+    assert not single_pass.parallelizable
+    assert single_pass.get_supported_backends() == ("serial",)
+    with pytest.raises(ValueError):
+        single_pass.run(backend="multiprocessing", n_workers=2)
@@ -0,0 +1,135 @@
+"""
+Per-selection trajectory stores against the trajectory they were converted
+from.
+"""
+# Standard library
+import os
+import shutil
+
+# Third-party packages
+import numpy as np
+import pytest
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import connected_components
+
+# MDAnalysis package
+import MDAnalysis as mda
+
+# Local
+from mpec.dcd import frame_step
+from mpec.store import (StoreReader, TrajectoryStore, convert, load_universe,
+                        type_selections)
+
+from conftest import N_FRAMES
+
+
+@pytest.mark.parametrize("compress, step", [(False, None), (True, 2)])
+def test_store_matches_trajectory(tmp_path, trajectory, compress, step):
+    u = mda.Universe(*trajectory)
+    directory = str(tmp_path / "store")
+    convert(u, directory, block=4, compress=compress, step=step)
+    store = TrajectoryStore(directory)
+
+    frames = np.arange(N_FRAMES)[::step]
+    assert store.selections == list(type_selections(u))
+    assert store.n_frames == len(frames)
+    np.testing.assert_array_equal(store.frames, frames)
+    for name, selection in type_selections(u).items():
+        ag = u.select_atoms(selection)
+        np.testing.assert_array_equal(store.indices[name], ag.indices)
+
+        positions = store.positions(name)
+        for k, ts in enumerate(u.trajectory[::step]):
+            np.testing.assert_array_equal(positions[k], ag.positions)
+            np.testing.assert_allclose(store.box[k], ts.dimensions)
+            assert store.times[k] == pytest.approx(ts.time)
+
+        # any range, within a block or across blocks
+        np.testing.assert_array_equal(store.positions(name, 1, 3),
+                                      positions[1:3])
+        np.testing.assert_array_equal(store.positions(name, 3, 6),
+                                      positions[3:6])
+        assert len(store.positions(name, 5, 5)) == 0
+
+
+def test_ranges_in_one_block_are_views(tmp_path, trajectory):
+    u = mda.Universe(*trajectory)
+    directory = str(tmp_path / "store")
+    convert(u, directory, selections={"ions": "type 4 5"}, block=5)
+    store = TrajectoryStore(directory)
+
+    view = store.positions("ions", 5, 8)
+    assert isinstance(view, np.memmap) and not view.flags.writeable
+    copy = store.positions("ions", 3, 8)
+    assert not isinstance(copy, np.memmap)
+    np.testing.assert_array_equal(copy[2:], view)
+
+
+def bond_pairs(universe, indices: np.ndarray) -> set:
+    """
+    Bonds of a universe as pairs of the atom indices in `indices` order.
+    """
+    return {tuple(sorted(indices[b.indices])) for b in universe.bonds}
+
+
+@pytest.mark.parametrize("selections", [
+    ["type_1", "type_2", "type_3"], ["type_4", "type_3"]])
+def test_load_universe_reads_the_store(tmp_path, trajectory, selections):
+    data, dcd = trajectory
+    reference = mda.Universe(data, dcd)
+    directory = str(tmp_path / "store")
+    convert(reference, directory, block=5)
+
+    u = load_universe(data, dcd, directory, selections)
+    assert isinstance(u.trajectory, StoreReader)
+    indices = np.sort(np.concatenate([
+        reference.select_atoms(type_selections(reference)[name]).indices
+        for name in selections]))
+    subset = reference.atoms[indices]
+    np.testing.assert_array_equal(u.atoms.types, subset.types)
+
+    # the merged universe keeps the bonds between its atoms, and its
+    # fragments are the pieces of the molecules they connect
+    pairs = {pair for pair in bond_pairs(reference,
+                                         np.arange(len(reference.atoms)))
+             if np.all(np.isin(pair, indices))}
+    assert bond_pairs(u, indices) == pairs
+    i, j = np.searchsorted(indices, np.array(sorted(pairs)).reshape(-1, 2).T)
+    n = len(indices)
+    _, expected = connected_components(
+        coo_matrix((np.ones(len(i)), (i, j)), shape=(n, n)), directed=False)
+    labels = u.atoms.fragindices
+    assert len(np.unique(np.column_stack((labels, expected)), axis=0)) \
+        == len(np.unique(labels)) == len(np.unique(expected))
+
+    assert u.trajectory.n_frames == N_FRAMES
+    for frame in (0, 6, 4, N_FRAMES - 1):
+        ts, expected = u.trajectory[frame], reference.trajectory[frame]
+        np.testing.assert_array_equal(ts.positions, subset.positions)
+        np.testing.assert_allclose(ts.dimensions, expected.dimensions)
+        assert ts.time == pytest.approx(expected.time)
+        assert frame_step(u.trajectory, frame) \
+            == frame_step(reference.trajectory, frame)
+
+
+def test_load_universe_falls_back_to_the_trajectory(tmp_path, trajectory):
+    data, dcd = trajectory
+    copy = str(tmp_path / "copy.dcd")
+    shutil.copy(dcd, copy)
+    directory = str(tmp_path / "store")
+
+    # no store yet
+    u = load_universe(data, copy, directory)
+    assert not isinstance(u.trajectory, StoreReader)
+    assert len(u.atoms) == len(mda.Universe(data).atoms)
+
+    convert(u, directory, block=5)
+    assert isinstance(load_universe(data, copy, directory).trajectory,
+                      StoreReader)
+
+    # a trajectory written after the store outdates it
+    index = os.path.getmtime(os.path.join(directory, "index.npz"))
+    os.utime(copy, (index + 10, index + 10))
+    u = load_universe(data, copy, directory, ["type_4"])
+    assert not isinstance(u.trajectory, StoreReader)
+    assert len(u.atoms) == len(mda.Universe(data).atoms)
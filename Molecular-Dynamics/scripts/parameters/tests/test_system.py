@@ -0,0 +1,203 @@
+"""
+Topology and geometry of the built systems against the loops of the
+original `initialize.py`, their LAMMPS data and `.npz` files, and the data
+files streamed block by block.
+"""
+# Third-party packages
+import numpy as np
+import pytest
+
+# MDAnalysis package
+import MDAnalysis as mda
+
+# Local
+from mpec import lammps_data
+from mpec.lammps_data import (ATOM_FORMAT, BOND_FORMAT, load_npz, save_npz,
+                              stream_data, write_data)
+from mpec.system import build_system
+
+# nchain, sparsity, nmonomer, nmetal, metal_charge
+SYSTEMS = [(3, 2, 5, 4, 2), (3, 3, 4, 6, 2), (2, 4, 3, 3, 3),
+           (4, 3, 4, 10, 2)]
+
+
+def baseline_topology(nbeads: int, nmono: int, npoly: int, nion: int,
+                      z_c: int) -> tuple:
+    """
+    Types, charges, molecule IDs and bonds (1-based atom IDs) written by
+    the original `initialize.py`, following its loops with the positions
+    left out.
+    """
+    sequence = []
+    for i in range(nbeads + 1):
+        if i < int((nbeads - 2) / 2) or i > int(nbeads / 2 + 1):
+            sequence.append(2)
+        elif i == int(nbeads / 2):
+            sequence.append(1)
+        elif i == int(nbeads / 2 + 1):
+            sequence.append(3)
+    charge = {1: 0, 2: 0, 3: -1, 4: +1}
+
+    nmonomers = nmono * npoly
+    ncoion = int(nmonomers - z_c * nion)
+    charge_coion = -1 if ncoion < 0 else 1
+    ncoion = abs(ncoion)
+    npolyatoms = nmonomers * nbeads + (npoly if nbeads == 3 else 0)
+    ntot = npolyatoms + nion + ncoion
+
+    typeb, q, molnum = [0] * (ntot + 1), [0.0] * (ntot + 1), [0] * (ntot + 1)
+    k = 0
+    for ix in range(npoly):
+        if nbeads == 3:
+            k = k + 1
+            typeb[k], q[k], molnum[k] = 2, 0, ix + 1
+        for iy in range(nmono):
+            for iz in sequence:
+                k = k + 1
+                typeb[k], q[k], molnum[k] = iz, charge[iz], ix + 1
+    for k in range(npolyatoms + 1, npolyatoms + nion + 1):
+        typeb[k], q[k] = 4, z_c * 1.0
+    for k in range(npolyatoms + nion + 1, ntot + 1):
+        typeb[k], q[k] = 5, charge_coion
+    molecules = [molnum[i] if typeb[i] not in (4, 5)
+                 else i - ntot + nion + npoly + ncoion
+                 for i in range(1, ntot + 1)]
+
+    bonds, bond_types = [], []
+    for i in range(1, npolyatoms + 1):
+        if molnum[i + 1] == molnum[i]:
+            if typeb[i] == 1:
+                bonds.append((i, i + 1))
+                bond_types.append(2)
+            elif typeb[i] == 3:
+                bonds.append((i - 1, i + 1))
+                bond_types.append(1)
+            elif typeb[i] == 2:
+                bonds.append((i, i + 1))
+                bond_types.append(1)
+
+    return (np.array(typeb[1:]), np.array(q[1:]), np.array(molecules),
+            np.array(bonds), np.array(bond_types))
+
+
+@pytest.mark.parametrize("nchain, sparsity, nmonomer, nmetal, charge",
+                         SYSTEMS)
+def test_topology_matches_baseline(nchain, sparsity, nmonomer, nmetal,
+                                   charge):
+    system = build_system(nchain, sparsity, nmonomer, nmetal, charge, 1.0,
+                          0.85, seed=3)
+    types, charges, molecules, bonds, bond_types = baseline_topology(
+        sparsity + 1, nmonomer, nchain, nmetal, charge)
+
+    np.testing.assert_array_equal(system.types, types)
+    np.testing.assert_array_equal(system.charges, charges)
+    np.testing.assert_array_equal(system.molecules, molecules)
+    np.testing.assert_array_equal(system.bonds + 1, bonds)
+    np.testing.assert_array_equal(system.bond_types, bond_types)
+
+
+@pytest.mark.parametrize("nchain, sparsity, nmonomer, nmetal, charge",
+                         SYSTEMS)
+def test_geometry(nchain, sparsity, nmonomer, nmetal, charge):
+    system = build_system(nchain, sparsity, nmonomer, nmetal, charge, 1.2,
+                          0.85, seed=4, pendant_size=1.5)
+
+    # volume of the original script, the ions counted with their diameter
+    npendant = nchain * nmonomer
+    nion = system.n_atoms - nchain * system.chain_length
+    volume = (system.n_atoms - nion - npendant + npendant * 1.5 ** 3
+              + nmetal * 1.2 ** 3) / 0.85
+    np.testing.assert_allclose(system.box, np.full(3, volume ** (1 / 3)))
+
+    # wrapped into the box, bonds restored by the image flags
+    assert np.all(np.abs(system.positions) <= system.box / 2)
+    unwrapped = system.positions + system.images * system.box
+    delta = unwrapped[system.bonds[:, 1]] - unwrapped[system.bonds[:, 0]]
+    np.testing.assert_allclose(np.linalg.norm(delta, axis=1),
+                               np.where(system.bond_types == 2, 0.97 * 1.5,
+                                        0.97))
+
+
+def test_data_file_round_trip(tmp_path):
+    system = build_system(4, 3, 4, 10, 2, 1.2, 0.85, seed=5)
+    write_data(str(tmp_path / "input.data"), system)
+    u = mda.Universe(str(tmp_path / "input.data"))
+
+    np.testing.assert_array_equal(u.atoms.types.astype(int), system.types)
+    np.testing.assert_allclose(u.atoms.charges, system.charges)
+    np.testing.assert_array_equal(u.atoms.resids, system.molecules)
+    np.testing.assert_allclose(u.atoms.positions, system.positions,
+                               atol=1e-4)
+    np.testing.assert_allclose(u.dimensions[:3], system.box, rtol=1e-6)
+    assert sorted(map(tuple, np.sort(u.bonds.indices, axis=1))) \
+        == sorted(map(tuple, system.bonds))
+    assert len(u.atoms.fragments) == system.n_atoms \
+        - system.nchain * (system.chain_length - 1)
+
+
+def test_bulk_lines_match_row_by_row(tmp_path, monkeypatch):
+    system = build_system(3, 3, 4, 6, 2, 1.0, 0.85, seed=6)
+    write_block = lammps_data._write_block
+    monkeypatch.setattr(lammps_data, "_write_block",
+                        lambda f, fmt, table: write_block(f, fmt, table, 7))
+    write_data(str(tmp_path / "input.data"), system)
+    atoms, bonds = (tmp_path / "input.data").read_text().split(
+        "Atoms\n\n")[1].split("\nBonds\n\n")
+
+    # the lines the original script wrote one at a time
+    assert atoms == "".join(
+        ATOM_FORMAT % (k + 1, system.molecules[k], system.types[k],
+                       system.charges[k], *system.positions[k],
+                       *system.images[k])
+        for k in range(system.n_atoms))
+    assert bonds.startswith("".join(
+        BOND_FORMAT % (k + 1, system.bond_types[k], *(system.bonds[k] + 1))
+        for k in range(system.n_bonds)))
+
+
+def test_npz_round_trip(tmp_path):
+    system = build_system(3, 3, 4, 6, 2, 1.0, 0.85, seed=7)
+    save_npz(str(tmp_path / "input.npz"), system)
+    loaded = load_npz(str(tmp_path / "input.npz"))
+
+    for name, value in vars(system).items():
+        np.testing.assert_array_equal(getattr(loaded, name), value)
+
+
+@pytest.mark.parametrize("nchain, sparsity, nmonomer, nmetal, charge",
+                         SYSTEMS)
+def test_stream_matches_write(tmp_path, nchain, sparsity, nmonomer, nmetal,
+                              charge):
+    written = tmp_path / "written.data"
+    streamed = tmp_path / "streamed.data"
+    system = build_system(nchain, sparsity, nmonomer, nmetal, charge, 1.0,
+                          0.85, seed=4)
+    write_data(str(written), system)
+    box, ncoion, rg2, ree2 = stream_data(
+        str(streamed), nchain, sparsity, nmonomer, nmetal, charge, 1.0, 0.85,
+        seed=4, block=nchain)
+
+    assert streamed.read_bytes() == written.read_bytes()
+    np.testing.assert_array_equal(box, system.box)
+    assert ncoion == system.n_atoms - nchain * system.chain_length - nmetal
+    assert rg2 == pytest.approx(np.mean(system.rg2))
+    assert ree2 == pytest.approx(np.mean(system.ree2))
+
+
+def test_stream_blocks_keep_topology(tmp_path):
+    # smaller blocks draw the positions in another order, everything else
+    # is written the same
+    written = tmp_path / "written.data"
+    streamed = tmp_path / "streamed.data"
+    write_data(str(written), build_system(5, 3, 4, 8, 2, 1.0, 0.85, seed=5))
+    stream_data(str(streamed), 5, 3, 4, 8, 2, 1.0, 0.85, seed=5, block=2)
+
+    written, streamed = (f.read_text().split("\nBonds\n")
+                         for f in (written, streamed))
+    assert streamed[1] == written[1]
+
+    def atoms(text: str) -> np.ndarray:
+        lines = text.split("Atoms\n\n")[1].split("\n")
+        return np.array([line.split()[:4] for line in lines if line])
+
+    np.testing.assert_array_equal(atoms(streamed[0]), atoms(written[0]))
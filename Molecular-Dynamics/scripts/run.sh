@@ -28,6 +28,7 @@ flag_production_nve=false
 flag_deformation=false
 flag_analysis_nve=false
 flag_analysis_ip=false
+flag_analysis_all=false
 
 # action flags
 flag_archive=false
@@ -59,6 +60,10 @@ for arg in "$@"; do
         flag_analysis_ip=true
         export IPRANGE="${2}"
         ;;
+    -aall | --analysis_all)
+        flag_analysis_all=true
+        export IPRANGE="${2}"
+        ;;
     -a | --all)
         flag_initialization=true
         flag_equilibration=true
@@ -79,6 +84,7 @@ for arg in "$@"; do
         echo "  -nve, --nve           Perform production NVE simulation."
         echo "  -def, --deform        Perform deformation simulation."
         echo "  -anve, --analysis_nve Perform analysis of NVE simulation."
+        echo "  -aall, --analysis_all Perform all analyses of NVE simulation in one pass."
         echo "  -a, --all             Run all simulation methods."
         echo ""
         echo "Other:"
@@ -104,7 +110,7 @@ if [[ $# -lt 1 ]]; then
 fi
 
 # check that at least one simulation method was selected
-if [[ "${flag_initialization}" = false ]] && [[ "${flag_equilibration}" = false ]] && [[ "${flag_production_nve}" = false ]] && [[ "${flag_deformation}" = false ]] && [[ "${flag_analysis_nve}" = false ]] && [[ "${flag_analysis_ip}" = false ]]; then
+if [[ "${flag_initialization}" = false ]] && [[ "${flag_equilibration}" = false ]] && [[ "${flag_production_nve}" = false ]] && [[ "${flag_deformation}" = false ]] && [[ "${flag_analysis_nve}" = false ]] && [[ "${flag_analysis_ip}" = false ]] && [[ "${flag_analysis_all}" = false ]]; then
     echo "ERROR: No simulation methods selected."
     echo "Usage: ${package} [global_preferences] [simulation_preferences]"
     echo "Use '${package} --help' for more information."
@@ -159,6 +165,12 @@ if [[ "${flag_deformation}" = true ]]; then
     source "${project_path}/scripts/method/production_deform.sh"
 fi
 
+# convert the NVE trajectory into a store read by the separate analyses
+if [[ "${flag_analysis_nve}" = true ]] || [[ "${flag_analysis_ip}" = true ]]; then
+    echo "Converting NVE trajectory..."
+    source "${project_path}/scripts/method/analysis_store.sh"
+fi
+
 # run analysis of NVE simulation
 if [[ "${flag_analysis_nve}" = true ]]; then
     echo "Analyzing NVE simulation..."
@@ -172,6 +184,13 @@ if [[ "${flag_analysis_ip}" = true ]]; then
     source "${project_path}/scripts/method/analysis_ion_pair.sh"
 fi
 
+# run all analyses of NVE simulation with one read of the trajectory
+if [[ "${flag_analysis_all}" = true ]]; then
+    echo "Analyzing NVE simulation..."
+    export IPRANGE="${2}"
+    source "${project_path}/scripts/method/analysis_single_pass.sh"
+fi
+
 # ##############################################################################
 # End ##########################################################################
 # ##############################################################################
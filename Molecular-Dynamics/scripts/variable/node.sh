@@ -17,6 +17,9 @@ export LAMMPS_BIN="${script_path}/../../software/lammps_new/build/lmp"
 export VMD_BIN="${script_path}/../../software/vmd/plugins/LINUXAMD64/molfile/"
 export MPI_BIN="/home/pjwalker/software/openmpi_4.1.5-gcc_11.4.0-cuda_11.6.124/bin/mpirun"
 
+# make the mpec helper package importable by the python scripts
+export PYTHONPATH="${script_path}/../parameters${PYTHONPATH:+:${PYTHONPATH}}"
+
 hostname=$(hostname -s)
 
 if [[ "${hostname}" == "pierre-walker" ]]; then
@@ -31,6 +31,13 @@ export COION_DIAMETER="1.5"                 # Give the radius of the co-ion
 # Simulation #################################################################
 # Initialisation
 export DENSITY="0.05"                       # Give the initial density
+export OVERLAP_CHECK="false"                # Reject overlapping beads when building the system
+export SEED=""                              # Give the root random seed (empty = fresh entropy, recorded in input.data)
+export REPLICAS="1"                         # Give the number of independent start configurations
+export STREAM_BUILD="false"                 # Build and write the system in blocks (very large systems)
+export PRE_RELAX="false"                    # Remove overlaps with a soft repulsion when building the system
+export RELAX_STEPS="10000"                  # Give the number of limited NVE steps after minimisation
+export CONFORMATION_CACHE=""                # Give a directory to reuse chain conformations (empty = grow chains)
 export PRESSURE="0.001"                     # Give the pressure
 export TEMPERATURE="1"                      # Give the temperature
 export DIELECTRIC="0.15"                    # Give the dielectric constant
@@ -38,6 +45,9 @@ export DIELECTRIC="0.15"                    # Give the dielectric constant
 # Production - NVE
 export TIME_STEP="0.005"                    # Give the time step
 export NUM_STEPS="35000000"                 # Give the number of steps
+export ANALYSIS_CHECKPOINT="1000"           # Give the number of frames between analysis checkpoints (0 = none)
+export ROUSE_MODES="5"                      # Give the number of Rouse modes in the chain relaxation analysis
+export E2E_TAU_MAX="1000"                   # Give the longest lag in frames of the chain relaxation analysis (0 = whole run)
 
 # Production - Deformation
 export DEFORMATION="0.652e-2"               # Give the deformation rate